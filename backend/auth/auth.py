@@ -2,10 +2,10 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from database.database import get_db
+from database.database import get_db, SessionLocal
 from database.models import User
 import os
 
@@ -64,4 +64,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def authenticate_token(token: str):
+    """Active user for a bearer token, outside a route's dependencies.
+    The session is closed right away rather than held for the life of the caller."""
+    db = SessionLocal()
+    try:
+        user = await get_current_user(token, db)
+    finally:
+        db.close()
+    return await get_current_active_user(user)
+
+async def get_stream_user(token: str = Query(...)):
+    """EventSource cannot send headers, so streams pass the bearer token as ?token=."""
+    return await authenticate_token(token)
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
@@ -0,0 +1,99 @@
+"""Cost of an incremental backup versus a full dump.
+
+    python benchmarks/backup_benchmark.py [--contracts 100000] [--changed 0.01]
+
+Seeds a throwaway SQLite database and takes a full backup. It then updates and
+deletes a fraction of the contracts, logs some communications, and takes an
+incremental backup followed by a second full one. Reports rows read, chunks
+and bytes uploaded and wall time for each, and checks that restoring the
+incremental chain reproduces the source tables row for row.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, insert, select, update
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Communication, Contract, ProcurementOfficer
+from services.backup_service import LocalDirectoryTarget, backup_service
+
+def seed(session, contracts: int, officers: int):
+    now = datetime.utcnow() - timedelta(days=1)
+    session.execute(insert(ProcurementOfficer), [
+        {'name': f"Officer {i}", 'agency': f"Agency {i % 40}", 'email': f"officer{i}@agency.gov",
+         'relationship_strength': i % 10 + 1, 'created_at': now, 'updated_at': now}
+        for i in range(officers)
+    ])
+    session.execute(insert(Contract), [
+        {'title': f"Contract {i}", 'agency': f"Agency {i % 40}", 'naics_code': "488510",
+         'value': float(i * 1000), 'status': "active", 'opportunity_score': i % 10 + 1,
+         'notes': "Freight logistics support " * 4, 'created_at': now, 'updated_at': now}
+        for i in range(contracts)
+    ])
+    session.commit()
+
+def touch(session, contracts: int, officers: int, changed: float):
+    now = datetime.utcnow()
+    ids = random.sample(range(1, contracts + 1), max(1, int(contracts * changed)))
+    session.execute(update(Contract), [{'id': row_id, 'status': "awarded", 'updated_at': now} for row_id in ids])
+    session.execute(delete(Contract).where(Contract.id.in_(ids[:max(1, len(ids) // 10)])))
+    session.execute(insert(Communication), [
+        {'contact_id': random.randint(1, officers), 'date': now, 'type': "email",
+         'subject': "Follow-up", 'created_at': now}
+        for _ in range(max(1, officers // 100))
+    ])
+    session.commit()
+
+def timed_backup(session, target, full):
+    started = time.perf_counter()
+    result = backup_service.run(session, target, full=full)
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+def table_rows(connection):
+    return {
+        table.name: connection.execute(select(table).order_by(table.c.id)).all()
+        for table in Base.metadata.sorted_tables
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contracts", type=int, default=100000)
+    parser.add_argument("--officers", type=int, default=5000)
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of contracts updated")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'source.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        target = LocalDirectoryTarget(os.path.join(workdir, "backups"))
+
+        seed(session, args.contracts, args.officers)
+        results = {'full': timed_backup(session, target, full=True)}
+        touch(session, args.contracts, args.officers, args.changed)
+        results['incremental'] = timed_backup(session, target, full=False)
+        results['full (again)'] = timed_backup(session, target, full=True)
+
+        print(f"{'backup':<14}{'rows read':>12}{'chunks':>10}{'uploaded':>10}{'bytes':>14}{'seconds':>10}")
+        for name, result in results.items():
+            print(f"{name:<14}{result['rows']:>12}{result['chunks']:>10}{result['chunks_uploaded']:>10}"
+                  f"{result['bytes_uploaded']:>14}{result['seconds']:>10}")
+
+        restored = create_engine(f"sqlite:///{os.path.join(workdir, 'restored.db')}")
+        started = time.perf_counter()
+        with restored.begin() as connection:
+            backup_service.restore(connection, target, backup_id=results['incremental']['backup_id'])
+        print(f"\nrestore of the incremental chain: {time.perf_counter() - started:.3f}s")
+
+        with engine.connect() as source, restored.connect() as copy:
+            print("tables match source:", table_rows(source) == table_rows(copy))
+
+if __name__ == "__main__":
+    main()
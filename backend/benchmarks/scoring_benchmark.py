@@ -0,0 +1,82 @@
+"""Contracts re-scored per second, per-row ORM loop versus the scoring service.
+
+    python benchmarks/scoring_benchmark.py [--rows 200000]
+
+Seeds a throwaway SQLite database with active contracts whose scores are all
+stale and re-scores them twice:
+
+* loop: load every Contract, score it in Python and let the ORM flush one
+  UPDATE per changed row, as re-running the scraper's scoring per row would
+* vectorized: scoring_service.rescore, column chunks scored with NumPy and
+  written back with one UPDATE ... WHERE id IN per distinct score
+
+Both runs start from the same stale scores and must agree on the result.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Contract
+from services.scoring_service import scoring_service
+
+def seed(session, rows: int):
+    now = datetime.utcnow()
+    session.execute(insert(Contract), [
+        {'title': f"Contract {i}", 'agency': "Miami-Dade County" if i % 7 == 0 else f"Agency {i % 40}",
+         'naics_code': "488510", 'value': None if i % 5 == 0 else (i % 3000) * 1000.0,
+         'deadline': None if i % 11 == 0 else now + timedelta(days=i % 90 - 20),
+         'status': "active", 'opportunity_score': 0, 'created_at': now, 'updated_at': now}
+        for i in range(rows)
+    ])
+    session.commit()
+
+def loop_rescore(session) -> int:
+    changed = 0
+    for contract in session.query(Contract).filter(Contract.status == "active"):
+        score = scoring_service.score(contract.value, contract.deadline, contract.agency)
+        if contract.opportunity_score != score:
+            contract.opportunity_score = score
+            changed += 1
+    session.commit()
+    return changed
+
+def scores(session):
+    return session.query(Contract.id, Contract.opportunity_score).order_by(Contract.id).all()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seeded = os.path.join(workdir, 'seeded.db')
+        engine = create_engine(f"sqlite:///{seeded}")
+        Base.metadata.create_all(engine)
+        seed(sessionmaker(bind=engine)(), args.rows)
+        engine.dispose()
+
+        results = {}
+        for name, run in (('loop', loop_rescore), ('vectorized', lambda session: scoring_service.rescore(session)['changed'])):
+            path = os.path.join(workdir, f'{name}.db')
+            shutil.copy(seeded, path)
+            session = sessionmaker(bind=create_engine(f"sqlite:///{path}"))()
+            started = time.perf_counter()
+            changed = run(session)
+            results[name] = (time.perf_counter() - started, changed, scores(session))
+
+        print(f"{'path':<12}{'seconds':>10}{'rows/s':>14}{'changed':>10}")
+        for name, (seconds, changed, _) in results.items():
+            print(f"{name:<12}{seconds:>10.2f}{args.rows / seconds:>14,.0f}{changed:>10}")
+        print(f"\nspeedup: {results['loop'][0] / results['vectorized'][0]:.1f}x")
+        print("scores match:", results['loop'][2] == results['vectorized'][2])
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Boolean, Date
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Boolean, Date, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -68,6 +68,29 @@ class ProcurementOfficer(Base):
     # Relationships
     communications = relationship("Communication", back_populates="contact")
 
+class Agency(Base):
+    __tablename__ = "agencies"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(200), nullable=False)
+    normalized_name = Column(String(200), nullable=False, unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    aliases = relationship("AgencyAlias", back_populates="agency")
+
+class AgencyAlias(Base):
+    __tablename__ = "agency_aliases"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    agency_id = Column(Integer, ForeignKey("agencies.id"), nullable=False)
+    alias = Column(String(200), nullable=False)
+    normalized_alias = Column(String(200), nullable=False, unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    agency = relationship("Agency", back_populates="aliases")
+
 class Communication(Base):
     __tablename__ = "communications"
     
@@ -80,9 +103,35 @@ class Communication(Base):
     follow_up_date = Column(Date, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Latest outstanding follow-up per officer (see EmailService.follow_up_reminder_query)
+        Index(
+            "ix_communications_contact_follow_up",
+            "contact_id", "date", "id",
+            postgresql_where=follow_up_date.isnot(None)
+        ),
+    )
+    
     # Relationships
     contact = relationship("ProcurementOfficer", back_populates="communications")
 
+class FollowUpSchedule(Base):
+    __tablename__ = "follow_up_schedule"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    contact_id = Column(Integer, ForeignKey("procurement_officers.id"), nullable=False, unique=True)
+    communication_id = Column(Integer, ForeignKey("communications.id"), nullable=False, index=True)
+    communication_date = Column(DateTime, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    fired_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # The poller only ever reads pending rows in due order
+        Index("ix_follow_up_schedule_pending", "due_at", postgresql_where=fired_at.is_(None)),
+    )
+
 class RevenueTracking(Base):
     __tablename__ = "revenue_tracking"
     
@@ -107,6 +156,40 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class SavedSearch(Base):
+    __tablename__ = "saved_searches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    # Same filters as GET /api/contracts
+    naics_code = Column(String(10), nullable=True)
+    agency = Column(String(200), nullable=True)
+    status = Column(String(50), nullable=True)
+    min_value = Column(Float, nullable=True)
+    max_value = Column(Float, nullable=True)
+    search = Column(String(200), nullable=True)
+    is_active = Column(Boolean, default=True)
+    last_notified_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    
+    # The id doubles as the sync token handed to clients of GET /api/sync
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(50), nullable=False)  # table name, e.g. contracts
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)  # upsert, delete
+    changed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        # Entity and row versions for conditional GETs (see ETagService)
+        Index("ix_change_log_entity_version", "entity", "id"),
+        Index("ix_change_log_row_version", "entity", "entity_id", "id"),
+    )
+
 class ScrapingLog(Base):
     __tablename__ = "scraping_logs"
     
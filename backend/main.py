@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from typing import List
 import os
@@ -8,8 +9,12 @@ from dotenv import load_dotenv
 
 from database.database import get_db, engine
 from database.models import Base
-from routers import contracts, prime_contractors, subcontractors, procurement_officers, communications, revenue_tracking, auth, dashboard
+from routers import contracts, prime_contractors, subcontractors, procurement_officers, communications, revenue_tracking, auth, dashboard, saved_searches, reports, imports, sync, cache, admin
 from auth.auth import authenticate_user, create_access_token
+from services.metrics_service import InstrumentationMiddleware, metrics_service
+from services.profiler_service import ProfilerMiddleware
+from services.query_budget import QueryBudgetMiddleware
+from services.serialization_service import InstrumentedORJSONResponse
 
 load_dotenv()
 
@@ -19,7 +24,8 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="KDP Global Contract Brokerage System",
     description="Federal contract brokerage database system for KDP Global Enterprises",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=InstrumentedORJSONResponse
 )
 
 # CORS middleware
@@ -33,8 +39,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination totals from count_service on list responses
+    expose_headers=["X-Total-Count", "X-Total-Count-Accuracy"],
 )
 
+# Request timing: /metrics histograms and a Server-Timing header on every response
+app.add_middleware(InstrumentationMiddleware)
+# On-demand (X-Profile: 1 from an admin) and sampled request profiles
+app.add_middleware(ProfilerMiddleware)
+# Development mode (QUERY_BUDGET_WARN): log requests that look like N+1 loops
+app.add_middleware(QueryBudgetMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(contracts.router, prefix="/api/contracts", tags=["contracts"])
@@ -44,6 +59,12 @@ app.include_router(procurement_officers.router, prefix="/api/procurement-officer
 app.include_router(communications.router, prefix="/api/communications", tags=["communications"])
 app.include_router(revenue_tracking.router, prefix="/api/revenue-tracking", tags=["revenue-tracking"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(saved_searches.router, prefix="/api/saved-searches", tags=["saved-searches"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(imports.router, prefix="/api/imports", tags=["imports"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
+app.include_router(cache.router, prefix="/api/cache", tags=["cache"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -53,6 +74,12 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint: per-route wall, DB and serialization histograms"""
+    return PlainTextResponse(metrics_service.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # The request profiler needs the standard asyncio loop, not uvloop
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="asyncio")
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""Backup command line.
+
+    python manage_backups.py backup [--full] [--target local|s3|drive]
+    python manage_backups.py list [--target ...]
+    python manage_backups.py restore [--backup-id ID] [--database-url URL] [--target ...]
+
+Run from the backend directory. Restore rebuilds every table as of the chosen
+backup (the latest one by default) inside a single transaction.
+"""
+import argparse
+import json
+from sqlalchemy import create_engine
+from database.database import DATABASE_URL, SessionLocal
+from services.backup_service import backup_service
+
+def main():
+    parser = argparse.ArgumentParser(description="KDP database backups")
+    parser.add_argument("--target", help="local, s3 or drive (defaults to BACKUP_TARGET)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backup = commands.add_parser("backup", help="take a backup")
+    backup.add_argument("--full", action="store_true", default=None, help="force a full snapshot")
+
+    commands.add_parser("list", help="list backups on the target")
+
+    restore = commands.add_parser("restore", help="restore a backup")
+    restore.add_argument("--backup-id", help="backup to restore (defaults to the latest)")
+    restore.add_argument("--database-url", default=DATABASE_URL, help="database to restore into")
+
+    args = parser.parse_args()
+    target = backup_service.get_target(args.target)
+
+    if args.command == "backup":
+        db = SessionLocal()
+        try:
+            result = backup_service.run(db, target, full=args.full)
+        finally:
+            db.close()
+    elif args.command == "list":
+        result = [
+            {
+                'id': manifest['id'],
+                'kind': manifest['kind'],
+                'parent': manifest['parent'],
+                'rows': manifest['stats']['rows'],
+                'bytes_uploaded': manifest['stats']['bytes_uploaded']
+            }
+            for manifest in backup_service.list_manifests(target)
+        ]
+    else:
+        engine = create_engine(args.database_url)
+        with engine.begin() as connection:
+            result = backup_service.restore(connection, target, backup_id=args.backup_id)
+
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
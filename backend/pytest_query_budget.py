@@ -0,0 +1,41 @@
+"""Pytest plugin: fail tests that run more SQL statements than they declare.
+
+``tests/conftest.py`` lists it in ``pytest_plugins``, so a plain ``pytest`` from
+backend/ loads it; declare budgets per test::
+
+    @pytest.mark.query_budget(max_statements=3, max_repeats=1)
+    def test_follow_up_reminders(client):
+        client.get("/api/communications/follow-ups")
+
+or around part of a test with the fixture::
+
+    def test_bulk_emails(query_budget):
+        with query_budget(max_repeats=2):
+            email_service.send_bulk_emails(...)
+
+``max_repeats`` bounds how often one statement fingerprint may run, which is
+what an N+1 loop breaks first. Only the test body is counted, not fixtures.
+"""
+import pytest
+from services.query_budget import query_budget as _query_budget
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_statements=None, max_repeats=None): fail the test when it runs more SQL statements than this"
+    )
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+    with _query_budget(label=item.nodeid, **marker.kwargs):
+        return (yield)
+
+@pytest.fixture
+def query_budget(request):
+    """``query_budget(max_statements=None, max_repeats=None)`` context manager labelled with the test id"""
+    def budget(max_statements=None, max_repeats=None):
+        return _query_budget(max_statements, max_repeats, label=request.node.nodeid)
+    return budget
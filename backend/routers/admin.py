@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from database.models import User
+from auth.auth import get_current_admin_user
+from services.slow_query_log import slow_query_log
+from services.profiler_service import profiler_service
+
+router = APIRouter()
+
+@router.get("/slow-queries")
+def read_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+    fingerprint: Optional[str] = Query(None, description="Only statements with this fingerprint"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Statements slower than SLOW_QUERY_THRESHOLD_MS, newest first, with a per-fingerprint summary"""
+    entries = slow_query_log.entries(fingerprint=fingerprint)
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "summary": slow_query_log.summary(entries),
+        "queries": entries[:limit]
+    }
+
+@router.delete("/slow-queries")
+def clear_slow_queries(
+    current_user: User = Depends(get_current_admin_user)
+):
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
+
+@router.get("/profiles")
+def read_profiles(
+    route: Optional[str] = Query(None, description="Route template, e.g. /api/contracts/"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Profiles stored by this worker, newest first.
+
+    Send X-Profile: 1 (or ?_profile=1) as an admin to profile a request; the
+    response's X-Profile-Id header names the profile.
+    """
+    return {
+        "interval_ms": profiler_service.interval * 1000,
+        "profiles": [profile.summary() for profile in profiler_service.profiles(route)]
+    }
+
+@router.get("/profiles/{profile_id}")
+def read_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|folded)$", description="json, or folded stacks for flame graph tools"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    profile = profiler_service.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found in this worker")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    return {**profile.summary(), "top": profile.top(), "folded": profile.folded()}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from database.models import User
+from auth.auth import get_current_active_user
+from services.cache_service import cache_service
+
+router = APIRouter()
+
+@router.get("/stats")
+def read_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Hits, stale hits, misses and hit ratio per cached endpoint, across all workers"""
+    return cache_service.stats()
@@ -1,31 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database.database import get_db
 from database.models import Communication, User
-from schemas.schemas import Communication as CommunicationSchema, CommunicationCreate, CommunicationUpdate
+from schemas.schemas import Communication as CommunicationSchema, CommunicationCreate, CommunicationUpdate, FollowUpReminder, CommunicationBulkUpdateItem, BulkCreate, BulkUpdate, BulkDelete, BulkResult, BatchGet, BatchGetResult
 from auth.auth import get_current_active_user
+from services.export_service import export_service
+from services.bulk_service import bulk_service
+from services.email_service import email_service
+from services.follow_up_scheduler import follow_up_scheduler
+from services.etag_service import conditional_get, conditional_get_row
+from services.serialization_service import serialization_service, sparse_fields
+from services.count_service import count_service
 
 router = APIRouter()
 
-@router.get("/", response_model=List[CommunicationSchema])
+def _filter_communications(query, contact_id, type):
+    if contact_id:
+        query = query.filter(Communication.contact_id == contact_id)
+    if type:
+        query = query.filter(Communication.type == type)
+    return query
+
+@router.get("/", response_model=List[CommunicationSchema], dependencies=[Depends(conditional_get("communications"))])
 def read_communications(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     contact_id: Optional[int] = Query(None, description="Filter by contact ID"),
     type: Optional[str] = Query(None, description="Filter by communication type"),
+    fields: Optional[tuple] = Depends(sparse_fields(CommunicationSchema)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(Communication)
-    
-    if contact_id:
-        query = query.filter(Communication.contact_id == contact_id)
-    if type:
-        query = query.filter(Communication.type == type)
-    
-    communications = query.offset(skip).limit(limit).all()
-    return communications
+    query = _filter_communications(serialization_service.select(db, Communication, CommunicationSchema, fields), contact_id, type)
+    total = count_service.headers(db, query, Communication)
+    return serialization_service.rows_response(request, query.offset(skip).limit(limit), CommunicationSchema, fields, headers=total)
+
+@router.get("/export")
+def export_communications(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx"),
+    contact_id: Optional[int] = Query(None, description="Filter by contact ID"),
+    type: Optional[str] = Query(None, description="Filter by communication type"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = _filter_communications(export_service.select_rows(db, Communication), contact_id, type)
+    return export_service.export_response(query.order_by(Communication.id), "communications", format)
+
+@router.get("/follow-ups", response_model=List[FollowUpReminder], dependencies=[Depends(conditional_get("communications", "procurement_officers", daily=True))])
+def read_follow_up_reminders(
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Officers whose latest follow-up is due, most overdue and strongest relationships first"""
+    return email_service.check_follow_up_reminders(db, skip=skip, limit=limit)
 
 @router.post("/", response_model=CommunicationSchema)
 def create_communication(
@@ -35,11 +66,54 @@ def create_communication(
 ):
     db_communication = Communication(**communication.dict())
     db.add(db_communication)
+    db.flush()
+    follow_up_scheduler.register(db, db_communication)
     db.commit()
     db.refresh(db_communication)
     return db_communication
 
-@router.get("/{communication_id}", response_model=CommunicationSchema)
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_communications(
+    request: BulkCreate[CommunicationCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    result = bulk_service.create(db, Communication, [item.dict() for item in request.items], request.all_or_nothing)
+    follow_up_scheduler.resync(db, bulk_service.succeeded_ids(result))
+    return result
+
+@router.patch("/bulk", response_model=BulkResult)
+def bulk_update_communications(
+    request: BulkUpdate[CommunicationBulkUpdateItem],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    result = bulk_service.update(db, Communication, [item.dict(exclude_unset=True) for item in request.items], request.all_or_nothing)
+    follow_up_scheduler.resync(db, bulk_service.succeeded_ids(result))
+    return result
+
+@router.delete("/bulk", response_model=BulkResult)
+def bulk_delete_communications(
+    request: BulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.delete(
+        db, Communication, request.ids, request.all_or_nothing,
+        before_delete=follow_up_scheduler.cancel_many
+    )
+
+@router.post("/batch-get", response_model=BatchGetResult[CommunicationSchema])
+def batch_get_communications(
+    batch: BatchGet,
+    request: Request,
+    fields: Optional[tuple] = Depends(sparse_fields(CommunicationSchema)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return serialization_service.response(request, serialization_service.batch_get(db, Communication, CommunicationSchema, batch.ids, fields))
+
+@router.get("/{communication_id}", response_model=CommunicationSchema, dependencies=[Depends(conditional_get_row("communications", "communication_id"))])
 def read_communication(
     communication_id: int,
     db: Session = Depends(get_db),
@@ -65,6 +139,10 @@ def update_communication(
     for field, value in update_data.items():
         setattr(communication, field, value)
     
+    if {'follow_up_date', 'date', 'contact_id'} & update_data.keys():
+        follow_up_scheduler.cancel(db, communication.id)
+        follow_up_scheduler.register(db, communication)
+    
     db.commit()
     db.refresh(communication)
     return communication
@@ -79,6 +157,7 @@ def delete_communication(
     if communication is None:
         raise HTTPException(status_code=404, detail="Communication not found")
     
+    follow_up_scheduler.cancel(db, communication.id)
     db.delete(communication)
     db.commit()
     return {"message": "Communication deleted successfully"}
\ No newline at end of file
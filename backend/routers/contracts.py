@@ -1,30 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 from typing import List, Optional
 from database.database import get_db
-from database.models import Contract, User
-from schemas.schemas import Contract as ContractSchema, ContractCreate, ContractUpdate
+from database.models import Contract, RevenueTracking, Subcontractor, User
+from schemas.schemas import Contract as ContractSchema, ContractWithRelations, RevenueTracking as RevenueTrackingSchema, Subcontractor as SubcontractorSchema, SubcontractorMatch, PortfolioFees, ContractCreate, ContractUpdate, ContractBulkUpdateItem, BulkCreate, BulkUpdate, BulkDelete, BulkResult, BatchGet, BatchGetResult
 from auth.auth import get_current_active_user
+from services.export_service import export_service
+from services.bulk_service import bulk_service
+from services.etag_service import conditional_get, conditional_get_row
+from services.serialization_service import serialization_service, sparse_fields, includes
+from services.count_service import count_service
+from services.cache_service import cache_service
+from services.subcontractor_matching import subcontractor_matching
+from services.fee_service import fee_service
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ContractSchema])
-def read_contracts(
-    skip: int = 0,
-    limit: int = 100,
-    naics_code: Optional[str] = Query(None, description="Filter by NAICS code"),
-    agency: Optional[str] = Query(None, description="Filter by agency"),
-    status: Optional[str] = Query(None, description="Filter by status"),
-    min_value: Optional[float] = Query(None, description="Minimum contract value"),
-    max_value: Optional[float] = Query(None, description="Maximum contract value"),
-    search: Optional[str] = Query(None, description="Search in title and notes"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    query = db.query(Contract)
-    
-    # Apply filters
+# Relations include= can nest in a contract: (schema, order within each contract)
+CONTRACT_INCLUDES = {
+    'revenue_tracking': (RevenueTrackingSchema, RevenueTracking.placement_date.desc())
+}
+
+def _filter_contracts(query, naics_code, agency, status, min_value, max_value, search):
     if naics_code:
         query = query.filter(Contract.naics_code == naics_code)
     if agency:
@@ -40,11 +41,63 @@ def read_contracts(
             Contract.title.ilike(f"%{search}%"),
             Contract.notes.ilike(f"%{search}%")
         ))
-    
-    contracts = query.offset(skip).limit(limit).all()
-    return contracts
+    return query
+
+def _queue_saved_search_matching(background_tasks: BackgroundTasks, contract_ids):
+    """Deliver new contracts to saved-search subscribers instead of making them poll.
+
+    Queued after the response is sent, so an unreachable broker never holds up the write.
+    """
+    if contract_ids:
+        background_tasks.add_task(_send_saved_search_matching, list(contract_ids))
+
+def _send_saved_search_matching(contract_ids):
+    try:
+        from tasks import match_saved_searches_task
+        # No publish retries and no result to track; a broker outage costs one connect timeout
+        match_saved_searches_task.apply_async((contract_ids,), retry=False)
+    except Exception as e:
+        logger.error(f"Failed to queue saved search matching for contracts {contract_ids}: {str(e)}")
+
+@router.get("/", response_model=List[ContractWithRelations], dependencies=[Depends(conditional_get("contracts", related=("revenue_tracking",)))])
+@cache_service.cached(tags=("contracts", "revenue_tracking"), ttl=300, stale_ttl=60)
+def read_contracts(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    naics_code: Optional[str] = Query(None, description="Filter by NAICS code"),
+    agency: Optional[str] = Query(None, description="Filter by agency"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    min_value: Optional[float] = Query(None, description="Minimum contract value"),
+    max_value: Optional[float] = Query(None, description="Maximum contract value"),
+    search: Optional[str] = Query(None, description="Search in title and notes"),
+    fields: Optional[tuple] = Depends(sparse_fields(ContractSchema)),
+    include: Optional[dict] = Depends(includes(CONTRACT_INCLUDES)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = _filter_contracts(serialization_service.select(db, Contract, ContractSchema, fields), naics_code, agency, status, min_value, max_value, search)
+    rows = serialization_service.rows(query.offset(skip).limit(limit), ContractSchema, fields)
+    total = count_service.headers(db, query, Contract)
+    return serialization_service.response(request, serialization_service.include_related(db, Contract, rows, include, CONTRACT_INCLUDES), headers=total)
+
+@router.get("/export")
+def export_contracts(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx"),
+    naics_code: Optional[str] = Query(None, description="Filter by NAICS code"),
+    agency: Optional[str] = Query(None, description="Filter by agency"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    min_value: Optional[float] = Query(None, description="Minimum contract value"),
+    max_value: Optional[float] = Query(None, description="Maximum contract value"),
+    search: Optional[str] = Query(None, description="Search in title and notes"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = _filter_contracts(export_service.select_rows(db, Contract), naics_code, agency, status, min_value, max_value, search)
+    return export_service.export_response(query.order_by(Contract.id), "contracts", format)
 
 @router.get("/naics-codes")
+@cache_service.cached(ttl=86400)
 def get_target_naics_codes():
     """Get the target NAICS codes for filtering"""
     return {
@@ -57,9 +110,27 @@ def get_target_naics_codes():
         ]
     }
 
+@router.get("/fees", response_model=PortfolioFees)
+def calculate_portfolio_fees(
+    request: Request,
+    naics_code: Optional[str] = Query(None, description="Filter by NAICS code"),
+    agency: Optional[str] = Query(None, description="Filter by agency"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    min_value: Optional[float] = Query(None, description="Minimum contract value"),
+    max_value: Optional[float] = Query(None, description="Maximum contract value"),
+    search: Optional[str] = Query(None, description="Search in title and notes"),
+    per_contract: bool = Query(True, description="Include each contract's fee, not just the totals"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Brokerage fees over every matching contract under the configured fee schedules"""
+    query = _filter_contracts(db.query(Contract), naics_code, agency, status, min_value, max_value, search)
+    return serialization_service.response(request, fee_service.portfolio(db, query, per_contract))
+
 @router.post("/", response_model=ContractSchema)
 def create_contract(
     contract: ContractCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -67,18 +138,88 @@ def create_contract(
     db.add(db_contract)
     db.commit()
     db.refresh(db_contract)
+    
+    _queue_saved_search_matching(background_tasks, [db_contract.id])
     return db_contract
 
-@router.get("/{contract_id}", response_model=ContractSchema)
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_contracts(
+    request: BulkCreate[ContractCreate],
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    result = bulk_service.create(db, Contract, [item.dict() for item in request.items], request.all_or_nothing)
+    _queue_saved_search_matching(background_tasks, bulk_service.succeeded_ids(result))
+    return result
+
+@router.patch("/bulk", response_model=BulkResult)
+def bulk_update_contracts(
+    request: BulkUpdate[ContractBulkUpdateItem],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.update(db, Contract, [item.dict(exclude_unset=True) for item in request.items], request.all_or_nothing)
+
+@router.delete("/bulk", response_model=BulkResult)
+def bulk_delete_contracts(
+    request: BulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.delete(db, Contract, request.ids, request.all_or_nothing)
+
+@router.post("/batch-get", response_model=BatchGetResult[ContractWithRelations])
+def batch_get_contracts(
+    batch: BatchGet,
+    request: Request,
+    fields: Optional[tuple] = Depends(sparse_fields(ContractSchema)),
+    include: Optional[dict] = Depends(includes(CONTRACT_INCLUDES)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    result = serialization_service.batch_get(db, Contract, ContractSchema, batch.ids, fields)
+    serialization_service.include_related(db, Contract, result['items'], include, CONTRACT_INCLUDES)
+    return serialization_service.response(request, result)
+
+@router.get("/{contract_id}", response_model=ContractWithRelations, dependencies=[Depends(conditional_get_row("contracts", "contract_id", related=("revenue_tracking",)))])
 def read_contract(
     contract_id: int,
+    request: Request,
+    include: Optional[dict] = Depends(includes(CONTRACT_INCLUDES)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    query = serialization_service.select(db, Contract, ContractSchema).filter(Contract.id == contract_id)
+    rows = serialization_service.rows(query, ContractSchema)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    serialization_service.include_related(db, Contract, rows, include, CONTRACT_INCLUDES)
+    return serialization_service.response(request, rows[0])
+
+@router.get("/{contract_id}/matches", response_model=List[SubcontractorMatch], dependencies=[Depends(conditional_get("contracts", "subcontractors"))])
+def match_subcontractors(
+    contract_id: int,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    min_rating: Optional[float] = Query(None, description="Minimum performance rating"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Subcontractors ranked by shared capabilities, certifications and NAICS, rating and coverage"""
     contract = db.query(Contract).filter(Contract.id == contract_id).first()
     if contract is None:
         raise HTTPException(status_code=404, detail="Contract not found")
-    return contract
+
+    matches = subcontractor_matching.matches(db, contract, limit, min_rating)
+    query = serialization_service.select(db, Subcontractor, SubcontractorSchema).filter(
+        Subcontractor.id.in_([match['subcontractor_id'] for match in matches])
+    )
+    subcontractors = {row['id']: row for row in serialization_service.rows(query, SubcontractorSchema)}
+    return serialization_service.response(request, [
+        {'subcontractor': subcontractors[match.pop('subcontractor_id')], **match}
+        for match in matches if match['subcontractor_id'] in subcontractors
+    ])
 
 @router.put("/{contract_id}", response_model=ContractSchema)
 def update_contract(
@@ -126,11 +267,12 @@ def calculate_brokerage_fee(
     if contract.value is None:
         raise HTTPException(status_code=400, detail="Contract value not set")
     
-    fee_amount = contract.value * 0.03  # 3% brokerage fee
+    schedule, fee_amount = fee_service.fee(contract.value, contract.naics_code, contract.agency)
     
     return {
         "contract_id": contract_id,
         "contract_value": contract.value,
-        "fee_percentage": 3.0,
+        "schedule": schedule,
+        "fee_percentage": round(fee_amount / contract.value * 100, 4) if contract.value else 0.0,
         "fee_amount": fee_amount
     }
\ No newline at end of file
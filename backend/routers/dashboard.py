@@ -1,117 +1,89 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from datetime import datetime, timedelta
-from typing import List
-from database.database import get_db
+from sqlalchemy import func
+from database.database import get_db, SessionLocal
 from database.models import Contract, RevenueTracking, PrimeContractor, ProcurementOfficer, User
-from schemas.schemas import DashboardStats
-from auth.auth import get_current_active_user
+from schemas.schemas import DashboardStats, Contract as ContractSchema, RevenueTracking as RevenueTrackingSchema
+from auth.auth import get_current_active_user, get_stream_user
+from services.dashboard_service import dashboard_service
+from services.event_bus import event_bus
+from services.etag_service import conditional_get
+from services.cache_service import cache_service
+from services.serialization_service import serialization_service
+from services.count_service import count_service
 
 router = APIRouter()
 
-@router.get("/stats", response_model=DashboardStats)
+@router.get("/stats", response_model=DashboardStats, dependencies=[Depends(conditional_get("contracts", "revenue_tracking"))])
+@cache_service.cached(tags=("contracts", "revenue_tracking"), ttl=300, stale_ttl=60, model=DashboardStats)
 def get_dashboard_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Total and active contracts
-    total_contracts = db.query(Contract).count()
-    active_contracts = db.query(Contract).filter(Contract.status == "active").count()
-    
-    # Total revenue
-    total_revenue_result = db.query(func.sum(RevenueTracking.fee_amount)).scalar()
-    total_revenue = total_revenue_result if total_revenue_result else 0.0
-    
-    # Success rate
-    total_placements = db.query(RevenueTracking).count()
-    success_rate = (total_placements / total_contracts * 100) if total_contracts > 0 else 0.0
-    
-    # Top agencies
-    top_agencies = db.query(
-        Contract.agency,
-        func.count(Contract.id).label('contract_count'),
-        func.sum(Contract.value).label('total_value')
-    ).group_by(Contract.agency).order_by(func.count(Contract.id).desc()).limit(5).all()
-    
-    top_agencies_list = [
-        {
-            "agency": agency,
-            "contract_count": count,
-            "total_value": total_value if total_value else 0
-        }
-        for agency, count, total_value in top_agencies
-    ]
-    
-    # Monthly revenue (last 12 months)
-    monthly_revenue = db.query(
-        extract('year', RevenueTracking.placement_date).label('year'),
-        extract('month', RevenueTracking.placement_date).label('month'),
-        func.sum(RevenueTracking.fee_amount).label('revenue')
-    ).group_by(
-        extract('year', RevenueTracking.placement_date),
-        extract('month', RevenueTracking.placement_date)
-    ).order_by(
-        extract('year', RevenueTracking.placement_date),
-        extract('month', RevenueTracking.placement_date)
-    ).limit(12).all()
-    
-    monthly_revenue_list = [
-        {
-            "year": int(year),
-            "month": int(month),
-            "revenue": float(revenue)
-        }
-        for year, month, revenue in monthly_revenue
-    ]
-    
-    # Opportunity pipeline (contracts by opportunity score)
-    opportunity_pipeline = db.query(
-        Contract.opportunity_score,
-        func.count(Contract.id).label('count'),
-        func.sum(Contract.value).label('total_value')
-    ).filter(
-        Contract.opportunity_score.isnot(None),
-        Contract.status == "active"
-    ).group_by(Contract.opportunity_score).order_by(Contract.opportunity_score.desc()).all()
-    
-    opportunity_pipeline_list = [
-        {
-            "score": score,
-            "count": count,
-            "total_value": total_value if total_value else 0
-        }
-        for score, count, total_value in opportunity_pipeline
-    ]
-    
-    return DashboardStats(
-        total_contracts=total_contracts,
-        active_contracts=active_contracts,
-        total_revenue=total_revenue,
-        success_rate=success_rate,
-        top_agencies=top_agencies_list,
-        monthly_revenue=monthly_revenue_list,
-        opportunity_pipeline=opportunity_pipeline_list
+    return dashboard_service.stats(db)
+
+def _current_stats():
+    stats = event_bus.cached_dashboard_stats()
+    if stats is None:
+        db = SessionLocal()
+        try:
+            stats = dashboard_service.stats(db)
+        finally:
+            db.close()
+        event_bus.cache_dashboard_stats(stats)
+    return stats
+
+async def _event_stream(request: Request):
+    async with event_bus.subscribe() as queue:
+        yield event_bus.sse_frame("dashboard.stats", await run_in_threadpool(_current_stats))
+        while not await request.is_disconnected():
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=event_bus.heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+@router.get("/stream")
+async def stream_dashboard(
+    request: Request,
+    current_user: User = Depends(get_stream_user)
+):
+    """Server-sent events: dashboard.stats, contract.created and revenue.created"""
+    return StreamingResponse(
+        _event_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-@router.get("/recent-activity")
+@router.get("/recent-activity", dependencies=[Depends(conditional_get("contracts", "revenue_tracking"))])
+@cache_service.cached(tags=("contracts", "revenue_tracking"), ttl=300, stale_ttl=60)
 def get_recent_activity(
+    request: Request,
     limit: int = 10,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Recent contracts
-    recent_contracts = db.query(Contract).order_by(Contract.created_at.desc()).limit(limit).all()
+    recent_contracts = serialization_service.rows(
+        serialization_service.select(db, Contract, ContractSchema).order_by(Contract.created_at.desc()).limit(limit),
+        ContractSchema
+    )
     
     # Recent revenue
-    recent_revenue = db.query(RevenueTracking).order_by(RevenueTracking.created_at.desc()).limit(limit).all()
+    recent_revenue = serialization_service.rows(
+        serialization_service.select(db, RevenueTracking, RevenueTrackingSchema).order_by(RevenueTracking.created_at.desc()).limit(limit),
+        RevenueTrackingSchema
+    )
     
-    return {
+    return serialization_service.response(request, {
         "recent_contracts": recent_contracts,
         "recent_revenue": recent_revenue
-    }
+    })
 
-@router.get("/performance-metrics")
+@router.get("/performance-metrics", dependencies=[Depends(conditional_get("contracts"))])
+@cache_service.cached(tags=("contracts",), ttl=300, stale_ttl=60)
 def get_performance_metrics(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -127,11 +99,11 @@ def get_performance_metrics(
     
     value_distribution = []
     for range_info in value_ranges:
-        query = db.query(Contract).filter(Contract.value >= range_info["min"])
+        query = db.query(Contract.id).filter(Contract.value >= range_info["min"])
         if range_info["max"]:
             query = query.filter(Contract.value < range_info["max"])
         
-        count = query.count()
+        count, _ = count_service.count(db, query, Contract, exact=True)
         value_distribution.append({
             "range": range_info["label"],
             "count": count
@@ -160,7 +132,8 @@ def get_performance_metrics(
         "naics_performance": naics_performance_list
     }
 
-@router.get("/relationship-health")
+@router.get("/relationship-health", dependencies=[Depends(conditional_get("prime_contractors", "procurement_officers"))])
+@cache_service.cached(tags=("prime_contractors", "procurement_officers"), ttl=300, stale_ttl=60)
 def get_relationship_health(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
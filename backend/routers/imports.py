@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from database.database import get_db
+from database.models import User
+from auth.auth import get_current_active_user
+from services.import_service import import_service, IMPORT_ENTITIES
+
+router = APIRouter()
+
+def _check_entity(entity: str):
+    if entity not in IMPORT_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown import entity '{entity}'")
+
+@router.post("/{entity}")
+def import_upload(
+    entity: str,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Import an uploaded CSV/XLSX file synchronously"""
+    _check_entity(entity)
+    return import_service.import_file(db, entity, file.file, file.filename or "upload.csv")
+
+@router.post("/{entity}/from-drive")
+def import_from_drive(
+    entity: str,
+    filename: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Queue an import of a file from the shared import folder"""
+    _check_entity(entity)
+    try:
+        import_service.resolve_local_file(filename)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Import file not found")
+    
+    from tasks import import_file_task
+    task = import_file_task.delay(entity, filename)
+    return {"task_id": task.id, "status": "queued"}
+
+@router.get("/jobs/{task_id}")
+def read_import_job(
+    task_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Progress (while running) or final result of a queued import"""
+    from tasks import celery_app
+    task = celery_app.AsyncResult(task_id)
+    return {
+        "task_id": task_id,
+        "state": task.state,
+        "result": task.info if isinstance(task.info, dict) else None
+    }
@@ -1,31 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database.database import get_db
 from database.models import PrimeContractor, User
-from schemas.schemas import PrimeContractor as PrimeContractorSchema, PrimeContractorCreate, PrimeContractorUpdate
+from schemas.schemas import PrimeContractor as PrimeContractorSchema, PrimeContractorCreate, PrimeContractorUpdate, PrimeContractorBulkUpdateItem, BulkCreate, BulkUpdate, BulkDelete, BulkResult, BatchGet, BatchGetResult
 from auth.auth import get_current_active_user
+from services.export_service import export_service
+from services.bulk_service import bulk_service
+from services.etag_service import conditional_get, conditional_get_row
+from services.serialization_service import serialization_service, sparse_fields
+from services.count_service import count_service
 
 router = APIRouter()
 
-@router.get("/", response_model=List[PrimeContractorSchema])
+def _filter_prime_contractors(query, relationship_status, search):
+    if relationship_status:
+        query = query.filter(PrimeContractor.relationship_status == relationship_status)
+    if search:
+        query = query.filter(PrimeContractor.company_name.ilike(f"%{search}%"))
+    return query
+
+@router.get("/", response_model=List[PrimeContractorSchema], dependencies=[Depends(conditional_get("prime_contractors"))])
 def read_prime_contractors(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     relationship_status: Optional[str] = Query(None, description="Filter by relationship status"),
     search: Optional[str] = Query(None, description="Search in company name"),
+    fields: Optional[tuple] = Depends(sparse_fields(PrimeContractorSchema)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(PrimeContractor)
-    
-    if relationship_status:
-        query = query.filter(PrimeContractor.relationship_status == relationship_status)
-    if search:
-        query = query.filter(PrimeContractor.company_name.ilike(f"%{search}%"))
-    
-    contractors = query.offset(skip).limit(limit).all()
-    return contractors
+    query = _filter_prime_contractors(serialization_service.select(db, PrimeContractor, PrimeContractorSchema, fields), relationship_status, search)
+    total = count_service.headers(db, query, PrimeContractor)
+    return serialization_service.rows_response(request, query.offset(skip).limit(limit), PrimeContractorSchema, fields, headers=total)
+
+@router.get("/export")
+def export_prime_contractors(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx"),
+    relationship_status: Optional[str] = Query(None, description="Filter by relationship status"),
+    search: Optional[str] = Query(None, description="Search in company name"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = _filter_prime_contractors(export_service.select_rows(db, PrimeContractor), relationship_status, search)
+    return export_service.export_response(query.order_by(PrimeContractor.id), "prime_contractors", format)
 
 @router.post("/", response_model=PrimeContractorSchema)
 def create_prime_contractor(
@@ -39,7 +58,41 @@ def create_prime_contractor(
     db.refresh(db_contractor)
     return db_contractor
 
-@router.get("/{contractor_id}", response_model=PrimeContractorSchema)
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_prime_contractors(
+    request: BulkCreate[PrimeContractorCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.create(db, PrimeContractor, [item.dict() for item in request.items], request.all_or_nothing)
+
+@router.patch("/bulk", response_model=BulkResult)
+def bulk_update_prime_contractors(
+    request: BulkUpdate[PrimeContractorBulkUpdateItem],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.update(db, PrimeContractor, [item.dict(exclude_unset=True) for item in request.items], request.all_or_nothing)
+
+@router.delete("/bulk", response_model=BulkResult)
+def bulk_delete_prime_contractors(
+    request: BulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.delete(db, PrimeContractor, request.ids, request.all_or_nothing)
+
+@router.post("/batch-get", response_model=BatchGetResult[PrimeContractorSchema])
+def batch_get_prime_contractors(
+    batch: BatchGet,
+    request: Request,
+    fields: Optional[tuple] = Depends(sparse_fields(PrimeContractorSchema)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return serialization_service.response(request, serialization_service.batch_get(db, PrimeContractor, PrimeContractorSchema, batch.ids, fields))
+
+@router.get("/{contractor_id}", response_model=PrimeContractorSchema, dependencies=[Depends(conditional_get_row("prime_contractors", "contractor_id"))])
 def read_prime_contractor(
     contractor_id: int,
     db: Session = Depends(get_db),
@@ -1,31 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database.database import get_db
-from database.models import ProcurementOfficer, User
-from schemas.schemas import ProcurementOfficer as ProcurementOfficerSchema, ProcurementOfficerCreate, ProcurementOfficerUpdate
+from database.models import Communication, ProcurementOfficer, User
+from schemas.schemas import ProcurementOfficer as ProcurementOfficerSchema, ProcurementOfficerWithRelations, Communication as CommunicationSchema, ProcurementOfficerCreate, ProcurementOfficerUpdate, ProcurementOfficerBulkUpdateItem, BulkCreate, BulkUpdate, BulkDelete, BulkResult, BatchGet, BatchGetResult
 from auth.auth import get_current_active_user
+from services.export_service import export_service
+from services.bulk_service import bulk_service
+from services.etag_service import conditional_get, conditional_get_row
+from services.serialization_service import serialization_service, sparse_fields, includes
+from services.count_service import count_service
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ProcurementOfficerSchema])
+# Relations include= can nest in an officer: (schema, order within each officer)
+OFFICER_INCLUDES = {
+    'communications': (CommunicationSchema, Communication.date.desc())
+}
+
+def _filter_procurement_officers(query, agency, search):
+    if agency:
+        query = query.filter(ProcurementOfficer.agency.ilike(f"%{agency}%"))
+    if search:
+        query = query.filter(ProcurementOfficer.name.ilike(f"%{search}%"))
+    return query
+
+@router.get("/", response_model=List[ProcurementOfficerWithRelations], dependencies=[Depends(conditional_get("procurement_officers", related=("communications",)))])
 def read_procurement_officers(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     agency: Optional[str] = Query(None, description="Filter by agency"),
     search: Optional[str] = Query(None, description="Search in name"),
+    fields: Optional[tuple] = Depends(sparse_fields(ProcurementOfficerSchema)),
+    include: Optional[dict] = Depends(includes(OFFICER_INCLUDES)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(ProcurementOfficer)
-    
-    if agency:
-        query = query.filter(ProcurementOfficer.agency.ilike(f"%{agency}%"))
-    if search:
-        query = query.filter(ProcurementOfficer.name.ilike(f"%{search}%"))
-    
-    officers = query.offset(skip).limit(limit).all()
-    return officers
+    query = _filter_procurement_officers(serialization_service.select(db, ProcurementOfficer, ProcurementOfficerSchema, fields), agency, search)
+    rows = serialization_service.rows(query.offset(skip).limit(limit), ProcurementOfficerSchema, fields)
+    total = count_service.headers(db, query, ProcurementOfficer)
+    return serialization_service.response(request, serialization_service.include_related(db, ProcurementOfficer, rows, include, OFFICER_INCLUDES), headers=total)
+
+@router.get("/export")
+def export_procurement_officers(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx"),
+    agency: Optional[str] = Query(None, description="Filter by agency"),
+    search: Optional[str] = Query(None, description="Search in name"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = _filter_procurement_officers(export_service.select_rows(db, ProcurementOfficer), agency, search)
+    return export_service.export_response(query.order_by(ProcurementOfficer.id), "procurement_officers", format)
 
 @router.post("/", response_model=ProcurementOfficerSchema)
 def create_procurement_officer(
@@ -39,16 +65,58 @@ def create_procurement_officer(
     db.refresh(db_officer)
     return db_officer
 
-@router.get("/{officer_id}", response_model=ProcurementOfficerSchema)
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_procurement_officers(
+    request: BulkCreate[ProcurementOfficerCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.create(db, ProcurementOfficer, [item.dict() for item in request.items], request.all_or_nothing)
+
+@router.patch("/bulk", response_model=BulkResult)
+def bulk_update_procurement_officers(
+    request: BulkUpdate[ProcurementOfficerBulkUpdateItem],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.update(db, ProcurementOfficer, [item.dict(exclude_unset=True) for item in request.items], request.all_or_nothing)
+
+@router.delete("/bulk", response_model=BulkResult)
+def bulk_delete_procurement_officers(
+    request: BulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.delete(db, ProcurementOfficer, request.ids, request.all_or_nothing)
+
+@router.post("/batch-get", response_model=BatchGetResult[ProcurementOfficerWithRelations])
+def batch_get_procurement_officers(
+    batch: BatchGet,
+    request: Request,
+    fields: Optional[tuple] = Depends(sparse_fields(ProcurementOfficerSchema)),
+    include: Optional[dict] = Depends(includes(OFFICER_INCLUDES)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    result = serialization_service.batch_get(db, ProcurementOfficer, ProcurementOfficerSchema, batch.ids, fields)
+    serialization_service.include_related(db, ProcurementOfficer, result['items'], include, OFFICER_INCLUDES)
+    return serialization_service.response(request, result)
+
+@router.get("/{officer_id}", response_model=ProcurementOfficerWithRelations, dependencies=[Depends(conditional_get_row("procurement_officers", "officer_id", related=("communications",)))])
 def read_procurement_officer(
     officer_id: int,
+    request: Request,
+    include: Optional[dict] = Depends(includes(OFFICER_INCLUDES)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    officer = db.query(ProcurementOfficer).filter(ProcurementOfficer.id == officer_id).first()
-    if officer is None:
+    """Officer profile; ``include=communications`` nests the latest communications in the same call"""
+    query = serialization_service.select(db, ProcurementOfficer, ProcurementOfficerSchema).filter(ProcurementOfficer.id == officer_id)
+    rows = serialization_service.rows(query, ProcurementOfficerSchema)
+    if not rows:
         raise HTTPException(status_code=404, detail="Procurement officer not found")
-    return officer
+    serialization_service.include_related(db, ProcurementOfficer, rows, include, OFFICER_INCLUDES)
+    return serialization_service.response(request, rows[0])
 
 @router.put("/{officer_id}", response_model=ProcurementOfficerSchema)
 def update_procurement_officer(
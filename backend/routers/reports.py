@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+from database.database import get_db
+from database.models import User
+from auth.auth import get_current_active_user
+from services.reporting_service import reporting_service, BREAKDOWNS
+
+router = APIRouter()
+
+@router.get("/performance")
+def get_performance_report(
+    start: Optional[datetime] = Query(None, description="Period start (defaults to 7 days ago)"),
+    end: Optional[datetime] = Query(None, description="Period end (defaults to now)"),
+    breakdown: Optional[str] = Query(None, description="Break down by 'agency' or 'naics' (default: both)"),
+    format: str = Query("json", pattern="^(json|csv|html)$", description="json, csv or html"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    if breakdown is not None and breakdown not in BREAKDOWNS:
+        raise HTTPException(status_code=400, detail=f"Unknown breakdown '{breakdown}'")
+    
+    default_start, default_end = reporting_service.default_period()
+    start = start or default_start
+    end = end or default_end
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Period start must be before its end")
+    
+    if format == "csv":
+        dimension = breakdown or "agency"
+        rows = reporting_service.breakdown(db, start, end, dimension)
+        filename = f"performance_by_{dimension}_{end.strftime('%Y%m%d')}.csv"
+        return StreamingResponse(
+            reporting_service.iter_csv(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+    
+    report = reporting_service.build_report(db, start, end, [breakdown] if breakdown else None)
+    if format == "html":
+        return StreamingResponse(reporting_service.iter_html(report), media_type="text/html")
+    
+    return report
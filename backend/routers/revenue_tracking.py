@@ -1,28 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database.database import get_db
 from database.models import RevenueTracking, User
-from schemas.schemas import RevenueTracking as RevenueTrackingSchema, RevenueTrackingCreate, RevenueTrackingUpdate
+from schemas.schemas import RevenueTracking as RevenueTrackingSchema, RevenueTrackingCreate, RevenueTrackingUpdate, RevenueTrackingBulkUpdateItem, BulkCreate, BulkUpdate, BulkDelete, BulkResult, BatchGet, BatchGetResult
 from auth.auth import get_current_active_user
+from services.export_service import export_service
+from services.bulk_service import bulk_service
+from services.etag_service import conditional_get, conditional_get_row
+from services.serialization_service import serialization_service, sparse_fields
+from services.count_service import count_service
 
 router = APIRouter()
 
-@router.get("/", response_model=List[RevenueTrackingSchema])
+def _filter_revenue_tracking(query, contract_id):
+    if contract_id:
+        query = query.filter(RevenueTracking.contract_id == contract_id)
+    return query
+
+@router.get("/", response_model=List[RevenueTrackingSchema], dependencies=[Depends(conditional_get("revenue_tracking"))])
 def read_revenue_tracking(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     contract_id: Optional[int] = Query(None, description="Filter by contract ID"),
+    fields: Optional[tuple] = Depends(sparse_fields(RevenueTrackingSchema)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(RevenueTracking)
-    
-    if contract_id:
-        query = query.filter(RevenueTracking.contract_id == contract_id)
-    
-    revenue_records = query.offset(skip).limit(limit).all()
-    return revenue_records
+    query = _filter_revenue_tracking(serialization_service.select(db, RevenueTracking, RevenueTrackingSchema, fields), contract_id)
+    total = count_service.headers(db, query, RevenueTracking)
+    return serialization_service.rows_response(request, query.offset(skip).limit(limit), RevenueTrackingSchema, fields, headers=total)
+
+@router.get("/export")
+def export_revenue_tracking(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx"),
+    contract_id: Optional[int] = Query(None, description="Filter by contract ID"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = _filter_revenue_tracking(export_service.select_rows(db, RevenueTracking), contract_id)
+    return export_service.export_response(query.order_by(RevenueTracking.id), "revenue_tracking", format)
 
 @router.post("/", response_model=RevenueTrackingSchema)
 def create_revenue_tracking(
@@ -36,7 +54,41 @@ def create_revenue_tracking(
     db.refresh(db_revenue)
     return db_revenue
 
-@router.get("/{revenue_id}", response_model=RevenueTrackingSchema)
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_revenue_tracking(
+    request: BulkCreate[RevenueTrackingCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.create(db, RevenueTracking, [item.dict() for item in request.items], request.all_or_nothing)
+
+@router.patch("/bulk", response_model=BulkResult)
+def bulk_update_revenue_tracking(
+    request: BulkUpdate[RevenueTrackingBulkUpdateItem],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.update(db, RevenueTracking, [item.dict(exclude_unset=True) for item in request.items], request.all_or_nothing)
+
+@router.delete("/bulk", response_model=BulkResult)
+def bulk_delete_revenue_tracking(
+    request: BulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.delete(db, RevenueTracking, request.ids, request.all_or_nothing)
+
+@router.post("/batch-get", response_model=BatchGetResult[RevenueTrackingSchema])
+def batch_get_revenue_tracking(
+    batch: BatchGet,
+    request: Request,
+    fields: Optional[tuple] = Depends(sparse_fields(RevenueTrackingSchema)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return serialization_service.response(request, serialization_service.batch_get(db, RevenueTracking, RevenueTrackingSchema, batch.ids, fields))
+
+@router.get("/{revenue_id}", response_model=RevenueTrackingSchema, dependencies=[Depends(conditional_get_row("revenue_tracking", "revenue_id"))])
 def read_revenue_tracking_record(
     revenue_id: int,
     db: Session = Depends(get_db),
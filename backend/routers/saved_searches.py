@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from database.database import get_db
+from database.models import SavedSearch, User
+from schemas.schemas import SavedSearch as SavedSearchSchema, SavedSearchCreate, SavedSearchUpdate
+from auth.auth import get_current_active_user
+
+router = APIRouter()
+
+@router.get("/", response_model=List[SavedSearchSchema])
+def read_saved_searches(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return db.query(SavedSearch).filter(SavedSearch.user_id == current_user.id).all()
+
+@router.post("/", response_model=SavedSearchSchema)
+def create_saved_search(
+    saved_search: SavedSearchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    db_saved_search = SavedSearch(**saved_search.dict(), user_id=current_user.id)
+    db.add(db_saved_search)
+    db.commit()
+    db.refresh(db_saved_search)
+    return db_saved_search
+
+@router.get("/{saved_search_id}", response_model=SavedSearchSchema)
+def read_saved_search(
+    saved_search_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    saved_search = db.query(SavedSearch).filter(
+        SavedSearch.id == saved_search_id,
+        SavedSearch.user_id == current_user.id
+    ).first()
+    if saved_search is None:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return saved_search
+
+@router.put("/{saved_search_id}", response_model=SavedSearchSchema)
+def update_saved_search(
+    saved_search_id: int,
+    saved_search_update: SavedSearchUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    saved_search = db.query(SavedSearch).filter(
+        SavedSearch.id == saved_search_id,
+        SavedSearch.user_id == current_user.id
+    ).first()
+    if saved_search is None:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    
+    update_data = saved_search_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(saved_search, field, value)
+    
+    db.commit()
+    db.refresh(saved_search)
+    return saved_search
+
+@router.delete("/{saved_search_id}")
+def delete_saved_search(
+    saved_search_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    saved_search = db.query(SavedSearch).filter(
+        SavedSearch.id == saved_search_id,
+        SavedSearch.user_id == current_user.id
+    ).first()
+    if saved_search is None:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    
+    db.delete(saved_search)
+    db.commit()
+    return {"message": "Saved search deleted successfully"}
@@ -1,28 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database.database import get_db
 from database.models import Subcontractor, User
-from schemas.schemas import Subcontractor as SubcontractorSchema, SubcontractorCreate, SubcontractorUpdate
+from schemas.schemas import Subcontractor as SubcontractorSchema, SubcontractorCreate, SubcontractorUpdate, SubcontractorBulkUpdateItem, BulkCreate, BulkUpdate, BulkDelete, BulkResult, BatchGet, BatchGetResult
 from auth.auth import get_current_active_user
+from services.export_service import export_service
+from services.bulk_service import bulk_service
+from services.etag_service import conditional_get, conditional_get_row
+from services.serialization_service import serialization_service, sparse_fields
+from services.count_service import count_service
 
 router = APIRouter()
 
-@router.get("/", response_model=List[SubcontractorSchema])
+def _filter_subcontractors(query, search):
+    if search:
+        query = query.filter(Subcontractor.company_name.ilike(f"%{search}%"))
+    return query
+
+@router.get("/", response_model=List[SubcontractorSchema], dependencies=[Depends(conditional_get("subcontractors"))])
 def read_subcontractors(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = Query(None, description="Search in company name"),
+    fields: Optional[tuple] = Depends(sparse_fields(SubcontractorSchema)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(Subcontractor)
-    
-    if search:
-        query = query.filter(Subcontractor.company_name.ilike(f"%{search}%"))
-    
-    subcontractors = query.offset(skip).limit(limit).all()
-    return subcontractors
+    query = _filter_subcontractors(serialization_service.select(db, Subcontractor, SubcontractorSchema, fields), search)
+    total = count_service.headers(db, query, Subcontractor)
+    return serialization_service.rows_response(request, query.offset(skip).limit(limit), SubcontractorSchema, fields, headers=total)
+
+@router.get("/export")
+def export_subcontractors(
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx"),
+    search: Optional[str] = Query(None, description="Search in company name"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = _filter_subcontractors(export_service.select_rows(db, Subcontractor), search)
+    return export_service.export_response(query.order_by(Subcontractor.id), "subcontractors", format)
 
 @router.post("/", response_model=SubcontractorSchema)
 def create_subcontractor(
@@ -36,7 +54,41 @@ def create_subcontractor(
     db.refresh(db_subcontractor)
     return db_subcontractor
 
-@router.get("/{subcontractor_id}", response_model=SubcontractorSchema)
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_subcontractors(
+    request: BulkCreate[SubcontractorCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.create(db, Subcontractor, [item.dict() for item in request.items], request.all_or_nothing)
+
+@router.patch("/bulk", response_model=BulkResult)
+def bulk_update_subcontractors(
+    request: BulkUpdate[SubcontractorBulkUpdateItem],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.update(db, Subcontractor, [item.dict(exclude_unset=True) for item in request.items], request.all_or_nothing)
+
+@router.delete("/bulk", response_model=BulkResult)
+def bulk_delete_subcontractors(
+    request: BulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return bulk_service.delete(db, Subcontractor, request.ids, request.all_or_nothing)
+
+@router.post("/batch-get", response_model=BatchGetResult[SubcontractorSchema])
+def batch_get_subcontractors(
+    batch: BatchGet,
+    request: Request,
+    fields: Optional[tuple] = Depends(sparse_fields(SubcontractorSchema)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return serialization_service.response(request, serialization_service.batch_get(db, Subcontractor, SubcontractorSchema, batch.ids, fields))
+
+@router.get("/{subcontractor_id}", response_model=SubcontractorSchema, dependencies=[Depends(conditional_get_row("subcontractors", "subcontractor_id"))])
 def read_subcontractor(
     subcontractor_id: int,
     db: Session = Depends(get_db),
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from database.database import get_db
+from database.models import User
+from schemas.schemas import SyncChanges
+from auth.auth import get_current_active_user
+from services.change_feed import change_feed, TokenExpired, TRACKED_MODELS
+
+router = APIRouter()
+
+@router.get("/", response_model=SyncChanges)
+def read_changes(
+    since: Optional[int] = Query(None, ge=0, description="Token from the previous response"),
+    entities: Optional[str] = Query(None, description="Comma-separated table names, e.g. contracts,communications"),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Changes since a token.
+
+    Without ``since`` only the current token is returned: take it before
+    loading the lists, then poll with it. Keep polling right away while
+    ``has_more`` is true. A 410 means the token is older than the retained
+    log and the lists must be reloaded.
+    """
+    selected = None
+    if entities:
+        selected = [entity.strip() for entity in entities.split(",") if entity.strip()]
+        unknown = [entity for entity in selected if entity not in TRACKED_MODELS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown entities: {', '.join(unknown)}")
+
+    if since is None:
+        return {"token": change_feed.latest_token(db), "has_more": False, "changes": {}}
+
+    try:
+        return change_feed.changes(db, since, limit=limit, entities=selected)
+    except TokenExpired:
+        raise HTTPException(status_code=410, detail="Sync token expired, reload and start from a new token")
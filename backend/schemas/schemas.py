@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Any, Dict, Optional, List, Generic, TypeVar
 from datetime import datetime, date
 
 # Contract Schemas
@@ -94,6 +94,35 @@ class Subcontractor(SubcontractorBase):
     class Config:
         from_attributes = True
 
+class SubcontractorMatch(BaseModel):
+    subcontractor: Subcontractor
+    score: float
+    overlap: float  # share of the contract's weighted terms the subcontractor covers
+    matched_terms: List[str]
+    geographic_match: Optional[bool] = None  # None when the contract names no location
+
+# Fee Schemas
+class ContractFee(BaseModel):
+    contract_id: int
+    contract_value: float
+    schedule: str
+    fee_amount: float
+    fee_percentage: float  # effective rate of the tiered schedule
+
+class ScheduleFeeTotal(BaseModel):
+    contracts: int
+    total_value: float
+    total_fee: float
+
+class PortfolioFees(BaseModel):
+    contracts: int
+    unvalued_contracts: int
+    total_value: float
+    total_fee: float
+    effective_rate: Optional[float] = None
+    by_schedule: Dict[str, ScheduleFeeTotal]
+    results: Optional[List[ContractFee]] = None
+
 # Procurement Officer Schemas
 class ProcurementOfficerBase(BaseModel):
     name: str
@@ -137,12 +166,13 @@ class CommunicationCreate(CommunicationBase):
     pass
 
 class CommunicationUpdate(BaseModel):
+    # Declared before the `date` field, whose default would otherwise shadow the `date` type
+    follow_up_date: Optional[date] = None
     contact_id: Optional[int] = None
     date: Optional[datetime] = None
     type: Optional[str] = None
     subject: Optional[str] = None
     outcome: Optional[str] = None
-    follow_up_date: Optional[date] = None
 
 class Communication(CommunicationBase):
     id: int
@@ -151,6 +181,16 @@ class Communication(CommunicationBase):
     class Config:
         from_attributes = True
 
+class FollowUpReminder(BaseModel):
+    communication_id: int
+    officer_id: int
+    officer_name: str
+    agency: str
+    relationship_strength: Optional[int] = None
+    last_contact: datetime
+    follow_up_date: date
+    days_overdue: int
+
 # Revenue Tracking Schemas
 class RevenueTrackingBase(BaseModel):
     contract_id: int
@@ -174,6 +214,13 @@ class RevenueTracking(RevenueTrackingBase):
     class Config:
         from_attributes = True
 
+# Responses with related collections embedded through include=
+class ContractWithRelations(Contract):
+    revenue_tracking: Optional[List[RevenueTracking]] = None
+
+class ProcurementOfficerWithRelations(ProcurementOfficer):
+    communications: Optional[List[Communication]] = None
+
 # User Schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -217,6 +264,107 @@ class EmailTemplate(EmailTemplateBase):
     class Config:
         from_attributes = True
 
+# Saved Search Schemas
+class SavedSearchBase(BaseModel):
+    name: str
+    naics_code: Optional[str] = None
+    agency: Optional[str] = None
+    status: Optional[str] = None
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    search: Optional[str] = None
+    is_active: bool = True
+
+class SavedSearchCreate(SavedSearchBase):
+    pass
+
+class SavedSearchUpdate(BaseModel):
+    name: Optional[str] = None
+    naics_code: Optional[str] = None
+    agency: Optional[str] = None
+    status: Optional[str] = None
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    search: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class SavedSearch(SavedSearchBase):
+    id: int
+    user_id: int
+    last_notified_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Bulk Operation Schemas
+BULK_MAX_ITEMS = 10000
+
+ItemT = TypeVar("ItemT")
+
+class BulkCreate(BaseModel, Generic[ItemT]):
+    items: List[ItemT] = Field(..., max_length=BULK_MAX_ITEMS)
+    all_or_nothing: bool = False
+
+class BulkUpdate(BaseModel, Generic[ItemT]):
+    items: List[ItemT] = Field(..., max_length=BULK_MAX_ITEMS)
+    all_or_nothing: bool = False
+
+class BulkDelete(BaseModel):
+    ids: List[int] = Field(..., max_length=BULK_MAX_ITEMS)
+    all_or_nothing: bool = False
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # created, updated, deleted, not_found, error, rolled_back
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    all_or_nothing: bool
+    results: List[BulkItemResult]
+
+# Batch Get Schemas
+BATCH_GET_MAX_IDS = 1000
+
+class BatchGet(BaseModel):
+    ids: List[int] = Field(..., max_length=BATCH_GET_MAX_IDS)
+
+class BatchGetResult(BaseModel, Generic[ItemT]):
+    items: List[ItemT]  # in request order, each id once
+    missing: List[int]
+
+class ContractBulkUpdateItem(ContractUpdate):
+    id: int
+
+class PrimeContractorBulkUpdateItem(PrimeContractorUpdate):
+    id: int
+
+class SubcontractorBulkUpdateItem(SubcontractorUpdate):
+    id: int
+
+class ProcurementOfficerBulkUpdateItem(ProcurementOfficerUpdate):
+    id: int
+
+class CommunicationBulkUpdateItem(CommunicationUpdate):
+    id: int
+
+class RevenueTrackingBulkUpdateItem(RevenueTrackingUpdate):
+    id: int
+
+# Sync Schemas
+class EntityChanges(BaseModel):
+    upserted: List[Dict[str, Any]] = []
+    deleted: List[int] = []
+
+class SyncChanges(BaseModel):
+    token: int
+    has_more: bool
+    changes: Dict[str, EntityChanges]
+
 # Dashboard Schemas
 class DashboardStats(BaseModel):
     total_contracts: int
@@ -0,0 +1,180 @@
+import re
+import time
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy.orm import Session
+from database.models import Agency, AgencyAlias, ProcurementOfficer
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Abbreviations expanded before matching, so "Dept. of the Navy" == "Department of Navy"
+ABBREVIATIONS = {
+    'dept': 'department',
+    'dep': 'department',
+    'admin': 'administration',
+    'adm': 'administration',
+    'natl': 'national',
+    'svc': 'service',
+    'svcs': 'services',
+    'cmd': 'command',
+    'gov': 'government',
+    'govt': 'government',
+    'co': 'county',
+}
+
+# Words that carry no routing signal
+STOPWORDS = {'of', 'the', 'for', 'and', 'us', 'u', 's', 'united', 'states'}
+
+# Segment separators in hierarchical names, e.g. "Department of Defense - Navy"
+SEGMENT_SEPARATORS = re.compile(r'\s+-\s+|[/|:;,>]')
+
+# Well-known acronyms; the agency_aliases table adds to these
+DEFAULT_AGENCY_ALIASES = {
+    'DOD': 'Department of Defense',
+    'DHS': 'Department of Homeland Security',
+    'DOT': 'Department of Transportation',
+    'DOE': 'Department of Energy',
+    'DOJ': 'Department of Justice',
+    'VA': 'Department of Veterans Affairs',
+    'GSA': 'General Services Administration',
+    'USACE': 'Army Corps of Engineers',
+    'DLA': 'Defense Logistics Agency',
+    'NAVSEA': 'Naval Sea Systems Command',
+    'USN': 'Department of the Navy',
+    'Navy': 'Department of the Navy',
+    'USA': 'Department of the Army',
+    'Army': 'Department of the Army',
+    'USAF': 'Department of the Air Force',
+    'Air Force': 'Department of the Air Force',
+    'USCG': 'Coast Guard',
+    'FEMA': 'Federal Emergency Management Agency',
+    'NASA': 'National Aeronautics and Space Administration',
+}
+
+def normalize_agency_name(name: Optional[str]) -> str:
+    """Reduce an agency name to a comparable key"""
+    if not name:
+        return ''
+
+    text = name.lower().replace('&', ' and ')
+    text = re.sub(r'[^a-z0-9\s]', ' ', text)
+
+    words = []
+    for word in text.split():
+        word = ABBREVIATIONS.get(word, word)
+        if word not in STOPWORDS:
+            words.append(word)
+
+    return ' '.join(words)
+
+class AgencyRoutingIndex:
+    """In-memory map from normalized agency key to the officers who should hear about it"""
+
+    def __init__(self, aliases: Dict[str, str]):
+        self.aliases = aliases
+        self.officers_by_agency: Dict[str, Set[int]] = {}
+        self.built_at = time.monotonic()
+
+    def canonical(self, name: str) -> str:
+        key = normalize_agency_name(name)
+        return self.aliases.get(key, key)
+
+    def keys_for(self, agency: str) -> Set[str]:
+        """Every key an agency name should be reachable under: full name, segments and prefixes"""
+        keys = {self.canonical(agency)}
+
+        segments = [segment for segment in SEGMENT_SEPARATORS.split(agency) if segment.strip()]
+        for position, segment in enumerate(segments):
+            keys.add(self.canonical(segment))
+            keys.add(self.canonical(' '.join(segments[:position + 1])))
+
+        keys.discard('')
+        return keys
+
+    def add_officer(self, officer_id: int, agency: str):
+        for key in self.keys_for(agency):
+            self.officers_by_agency.setdefault(key, set()).add(officer_id)
+
+    def officers_for(self, agency: str) -> Set[int]:
+        return set(self.officers_by_agency.get(self.canonical(agency), ()))
+
+class AgencyRoutingService:
+    def __init__(self):
+        self.ttl_seconds = int(os.getenv("AGENCY_ROUTING_TTL_SECONDS", "300"))
+        self._index: Optional[AgencyRoutingIndex] = None
+        self._lock = threading.Lock()
+
+    def load_aliases(self, db: Session) -> Dict[str, str]:
+        """Normalized alias -> normalized canonical agency name"""
+        aliases = {
+            normalize_agency_name(alias): normalize_agency_name(canonical)
+            for alias, canonical in DEFAULT_AGENCY_ALIASES.items()
+        }
+
+        rows = db.query(AgencyAlias.normalized_alias, Agency.normalized_name).join(
+            Agency, Agency.id == AgencyAlias.agency_id
+        ).all()
+        aliases.update({alias: canonical for alias, canonical in rows})
+
+        return aliases
+
+    def build_index(self, db: Session) -> AgencyRoutingIndex:
+        """Build the routing index with one alias query and one officer query"""
+        index = AgencyRoutingIndex(self.load_aliases(db))
+
+        officers = db.query(ProcurementOfficer.id, ProcurementOfficer.agency).filter(
+            ProcurementOfficer.email.isnot(None)
+        ).execution_options(yield_per=1000)
+
+        for officer_id, agency in officers:
+            index.add_officer(officer_id, agency)
+
+        logger.info(f"Agency routing index built with {len(index.officers_by_agency)} agency keys")
+        return index
+
+    def get_index(self, db: Session, refresh: bool = False) -> AgencyRoutingIndex:
+        """Cached routing index, rebuilt once it is older than the TTL"""
+        with self._lock:
+            stale = self._index is None or time.monotonic() - self._index.built_at > self.ttl_seconds
+            if refresh or stale:
+                self._index = self.build_index(db)
+            return self._index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    def route(self, db: Session, contracts: Iterable, refresh: bool = False) -> Dict[int, List]:
+        """Group contracts by recipient officer: officer_id -> [contract, ...]"""
+        index = self.get_index(db, refresh=refresh)
+
+        recipients: Dict[int, List] = {}
+        for contract in contracts:
+            for officer_id in index.officers_for(contract.agency):
+                recipients.setdefault(officer_id, []).append(contract)
+
+        return recipients
+
+    def add_alias(self, db: Session, alias: str, canonical_name: str) -> AgencyAlias:
+        """Map an alternate spelling onto a canonical agency, creating the agency if needed"""
+        normalized_name = normalize_agency_name(canonical_name)
+        agency = db.query(Agency).filter(Agency.normalized_name == normalized_name).first()
+        if agency is None:
+            agency = Agency(name=canonical_name, normalized_name=normalized_name)
+            db.add(agency)
+            db.flush()
+
+        agency_alias = AgencyAlias(
+            agency_id=agency.id,
+            alias=alias,
+            normalized_alias=normalize_agency_name(alias)
+        )
+        db.add(agency_alias)
+        db.commit()
+        self.invalidate()
+        return agency_alias
+
+# Initialize agency routing service
+agency_routing = AgencyRoutingService()
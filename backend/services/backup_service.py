@@ -0,0 +1,445 @@
+from bisect import bisect_right
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import Date, DateTime, Table, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from database.models import Base
+from services.cache_service import cache_service
+from services.change_feed import change_feed
+from services.etag_service import etag_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns that mark a row as changed, in order of preference
+WATERMARK_COLUMNS = ('updated_at',)
+
+MANIFEST_PREFIX = "manifests/"
+CHUNK_PREFIX = "chunks/"
+
+class BackupTarget:
+    """Key/value store a backup is written to"""
+
+    name = "base"
+
+    def put(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> List[str]:
+        raise NotImplementedError
+
+class LocalDirectoryTarget(BackupTarget):
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def put(self, key: str, data: bytes):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a crashed backup never leaves a truncated object behind
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(os.path.join(self.root, key), 'rb') as handle:
+            return handle.read()
+
+    def list(self, prefix: str) -> List[str]:
+        directory = os.path.join(self.root, prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(prefix + name for name in os.listdir(directory) if not name.startswith('.'))
+
+class S3Target(BackupTarget):
+    """Any S3-compatible object store (AWS, MinIO, ...); needs boto3"""
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("boto3 is required for the s3 backup target")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def put(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+
+    def list(self, prefix: str) -> List[str]:
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            keys.extend(item['Key'][len(self.prefix):] for item in page.get('Contents', []))
+        return sorted(keys)
+
+class GoogleDriveTarget(BackupTarget):
+    """Flat Drive folder; object keys are used as file names"""
+
+    name = "drive"
+
+    def __init__(self, credentials_file: str, folder_id: str):
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        credentials = service_account.Credentials.from_service_account_file(
+            credentials_file, scopes=["https://www.googleapis.com/auth/drive"]
+        )
+        self.files = build("drive", "v3", credentials=credentials, cache_discovery=False).files()
+        self.folder_id = folder_id
+
+    def put(self, key: str, data: bytes):
+        from googleapiclient.http import MediaIoBaseUpload
+
+        media = MediaIoBaseUpload(io.BytesIO(data), mimetype="application/octet-stream", resumable=True)
+        existing = self._file_id(key)
+        if existing:
+            self.files.update(fileId=existing, media_body=media).execute()
+        else:
+            self.files.create(
+                body={'name': key, 'parents': [self.folder_id]}, media_body=media, fields='id'
+            ).execute()
+
+    def get(self, key: str) -> bytes:
+        from googleapiclient.http import MediaIoBaseDownload
+
+        file_id = self._file_id(key)
+        if file_id is None:
+            raise FileNotFoundError(key)
+        buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(buffer, self.files.get_media(fileId=file_id))
+        done = False
+        while not done:
+            _, done = downloader.next_chunk()
+        return buffer.getvalue()
+
+    def list(self, prefix: str) -> List[str]:
+        names, page_token = [], None
+        while True:
+            response = self.files.list(
+                q=f"'{self.folder_id}' in parents and name contains '{prefix}' and trashed = false",
+                fields="nextPageToken, files(name)",
+                pageToken=page_token
+            ).execute()
+            names.extend(item['name'] for item in response.get('files', []) if item['name'].startswith(prefix))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return sorted(names)
+
+    def _file_id(self, key: str) -> Optional[str]:
+        response = self.files.list(
+            q=f"'{self.folder_id}' in parents and name = '{key}' and trashed = false",
+            fields="files(id)"
+        ).execute()
+        files = response.get('files', [])
+        return files[0]['id'] if files else None
+
+class BackupService:
+    """Full and incremental database backups to a pluggable target.
+
+    Every table is streamed through a server-side cursor in primary key order
+    and cut into chunks by id range. Each chunk is gzip-compressed JSON lines
+    stored under its SHA-256, so a chunk whose rows have not changed since any
+    earlier backup is never uploaded again. A backup is described by a JSON
+    manifest written last, listing the chunks of every table.
+
+    Incremental backups only read rows whose ``updated_at`` is at or past the
+    parent backup's watermark, less ``change_feed.gap_timeout``: a row stamped
+    just before the parent started may have committed after its table was
+    read, so the window overlaps the parent and restore's upsert absorbs rows
+    captured twice. Tables without ``updated_at`` are re-read in full and rely
+    on chunk dedup instead. Each manifest also records the live id
+    ranges of every table, which is how restore detects deleted rows.
+    """
+
+    def __init__(self):
+        self.chunk_rows = int(os.getenv("BACKUP_CHUNK_ROWS", "5000"))
+        self.full_interval = timedelta(days=int(os.getenv("BACKUP_FULL_INTERVAL_DAYS", "7")))
+
+    def get_target(self, name: Optional[str] = None) -> BackupTarget:
+        name = name or os.getenv("BACKUP_TARGET", "local")
+        if name == "local":
+            return LocalDirectoryTarget(os.getenv("BACKUP_DIRECTORY", "backups"))
+        if name == "s3":
+            return S3Target(
+                os.getenv("BACKUP_S3_BUCKET", "kdp-backups"),
+                prefix=os.getenv("BACKUP_S3_PREFIX", ""),
+                endpoint_url=os.getenv("BACKUP_S3_ENDPOINT_URL")
+            )
+        if name == "drive":
+            return GoogleDriveTarget(
+                os.getenv("GOOGLE_CREDENTIALS_FILE", "credentials.json"),
+                os.getenv("GOOGLE_DRIVE_FOLDER_ID", "")
+            )
+        raise ValueError(f"Unknown backup target '{name}'")
+
+    def list_manifests(self, target: BackupTarget) -> List[Dict]:
+        """Every manifest on the target, oldest first"""
+        return [
+            json.loads(target.get(key))
+            for key in target.list(MANIFEST_PREFIX) if key.endswith('.json')
+        ]
+
+    def run(self, db: Session, target: BackupTarget, full: Optional[bool] = None,
+            now: Optional[datetime] = None) -> Dict:
+        """Take a backup; by default incremental unless the last full one is too old"""
+        started = now or datetime.utcnow()
+        manifests = self.list_manifests(target)
+        parent = manifests[-1] if manifests else None
+        last_full = next((manifest for manifest in reversed(manifests) if manifest['kind'] == 'full'), None)
+
+        if full is None:
+            full = last_full is None or started - datetime.fromisoformat(last_full['started_at']) >= self.full_interval
+        if parent is None:
+            full = True
+
+        known_chunks = {
+            chunk['hash']
+            for manifest in manifests
+            for table in manifest['tables'].values()
+            for chunk in table['chunks']
+        }
+
+        manifest = {
+            'id': f"{started.strftime('%Y%m%dT%H%M%S%f')}-{'full' if full else 'incremental'}",
+            'kind': 'full' if full else 'incremental',
+            'parent': None if full else parent['id'],
+            'started_at': started.isoformat(),
+            # The next incremental reads rows stamped from shortly before this moment
+            'watermark': started.isoformat(),
+            'tables': {}
+        }
+        # Overlap the parent so rows whose transactions committed during it are not missed
+        since = None if full else datetime.fromisoformat(parent['watermark']) - change_feed.gap_timeout
+
+        stats = {'rows': 0, 'chunks': 0, 'chunks_uploaded': 0, 'bytes_uploaded': 0}
+        for table in Base.metadata.sorted_tables:
+            manifest['tables'][table.name] = self._backup_table(db, target, table, since, known_chunks, stats)
+
+        manifest['finished_at'] = datetime.utcnow().isoformat()
+        manifest['stats'] = stats
+        target.put(f"{MANIFEST_PREFIX}{manifest['id']}.json", json.dumps(manifest).encode())
+
+        logger.info(
+            f"{manifest['kind'].title()} backup {manifest['id']} to {target.name}: {stats['rows']} rows, "
+            f"{stats['chunks_uploaded']}/{stats['chunks']} chunks uploaded ({stats['bytes_uploaded']} bytes)"
+        )
+        return {'backup_id': manifest['id'], 'kind': manifest['kind'], 'target': target.name, **stats}
+
+    def restore(self, connection: Connection, target: BackupTarget, backup_id: Optional[str] = None) -> Dict:
+        """Rebuild every table as of a backup; the caller commits the connection's transaction
+
+        Restoring rewinds ``change_log``, so once the transaction commits the
+        cached responses of every restored table are invalidated and every
+        ETag handed out so far is retired: ids (and so versions) from before
+        the restore will be reused for different data.
+        """
+        chain = self._restore_chain(self.list_manifests(target), backup_id)
+        Base.metadata.create_all(connection)
+
+        plans = {}
+        for table in Base.metadata.sorted_tables:
+            entries = [(manifest, manifest['tables'][table.name]) for manifest in chain if table.name in manifest['tables']]
+            if not entries:
+                continue
+            # Only the newest snapshot matters; deltas after it are replayed on top.
+            # A table created after the last full backup has only deltas, over an empty base
+            snapshot = max(
+                (position for position, (_, entry) in enumerate(entries) if entry['mode'] == 'snapshot'), default=None
+            )
+            if snapshot is None:
+                plans[table] = (None, [entry for _, entry in entries])
+            else:
+                plans[table] = (entries[snapshot][1], [entry for _, entry in entries[snapshot + 1:]])
+
+        for table in reversed(list(plans)):
+            connection.execute(table.delete())
+
+        restored = {}
+        for table, (snapshot, deltas) in plans.items():
+            rows = 0
+            for chunk in (snapshot['chunks'] if snapshot else []):
+                batch = self._load_chunk(target, table, snapshot['columns'], chunk)
+                if batch:
+                    connection.execute(table.insert(), batch)
+                rows += len(batch)
+            for delta in deltas:
+                for chunk in delta['chunks']:
+                    batch = self._load_chunk(target, table, delta['columns'], chunk)
+                    self._upsert(connection, table, batch)
+                    rows += len(batch)
+            restored[table.name] = rows
+
+        # Drop rows deleted after they were last captured, children before parents
+        for table in reversed(list(plans)):
+            final = chain[-1]['tables'][table.name]
+            self._prune(connection, table, final['id_ranges'])
+            self._reset_sequence(connection, table)
+
+        restored_tables = [table.name for table in plans]
+
+        def _invalidate(connection):
+            cache_service.invalidate(restored_tables)
+            etag_service.bump_epoch()
+        event.listen(connection, 'commit', _invalidate, once=True)
+
+        logger.info(f"Restored backup {chain[-1]['id']} ({len(chain)} manifests)")
+        return {'backup_id': chain[-1]['id'], 'manifests': [manifest['id'] for manifest in chain], 'rows': restored}
+
+    def _backup_table(self, db: Session, target: BackupTarget, table: Table, since: Optional[datetime],
+                      known_chunks: set, stats: Dict) -> Dict:
+        columns = [column.name for column in table.columns]
+        watermark = next((table.c[name] for name in WATERMARK_COLUMNS if name in table.c), None)
+        mode = 'delta' if since is not None and watermark is not None else 'snapshot'
+
+        query = select(*table.columns).order_by(table.c.id)
+        if mode == 'delta':
+            query = query.where(watermark >= since)
+
+        chunks = []
+        for first_id, last_id, rows in self._iter_chunks(db, query):
+            raw = b"".join(json.dumps(row, default=self._encode, separators=(',', ':')).encode() + b"\n" for row in rows)
+            digest = hashlib.sha256(raw).hexdigest()
+            stats['rows'] += len(rows)
+            stats['chunks'] += 1
+            if digest not in known_chunks:
+                data = gzip.compress(raw, mtime=0)
+                target.put(self._chunk_key(digest), data)
+                known_chunks.add(digest)
+                stats['chunks_uploaded'] += 1
+                stats['bytes_uploaded'] += len(data)
+            chunks.append({'hash': digest, 'rows': len(rows), 'first_id': first_id, 'last_id': last_id})
+
+        return {
+            'mode': mode,
+            'columns': columns,
+            'chunks': chunks,
+            'id_ranges': self._id_ranges(db, table)
+        }
+
+    def _iter_chunks(self, db: Session, query) -> Iterator[Tuple[int, int, List[list]]]:
+        """Group rows into fixed id ranges so one new row never reshuffles every chunk"""
+        result = db.execute(query.execution_options(stream_results=True, yield_per=self.chunk_rows))
+        bucket, rows = None, []
+        for row in result:
+            row_bucket = row[0] // self.chunk_rows
+            if rows and row_bucket != bucket:
+                yield rows[0][0], rows[-1][0], rows
+                rows = []
+            bucket = row_bucket
+            rows.append(list(row))
+        if rows:
+            yield rows[0][0], rows[-1][0], rows
+
+    def _id_ranges(self, db: Session, table: Table) -> List[List[int]]:
+        """Live ids as [first, last] runs; compact because ids are mostly contiguous"""
+        ranges: List[List[int]] = []
+        ids = db.execute(
+            select(table.c.id).order_by(table.c.id).execution_options(stream_results=True, yield_per=50000)
+        ).scalars()
+        for row_id in ids:
+            if ranges and ranges[-1][1] == row_id - 1:
+                ranges[-1][1] = row_id
+            else:
+                ranges.append([row_id, row_id])
+        return ranges
+
+    def _restore_chain(self, manifests: List[Dict], backup_id: Optional[str]) -> List[Dict]:
+        if not manifests:
+            raise FileNotFoundError("No backups found on target")
+        by_id = {manifest['id']: manifest for manifest in manifests}
+        if backup_id is not None and backup_id not in by_id:
+            raise FileNotFoundError(f"Backup {backup_id} not found")
+
+        chain = [by_id[backup_id] if backup_id else manifests[-1]]
+        while chain[-1]['parent'] is not None:
+            parent = by_id.get(chain[-1]['parent'])
+            if parent is None:
+                raise FileNotFoundError(f"Backup {chain[-1]['parent']} in the chain is missing")
+            chain.append(parent)
+        return list(reversed(chain))
+
+    def _load_chunk(self, target: BackupTarget, table: Table, columns: List[str], chunk: Dict) -> List[Dict]:
+        raw = gzip.decompress(target.get(self._chunk_key(chunk['hash'])))
+        if hashlib.sha256(raw).hexdigest() != chunk['hash']:
+            raise ValueError(f"Chunk {chunk['hash']} of {table.name} is corrupt")
+
+        decoders = {
+            name: self._decoder(table.c[name].type) for name in columns if name in table.c
+        }
+        rows = []
+        for line in raw.splitlines():
+            values = json.loads(line)
+            rows.append({
+                name: decoders[name](value) if value is not None else None
+                for name, value in zip(columns, values) if name in decoders
+            })
+        return rows
+
+    def _upsert(self, connection: Connection, table: Table, rows: List[Dict]):
+        if not rows:
+            return
+        dialect = connection.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert(table) if dialect == 'postgresql' else sqlite.insert(table)
+            updates = {name: insert.excluded[name] for name in rows[0] if name != 'id'}
+            connection.execute(insert.on_conflict_do_update(index_elements=[table.c.id], set_=updates), rows)
+        else:
+            connection.execute(table.delete().where(table.c.id.in_([row['id'] for row in rows])))
+            connection.execute(table.insert(), rows)
+
+    def _prune(self, connection: Connection, table: Table, id_ranges: List[List[int]]):
+        starts = [first for first, _ in id_ranges]
+
+        def is_live(row_id: int) -> bool:
+            position = bisect_right(starts, row_id) - 1
+            return position >= 0 and row_id <= id_ranges[position][1]
+
+        stale = [row_id for row_id in connection.execute(select(table.c.id)).scalars() if not is_live(row_id)]
+        for start in range(0, len(stale), self.chunk_rows):
+            connection.execute(table.delete().where(table.c.id.in_(stale[start:start + self.chunk_rows])))
+
+    def _reset_sequence(self, connection: Connection, table: Table):
+        if connection.dialect.name != 'postgresql':
+            return
+        max_id = connection.execute(select(func.max(table.c.id))).scalar()
+        if max_id is not None:
+            connection.execute(
+                select(func.setval(func.pg_get_serial_sequence(table.name, 'id'), max_id))
+            )
+
+    def _chunk_key(self, digest: str) -> str:
+        return f"{CHUNK_PREFIX}{digest[:2]}/{digest}.jsonl.gz"
+
+    def _encode(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        raise TypeError(f"Cannot back up value of type {type(value).__name__}")
+
+    def _decoder(self, column_type):
+        if isinstance(column_type, DateTime):
+            return datetime.fromisoformat
+        if isinstance(column_type, Date):
+            return date.fromisoformat
+        return lambda value: value
+
+# Initialize backup service
+backup_service = BackupService()
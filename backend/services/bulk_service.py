@@ -0,0 +1,144 @@
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from services.change_feed import change_feed
+from services.event_bus import event_bus
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (index in request, row id, status, error)
+Outcome = Tuple[int, Optional[int], str, Optional[str]]
+
+FAILED_STATUSES = {'error', 'not_found'}
+
+class BulkService:
+    """Set-based create/update/delete for the CRUD routers.
+
+    Items are applied in chunks, one statement per chunk (multi-row INSERT ...
+    RETURNING, executemany UPDATE by primary key, DELETE ... WHERE id IN) and
+    one transaction per chunk. If a chunk fails, it is replayed item by item in
+    savepoints so only the offending items are reported as errors. In
+    all-or-nothing mode everything runs in a single transaction that is rolled
+    back if any item fails.
+    """
+
+    def __init__(self):
+        self.chunk_size = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+    def create(self, db: Session, model, items: List[Dict], all_or_nothing: bool = False) -> Dict:
+        def write(chunk) -> List[Outcome]:
+            ids = db.execute(
+                insert(model).returning(model.id, sort_by_parameter_order=True),
+                [values for _, values in chunk]
+            ).scalars().all()
+            change_feed.record(db, model.__tablename__, ids)
+            return [(index, row_id, 'created', None) for (index, _), row_id in zip(chunk, ids)]
+
+        result = self._run(db, list(enumerate(items)), write, all_or_nothing)
+        event_bus.publish_written(db, model, created_ids=self.succeeded_ids(result))
+        return result
+
+    def update(self, db: Session, model, items: List[Dict], all_or_nothing: bool = False) -> Dict:
+        """Apply partial updates; every item carries its row ``id`` plus the fields to change"""
+        def write(chunk) -> List[Outcome]:
+            found = self._existing_ids(db, model, [values['id'] for _, values in chunk])
+            rows = [values for _, values in chunk if values['id'] in found and len(values) > 1]
+            if rows:
+                db.execute(update(model), rows)
+                change_feed.record(db, model.__tablename__, [values['id'] for values in rows])
+            return [
+                (index, values['id'], 'updated' if values['id'] in found else 'not_found', None)
+                for index, values in chunk
+            ]
+
+        result = self._run(db, list(enumerate(items)), write, all_or_nothing)
+        event_bus.publish_written(db, model, changed=result['succeeded'] > 0)
+        return result
+
+    def delete(self, db: Session, model, ids: List[int], all_or_nothing: bool = False,
+               before_delete: Optional[Callable[[Session, List[int]], None]] = None) -> Dict:
+        def write(chunk) -> List[Outcome]:
+            found = self._existing_ids(db, model, [row_id for _, row_id in chunk])
+            if found:
+                if before_delete:
+                    before_delete(db, list(found))
+                db.query(model).filter(model.id.in_(found)).delete(synchronize_session=False)
+                change_feed.record(db, model.__tablename__, found, operation='delete')
+            return [
+                (index, row_id, 'deleted' if row_id in found else 'not_found', None)
+                for index, row_id in chunk
+            ]
+
+        result = self._run(db, list(enumerate(ids)), write, all_or_nothing)
+        event_bus.publish_written(db, model, changed=result['succeeded'] > 0)
+        return result
+
+    def succeeded_ids(self, result: Dict) -> List[int]:
+        return [item['id'] for item in result['results'] if item['status'] not in FAILED_STATUSES | {'rolled_back'}]
+
+    def _run(self, db: Session, operations: List[tuple], write, all_or_nothing: bool) -> Dict:
+        chunks = [operations[i:i + self.chunk_size] for i in range(0, len(operations), self.chunk_size)]
+        outcomes: List[Outcome] = []
+
+        if all_or_nothing:
+            try:
+                for chunk in chunks:
+                    outcomes.extend(write(chunk))
+            except Exception:
+                db.rollback()
+                outcomes = []
+                for chunk in chunks:
+                    outcomes.extend(self._write_items(db, chunk, write))
+
+            if any(status in FAILED_STATUSES for _, _, status, _ in outcomes):
+                db.rollback()
+                outcomes = [
+                    outcome if outcome[2] in FAILED_STATUSES
+                    else (outcome[0], None if outcome[2] == 'created' else outcome[1], 'rolled_back', None)
+                    for outcome in outcomes
+                ]
+            else:
+                db.commit()
+        else:
+            for chunk in chunks:
+                try:
+                    chunk_outcomes = write(chunk)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    chunk_outcomes = self._write_items(db, chunk, write)
+                    db.commit()
+                outcomes.extend(chunk_outcomes)
+
+        results = [
+            {'index': index, 'id': row_id, 'status': status, 'error': error}
+            for index, row_id, status, error in sorted(outcomes, key=lambda outcome: outcome[0])
+        ]
+        failed = sum(1 for item in results if item['status'] in FAILED_STATUSES)
+        return {
+            'succeeded': sum(1 for item in results if item['status'] not in FAILED_STATUSES | {'rolled_back'}),
+            'failed': failed,
+            'all_or_nothing': all_or_nothing,
+            'results': results
+        }
+
+    def _write_items(self, db: Session, chunk: List[tuple], write) -> List[Outcome]:
+        """Replay a failed chunk one item per savepoint so a bad row only fails itself"""
+        outcomes = []
+        for operation in chunk:
+            savepoint = db.begin_nested()
+            try:
+                outcomes.extend(write([operation]))
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback()
+                outcomes.append((operation[0], None, 'error', str(getattr(e, 'orig', e))))
+        return outcomes
+
+    def _existing_ids(self, db: Session, model, ids: List[int]) -> set:
+        return {row_id for row_id, in db.query(model.id).filter(model.id.in_(ids))}
+
+# Initialize bulk service
+bulk_service = BulkService()
@@ -0,0 +1,301 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import redis
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database.database import SessionLocal
+from services.serialization_service import serialization_service
+from services.metrics_service import metrics_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "kdp:cache:"
+
+# Endpoint arguments that never distinguish one cached response from another
+UNKEYED_ARGUMENTS = {'db', 'current_user', 'request', 'response'}
+
+# Headers of a fast-path Response that describe the body, so are cached with it
+CACHED_HEADERS = ('x-total-count', 'x-total-count-accuracy')
+
+class _L1Cache:
+    """Small thread-safe LRU kept in front of Redis in each worker"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class CacheService:
+    """Two-tier response cache for read endpoints.
+
+    Responses are cached as serialized JSON bytes, keyed by endpoint and the
+    endpoint's normalized arguments; none of the cached routes vary by user.
+    Each entry records the versions of the tags (entity names) it was built
+    from; a committed write to an entity bumps its tag version in Redis, which
+    turns every entry built on the old version into a miss. Past its TTL an
+    entry is still served for ``stale_ttl`` seconds while one background
+    refresh rebuilds it.
+
+    The in-process L1 tier holds entries and tag versions. Writes made by this
+    worker invalidate its L1 at once; writes made by other workers are seen
+    after at most ``l1_ttl`` seconds.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.enabled = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+        self.l1_ttl = float(os.getenv("CACHE_L1_TTL_SECONDS", "1"))
+        self.stats_flush_seconds = 10
+        self.l1 = _L1Cache(int(os.getenv("CACHE_L1_MAX_ENTRIES", "1000")))
+        self._client: Optional[redis.Redis] = None
+        self._tag_versions: Dict[str, Tuple[float, int]] = {}
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._stats_lock = threading.Lock()
+        self._stats_flushed_at = time.monotonic()
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url)
+        return self._client
+
+    def cached(self, tags: Sequence[str] = (), ttl: int = 60, stale_ttl: int = 0,
+               model: Any = None):
+        """Cache a sync route's JSON response.
+
+        ``model`` is the route's response model, used to serialize ORM results
+        the way FastAPI would; without it results go through jsonable_encoder,
+        and a Response from the serialization fast path is cached as is. The
+        wrapper returns the bytes as a Response, so routes must not rely on
+        FastAPI filtering the return value.
+        """
+        def decorator(func: Callable):
+            namespace = f"{func.__module__}.{func.__name__}"
+            adapter = TypeAdapter(model) if model is not None else None
+            signature = inspect.signature(func)
+            has_request = 'request' in signature.parameters
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                request: Request = kwargs['request'] if has_request else kwargs.pop('_cache_request')
+                if not self.enabled:
+                    return self._response(*self._serialize(func(*args, **kwargs), adapter), request)
+
+                key = self._key(namespace, kwargs)
+                versions = self.versions(tags)
+                entry = self._lookup(key)
+                now = time.time()
+
+                if entry is not None and entry['versions'] == versions:
+                    if now < entry['fresh_until']:
+                        self._count(namespace, 'hits')
+                        return self._response(entry['body'].encode(), entry.get('headers', {}), request)
+                    if now < entry['stale_until']:
+                        self._count(namespace, 'stale_hits')
+                        self._refresh_later(func, kwargs, adapter, key, tags, ttl, stale_ttl)
+                        return self._response(entry['body'].encode(), entry.get('headers', {}), request)
+
+                self._count(namespace, 'misses')
+                body, headers = self._serialize(func(*args, **kwargs), adapter)
+                self._store(key, body, headers, versions, ttl, stale_ttl)
+                return self._response(body, headers, request)
+
+            if not has_request:
+                parameters = list(signature.parameters.values())
+                parameters.append(inspect.Parameter(
+                    '_cache_request', inspect.Parameter.KEYWORD_ONLY, annotation=Request
+                ))
+                wrapper.__signature__ = signature.replace(parameters=parameters)
+            return wrapper
+        return decorator
+
+    def invalidate(self, tags: Sequence[str]):
+        """Bump tag versions so every entry built on them becomes a miss"""
+        if not tags:
+            return
+        try:
+            pipe = self.client.pipeline()
+            for tag in tags:
+                pipe.incr(f"{KEY_PREFIX}tag:{tag}")
+            for tag, version in zip(tags, pipe.execute()):
+                self._tag_versions[tag] = (time.monotonic() + self.l1_ttl, version)
+        except redis.RedisError as e:
+            logger.warning(f"Could not invalidate cache tags {list(tags)}: {str(e)}")
+            # Without Redis this worker can still stop serving its own stale L1 entries
+            for tag in tags:
+                expires, version = self._tag_versions.get(tag, (0, 0))
+                self._tag_versions[tag] = (time.monotonic() + self.l1_ttl, version + 1)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Hit ratios per endpoint, summed over every worker"""
+        self._flush_stats(force=True)
+        try:
+            keys = list(self.client.scan_iter(f"{KEY_PREFIX}stats:*"))
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.hgetall(key)
+            totals = {
+                key.decode()[len(f"{KEY_PREFIX}stats:"):]: {field.decode(): int(value) for field, value in counts.items()}
+                for key, counts in zip(keys, pipe.execute())
+            }
+        except redis.RedisError:
+            totals = {namespace: dict(counts) for namespace, counts in self._stats.items()}
+
+        for counts in totals.values():
+            requests = sum(counts.get(field, 0) for field in ('hits', 'stale_hits', 'misses'))
+            served = counts.get('hits', 0) + counts.get('stale_hits', 0)
+            counts['hit_ratio'] = round(served / requests, 4) if requests else None
+        return totals
+
+    def _key(self, namespace: str, arguments: Dict) -> str:
+        keyed = {name: value for name, value in arguments.items() if name not in UNKEYED_ARGUMENTS}
+        digest = hashlib.sha1(json.dumps(keyed, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{KEY_PREFIX}entry:{namespace}:{digest}"
+
+    def versions(self, tags: Sequence[str]) -> list:
+        """Current version of each tag, as seen by this worker"""
+        now = time.monotonic()
+        missing = [tag for tag in tags if self._tag_versions.get(tag, (0, 0))[0] <= now]
+        if missing:
+            try:
+                values = self.client.mget([f"{KEY_PREFIX}tag:{tag}" for tag in missing])
+                for tag, value in zip(missing, values):
+                    self._tag_versions[tag] = (now + self.l1_ttl, int(value or 0))
+            except redis.RedisError as e:
+                logger.warning(f"Could not read cache tag versions: {str(e)}")
+        return [self._tag_versions.get(tag, (0, 0))[1] for tag in tags]
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        entry = self.l1.get(key)
+        if entry is not None:
+            return entry
+        try:
+            cached = self.client.get(key)
+        except redis.RedisError:
+            return None
+        if cached is None:
+            return None
+        entry = json.loads(cached)
+        self.l1.set(key, entry)
+        return entry
+
+    def _store(self, key: str, body: bytes, headers: Dict[str, str], versions: list, ttl: int, stale_ttl: int):
+        now = time.time()
+        entry = {
+            'body': body.decode(),
+            'headers': headers,
+            'versions': versions,
+            'fresh_until': now + ttl,
+            'stale_until': now + ttl + stale_ttl
+        }
+        self.l1.set(key, entry)
+        try:
+            self.client.set(key, json.dumps(entry), ex=ttl + stale_ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Could not store cache entry: {str(e)}")
+
+    def _refresh_later(self, func, kwargs, adapter, key, tags, ttl, stale_ttl):
+        """Rebuild a stale entry off the request path, once across all workers"""
+        try:
+            if not self.client.set(f"{key}:refreshing", 1, nx=True, ex=30):
+                return
+        except redis.RedisError:
+            return
+        self._refresher.submit(self._refresh, func, dict(kwargs), adapter, key, tags, ttl, stale_ttl)
+
+    def _refresh(self, func, kwargs, adapter, key, tags, ttl, stale_ttl):
+        # The request's session is closed by now, so the refresh gets its own
+        db = SessionLocal() if 'db' in kwargs else None
+        try:
+            if db is not None:
+                kwargs['db'] = db
+            versions = self.versions(tags)
+            self._store(key, *self._serialize(func(**kwargs), adapter), versions, ttl, stale_ttl)
+        except Exception as e:
+            logger.error(f"Cache refresh of {key} failed: {str(e)}")
+        finally:
+            if db is not None:
+                db.close()
+            try:
+                self.client.delete(f"{key}:refreshing")
+            except redis.RedisError:
+                pass
+
+    def _serialize(self, result, adapter: Optional[TypeAdapter]) -> Tuple[bytes, Dict[str, str]]:
+        if isinstance(result, Response):
+            # Routes on the serialization fast path have already encoded their rows
+            headers = {name: value for name, value in result.headers.items() if name in CACHED_HEADERS}
+            return result.body, headers
+        with metrics_service.serializing():
+            if adapter is not None:
+                return adapter.dump_json(adapter.validate_python(result, from_attributes=True)), {}
+            return serialization_service.dumps(jsonable_encoder(result)), {}
+
+    def _response(self, body: bytes, headers: Dict[str, str], request: Request) -> Response:
+        return serialization_service.response(request, body=body, headers=headers)
+
+    def _count(self, namespace: str, field: str):
+        with self._stats_lock:
+            self._stats[namespace][field] += 1
+        self._flush_stats()
+
+    def _flush_stats(self, force: bool = False):
+        """Fold this worker's counters into Redis every few seconds"""
+        with self._stats_lock:
+            if not force and time.monotonic() - self._stats_flushed_at < self.stats_flush_seconds:
+                return
+            pending, self._stats = self._stats, defaultdict(lambda: defaultdict(int))
+            self._stats_flushed_at = time.monotonic()
+        try:
+            pipe = self.client.pipeline()
+            for namespace, counts in pending.items():
+                for field, value in counts.items():
+                    pipe.hincrby(f"{KEY_PREFIX}stats:{namespace}", field, value)
+            pipe.execute()
+        except redis.RedisError:
+            # Keep the counts for the next flush
+            with self._stats_lock:
+                for namespace, counts in pending.items():
+                    for field, value in counts.items():
+                        self._stats[namespace][field] += value
+
+# Initialize cache service
+cache_service = CacheService()
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    changed = session.info.pop('changed_entities', None)
+    if changed:
+        cache_service.invalidate(sorted(changed))
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session: Session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop('changed_entities', None)
@@ -0,0 +1,159 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from database.models import (
+    ChangeLog, Communication, Contract, PrimeContractor, ProcurementOfficer, RevenueTracking, Subcontractor
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Entities exposed through GET /api/sync, keyed by table name
+TRACKED_MODELS = {
+    model.__tablename__: model
+    for model in (Contract, PrimeContractor, Subcontractor, ProcurementOfficer, Communication, RevenueTracking)
+}
+
+class TokenExpired(Exception):
+    """The sync token points before the oldest change still retained, or past the newest"""
+
+class ChangeFeed:
+    """Append-only log of creates, updates and deletes of the CRUD entities.
+
+    ORM writes are recorded automatically from the session's ``after_flush``
+    hook, in the same transaction as the change itself. Set-based writes that
+    bypass the unit of work (bulk endpoints, file imports) call ``record``
+    explicitly. Readers page through the log by id.
+
+    Ids are handed out when a row is inserted but become visible when its
+    transaction commits, so a slow transaction can leave a temporary gap below
+    newer, already visible ids. ``changes`` stops at such a gap until it is
+    ``gap_timeout`` old (after which it is assumed to be a rolled back insert)
+    so no client ever moves its token past a change it has not seen.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("SYNC_BATCH_SIZE", "1000"))
+        self.gap_timeout = timedelta(seconds=int(os.getenv("SYNC_GAP_TIMEOUT_SECONDS", "60")))
+        self.retention = timedelta(days=int(os.getenv("SYNC_RETENTION_DAYS", "30")))
+
+    def record(self, db: Session, entity: str, ids: Iterable[int], operation: str = "upsert"):
+        """Log a set-based write; runs in the caller's transaction"""
+        if entity not in TRACKED_MODELS:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {'entity': entity, 'entity_id': entity_id, 'operation': operation, 'changed_at': now}
+            for entity_id in ids
+        ]
+        if rows:
+            db.execute(ChangeLog.__table__.insert(), rows)
+            db.info.setdefault('changed_entities', set()).add(entity)
+
+    def latest_token(self, db: Session) -> int:
+        return db.query(func.coalesce(func.max(ChangeLog.id), 0)).scalar()
+
+    def changes(self, db: Session, since: int, limit: Optional[int] = None,
+                entities: Optional[List[str]] = None) -> Dict:
+        """Changes after a token, one entry per row with its latest state"""
+        limit = min(limit or self.batch_size, self.batch_size)
+
+        oldest, newest = db.query(func.min(ChangeLog.id), func.coalesce(func.max(ChangeLog.id), 0)).one()
+        if oldest is not None and since < oldest - 1:
+            raise TokenExpired(since)
+        # Only a restore rewinds the log; ids past it will be reused for different changes
+        if since > newest:
+            raise TokenExpired(since)
+
+        entries = db.query(
+            ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.operation, ChangeLog.changed_at
+        ).filter(
+            ChangeLog.id > since
+        ).order_by(ChangeLog.id.asc()).limit(limit + 1).all()
+
+        settled = self._settled(entries[:limit], since, datetime.utcnow())
+        # A batch cut short at an open gap is not "more", the client just polls again later
+        has_more = len(entries) > limit and len(settled) == limit
+        entries = settled
+
+        # Collapse repeated changes to one row, keeping the last operation
+        latest: Dict[tuple, str] = {}
+        for entry in entries:
+            if entities is None or entry.entity in entities:
+                latest[(entry.entity, entry.entity_id)] = entry.operation
+
+        changes: Dict[str, Dict] = {}
+        upserts: Dict[str, List[int]] = {}
+        for (entity, entity_id), operation in latest.items():
+            group = changes.setdefault(entity, {'upserted': [], 'deleted': []})
+            if operation == 'delete':
+                group['deleted'].append(entity_id)
+            else:
+                upserts.setdefault(entity, []).append(entity_id)
+
+        for entity, ids in upserts.items():
+            rows = self._current_rows(db, TRACKED_MODELS[entity], ids)
+            group = changes[entity]
+            group['upserted'] = [rows[entity_id] for entity_id in ids if entity_id in rows]
+            # Deleted again later in the log; report it now rather than ship a stale row
+            group['deleted'].extend(entity_id for entity_id in ids if entity_id not in rows)
+
+        return {
+            'token': entries[-1].id if entries else since,
+            'has_more': has_more,
+            'changes': changes
+        }
+
+    def prune(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Drop log entries past the retention window; older tokens must resync"""
+        cutoff = (now or datetime.utcnow()) - self.retention
+        # The newest entry always stays, so the latest token survives a quiet spell
+        deleted = db.query(ChangeLog).filter(
+            ChangeLog.changed_at < cutoff, ChangeLog.id < self.latest_token(db)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def _settled(self, entries: List, since: int, now: datetime) -> List:
+        """Cut the batch at the first id gap that may still be an open transaction"""
+        expected = since + 1
+        for position, entry in enumerate(entries):
+            if entry.id != expected and now - entry.changed_at < self.gap_timeout:
+                return entries[:position]
+            expected = entry.id + 1
+        return entries
+
+    def _current_rows(self, db: Session, model, ids: List[int]) -> Dict[int, Dict]:
+        rows = {}
+        for start in range(0, len(ids), self.batch_size):
+            query = select(*model.__table__.columns).where(model.id.in_(ids[start:start + self.batch_size]))
+            for row in db.execute(query):
+                rows[row.id] = dict(row._mapping)
+        return rows
+
+# Initialize change feed
+change_feed = ChangeFeed()
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context):
+    """Log every tracked ORM insert, update and delete in the flushing transaction"""
+    now = datetime.utcnow()
+    rows = []
+    for instance in session.new:
+        if instance.__tablename__ in TRACKED_MODELS:
+            rows.append({'entity': instance.__tablename__, 'entity_id': instance.id,
+                         'operation': 'upsert', 'changed_at': now})
+    for instance in session.dirty:
+        if instance.__tablename__ in TRACKED_MODELS and session.is_modified(instance, include_collections=False):
+            rows.append({'entity': instance.__tablename__, 'entity_id': instance.id,
+                         'operation': 'upsert', 'changed_at': now})
+    for instance in session.deleted:
+        if instance.__tablename__ in TRACKED_MODELS:
+            rows.append({'entity': instance.__tablename__, 'entity_id': instance.id,
+                         'operation': 'delete', 'changed_at': now})
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+        # Committed-change listeners (e.g. the response cache) read this after commit
+        session.info.setdefault('changed_entities', set()).update(row['entity'] for row in rows)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Tuple
+import redis
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+from services.cache_service import cache_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "kdp:count:"
+
+EXACT = "exact"
+ESTIMATED = "estimated"
+
+class CountService:
+    """Row totals for paginated lists without a full count on every page.
+
+    On PostgreSQL an unfiltered query is sized from ``pg_class.reltuples`` and
+    a filtered one from the planner's row estimate for it; results the
+    estimate puts under ``exact_threshold`` rows are counted exactly, since
+    counting a small set costs about as much as estimating it. Other databases
+    always count exactly, as does ``exact=True`` for figures shown as totals
+    rather than as the size of a paginated list.
+
+    Either way the total is cached in Redis per filter signature (the
+    compiled SQL and its parameters) and the table's cache tag version, so a
+    committed write to the table starts a fresh count.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.exact_threshold = int(os.getenv("COUNT_EXACT_THRESHOLD", "10000"))
+        self.ttl = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "300"))
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url)
+        return self._client
+
+    def count(self, db: Session, query: Query, model, exact: bool = False) -> Tuple[int, str]:
+        """Total rows of ``query`` (unpaginated) and whether it is exact or estimated"""
+        query = query.order_by(None)
+        table = model.__tablename__
+        compiled = query.statement.compile(dialect=db.get_bind().dialect)
+        key = self._key(table, compiled, exact)
+
+        try:
+            cached = self.client.get(key)
+            if cached is not None:
+                total, accuracy = json.loads(cached)
+                return total, accuracy
+        except redis.RedisError as e:
+            logger.warning(f"Could not read cached count: {str(e)}")
+
+        total, accuracy = self._count(db, query, table, compiled, exact)
+        try:
+            self.client.set(key, json.dumps([total, accuracy]), ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Could not cache count: {str(e)}")
+        return total, accuracy
+
+    def headers(self, db: Session, query: Query, model) -> Dict[str, str]:
+        """``X-Total-Count`` headers for a list response"""
+        total, accuracy = self.count(db, query, model)
+        return {'X-Total-Count': str(total), 'X-Total-Count-Accuracy': accuracy}
+
+    def _key(self, table: str, compiled, exact: bool) -> str:
+        version = cache_service.versions([table])[0]
+        signature = json.dumps([compiled.string, compiled.params, exact], sort_keys=True, default=str)
+        return f"{KEY_PREFIX}{table}:{version}:{hashlib.sha1(signature.encode()).hexdigest()}"
+
+    def _count(self, db: Session, query: Query, table: str, compiled, exact: bool) -> Tuple[int, str]:
+        if not exact and db.get_bind().dialect.name == 'postgresql':
+            estimate = self._estimate(db, query, table, compiled)
+            if estimate is not None and estimate >= self.exact_threshold:
+                return estimate, ESTIMATED
+        return query.count(), EXACT
+
+    def _estimate(self, db: Session, query: Query, table: str, compiled) -> Optional[int]:
+        try:
+            # A savepoint, so a failed estimate leaves the request's transaction usable
+            with db.begin_nested():
+                if query.whereclause is None:
+                    estimate = db.execute(
+                        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                        {'table': table}
+                    ).scalar()
+                    # -1 until the table has been vacuumed or analyzed
+                    return estimate if estimate is not None and estimate >= 0 else None
+                plan = db.connection().exec_driver_sql(
+                    "EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params
+                ).scalar()
+                return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            logger.warning(f"Could not estimate count for {table}, counting exactly: {str(e)}")
+            return None
+
+# Initialize count service
+count_service = CountService()
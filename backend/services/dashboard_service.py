@@ -0,0 +1,94 @@
+from sqlalchemy import func, extract
+from sqlalchemy.orm import Session
+from database.models import Contract, RevenueTracking
+from schemas.schemas import DashboardStats
+from services.count_service import count_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DashboardService:
+    """Dashboard aggregates shared by GET /api/dashboard/stats and the push channel"""
+
+    def stats(self, db: Session) -> DashboardStats:
+        # Total and active contracts; exact, since these are figures and the response is cached anyway
+        total_contracts, _ = count_service.count(db, db.query(Contract.id), Contract, exact=True)
+        active_contracts, _ = count_service.count(db, db.query(Contract.id).filter(Contract.status == "active"), Contract, exact=True)
+        
+        # Total revenue
+        total_revenue_result = db.query(func.sum(RevenueTracking.fee_amount)).scalar()
+        total_revenue = total_revenue_result if total_revenue_result else 0.0
+        
+        # Success rate
+        total_placements, _ = count_service.count(db, db.query(RevenueTracking.id), RevenueTracking, exact=True)
+        success_rate = (total_placements / total_contracts * 100) if total_contracts > 0 else 0.0
+        
+        # Top agencies
+        top_agencies = db.query(
+            Contract.agency,
+            func.count(Contract.id).label('contract_count'),
+            func.sum(Contract.value).label('total_value')
+        ).group_by(Contract.agency).order_by(func.count(Contract.id).desc()).limit(5).all()
+        
+        top_agencies_list = [
+            {
+                "agency": agency,
+                "contract_count": count,
+                "total_value": total_value if total_value else 0
+            }
+            for agency, count, total_value in top_agencies
+        ]
+        
+        # Monthly revenue (last 12 months)
+        monthly_revenue = db.query(
+            extract('year', RevenueTracking.placement_date).label('year'),
+            extract('month', RevenueTracking.placement_date).label('month'),
+            func.sum(RevenueTracking.fee_amount).label('revenue')
+        ).group_by(
+            extract('year', RevenueTracking.placement_date),
+            extract('month', RevenueTracking.placement_date)
+        ).order_by(
+            extract('year', RevenueTracking.placement_date),
+            extract('month', RevenueTracking.placement_date)
+        ).limit(12).all()
+        
+        monthly_revenue_list = [
+            {
+                "year": int(year),
+                "month": int(month),
+                "revenue": float(revenue)
+            }
+            for year, month, revenue in monthly_revenue
+        ]
+        
+        # Opportunity pipeline (contracts by opportunity score)
+        opportunity_pipeline = db.query(
+            Contract.opportunity_score,
+            func.count(Contract.id).label('count'),
+            func.sum(Contract.value).label('total_value')
+        ).filter(
+            Contract.opportunity_score.isnot(None),
+            Contract.status == "active"
+        ).group_by(Contract.opportunity_score).order_by(Contract.opportunity_score.desc()).all()
+        
+        opportunity_pipeline_list = [
+            {
+                "score": score,
+                "count": count,
+                "total_value": total_value if total_value else 0
+            }
+            for score, count, total_value in opportunity_pipeline
+        ]
+        
+        return DashboardStats(
+            total_contracts=total_contracts,
+            active_contracts=active_contracts,
+            total_revenue=total_revenue,
+            success_rate=success_rate,
+            top_agencies=top_agencies_list,
+            monthly_revenue=monthly_revenue_list,
+            opportunity_pipeline=opportunity_pipeline_list
+        )
+
+# Initialize dashboard service
+dashboard_service = DashboardService()
@@ -4,11 +4,13 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterator
 from jinja2 import Template
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, Query
 from database.models import EmailTemplate, ProcurementOfficer, Communication
-from datetime import datetime, timedelta
+from services.follow_up_scheduler import follow_up_scheduler
+from datetime import datetime, timedelta, date
 import logging
 
 logger = logging.getLogger(__name__)
@@ -74,84 +76,104 @@ class EmailService:
 
     def send_introduction_email(self, db: Session, officer_id: int) -> bool:
         """Send introduction email to procurement officer"""
-        officer = db.query(ProcurementOfficer).filter(ProcurementOfficer.id == officer_id).first()
-        if not officer or not officer.email:
-            return False
-        
+        return self._send_templated(db, [officer_id], "introduction")["sent"] == 1
+
+    def send_follow_up_email(self, db: Session, officer_id: int, follow_up_type: str = "general") -> bool:
+        """Send follow-up email to procurement officer"""
+        return self._send_templated(db, [officer_id], "follow_up", follow_up_type)["sent"] == 1
+
+    def _send_templated(self, db: Session, officer_ids: List[int], template_type: str,
+                        follow_up_type: str = "general") -> Dict[str, int]:
+        """Send an introduction or follow-up email to each officer, logging them in one commit"""
+        results = {"sent": 0, "failed": 0}
+        officers = {
+            officer.id: officer
+            for officer in db.query(ProcurementOfficer).filter(ProcurementOfficer.id.in_(officer_ids))
+        }
         template = db.query(EmailTemplate).filter(
-            EmailTemplate.template_type == "introduction",
+            EmailTemplate.template_type == template_type,
             EmailTemplate.is_active == True
         ).first()
         
-        if not template:
+        if template:
+            subject, body = template.subject, template.body
+        elif template_type == "introduction":
             # Use default template
             subject = "Partnership Opportunity - KDP Global Contract Brokerage"
             body = self._get_default_introduction_template()
         else:
-            subject = template.subject
-            body = template.body
-        
-        context = {
-            'officer_name': officer.name,
-            'agency': officer.agency,
-            'company_name': 'KDP Global Enterprises',
-            'sender_name': 'Kendrick',
-            'sender_email': self.email_user,
-            'phone': '(555) 123-4567',  # Replace with actual phone
-        }
-        
-        rendered_body = self.render_template(body, context)
-        rendered_subject = self.render_template(subject, context)
+            subject = "Following Up - KDP Global Partnership"
+            body = self._get_default_follow_up_template()
         
-        success = self.send_email(officer.email, rendered_subject, rendered_body)
+        if template_type == "introduction":
+            outcome, follow_up_days = "Introduction email sent", 3
+        else:
+            outcome, follow_up_days = f"Follow-up email sent ({follow_up_type})", 7
         
-        if success:
+        communications = []
+        for officer_id in officer_ids:
+            officer = officers.get(officer_id)
+            if not officer or not officer.email:
+                results["failed"] += 1
+                continue
+            
+            context = {
+                'officer_name': officer.name,
+                'agency': officer.agency,
+                'company_name': 'KDP Global Enterprises',
+                'sender_name': 'Kendrick',
+                'sender_email': self.email_user,
+            }
+            if template_type == "introduction":
+                context['phone'] = '(555) 123-4567'  # Replace with actual phone
+            else:
+                context['follow_up_type'] = follow_up_type
+            
+            rendered_body = self.render_template(body, context)
+            rendered_subject = self.render_template(subject, context)
+            
+            if not self.send_email(officer.email, rendered_subject, rendered_body):
+                results["failed"] += 1
+                continue
+            
+            results["sent"] += 1
             # Log communication
-            communication = Communication(
+            communications.append(Communication(
                 contact_id=officer_id,
                 date=datetime.utcnow(),
                 type="email",
                 subject=rendered_subject,
-                outcome="Introduction email sent",
-                follow_up_date=datetime.utcnow().date() + timedelta(days=3)
-            )
-            db.add(communication)
+                outcome=outcome,
+                follow_up_date=datetime.utcnow().date() + timedelta(days=follow_up_days)
+            ))
+        
+        if communications:
+            db.add_all(communications)
+            follow_up_scheduler.register_many(db, communications)
             db.commit()
         
-        return success
+        return results
 
-    def send_follow_up_email(self, db: Session, officer_id: int, follow_up_type: str = "general") -> bool:
-        """Send follow-up email to procurement officer"""
+    def send_opportunity_alert(self, db: Session, officer_id: int, contract_title: str, contract_value: float = None) -> bool:
+        """Send opportunity alert email"""
         officer = db.query(ProcurementOfficer).filter(ProcurementOfficer.id == officer_id).first()
         if not officer or not officer.email:
             return False
         
-        template = db.query(EmailTemplate).filter(
-            EmailTemplate.template_type == "follow_up",
-            EmailTemplate.is_active == True
-        ).first()
-        
-        if not template:
-            # Use default template
-            subject = "Following Up - KDP Global Partnership"
-            body = self._get_default_follow_up_template()
-        else:
-            subject = template.subject
-            body = template.body
+        subject = f"New Contract Opportunity - {contract_title}"
         
         context = {
             'officer_name': officer.name,
-            'agency': officer.agency,
+            'contract_title': contract_title,
+            'contract_value': f"${contract_value:,.2f}" if contract_value else "TBD",
             'company_name': 'KDP Global Enterprises',
             'sender_name': 'Kendrick',
-            'sender_email': self.email_user,
-            'follow_up_type': follow_up_type,
         }
         
+        body = self._get_opportunity_alert_template()
         rendered_body = self.render_template(body, context)
-        rendered_subject = self.render_template(subject, context)
         
-        success = self.send_email(officer.email, rendered_subject, rendered_body)
+        success = self.send_email(officer.email, subject, rendered_body)
         
         if success:
             # Log communication
@@ -159,32 +181,41 @@ class EmailService:
                 contact_id=officer_id,
                 date=datetime.utcnow(),
                 type="email",
-                subject=rendered_subject,
-                outcome=f"Follow-up email sent ({follow_up_type})",
-                follow_up_date=datetime.utcnow().date() + timedelta(days=7)
+                subject=subject,
+                outcome="Opportunity alert sent",
+                follow_up_date=datetime.utcnow().date() + timedelta(days=2)
             )
             db.add(communication)
+            db.flush()
+            follow_up_scheduler.register(db, communication)
             db.commit()
         
         return success
 
-    def send_opportunity_alert(self, db: Session, officer_id: int, contract_title: str, contract_value: float = None) -> bool:
-        """Send opportunity alert email"""
-        officer = db.query(ProcurementOfficer).filter(ProcurementOfficer.id == officer_id).first()
-        if not officer or not officer.email:
+    def send_opportunity_digest(self, db: Session, officer: ProcurementOfficer, contracts: List) -> bool:
+        """Send one email listing every new opportunity routed to an officer"""
+        if not officer.email or not contracts:
             return False
         
-        subject = f"New Contract Opportunity - {contract_title}"
+        if len(contracts) == 1:
+            subject = f"New Contract Opportunity - {contracts[0].title}"
+        else:
+            subject = f"{len(contracts)} New Contract Opportunities - KDP Global"
         
         context = {
             'officer_name': officer.name,
-            'contract_title': contract_title,
-            'contract_value': f"${contract_value:,.2f}" if contract_value else "TBD",
+            'opportunities': [
+                {
+                    'title': contract.title,
+                    'value': f"${contract.value:,.2f}" if contract.value else "TBD",
+                }
+                for contract in contracts
+            ],
             'company_name': 'KDP Global Enterprises',
             'sender_name': 'Kendrick',
         }
         
-        body = self._get_opportunity_alert_template()
+        body = self._get_opportunity_digest_template()
         rendered_body = self.render_template(body, context)
         
         success = self.send_email(officer.email, subject, rendered_body)
@@ -192,69 +223,125 @@ class EmailService:
         if success:
             # Log communication
             communication = Communication(
-                contact_id=officer_id,
+                contact_id=officer.id,
                 date=datetime.utcnow(),
                 type="email",
-                subject=subject,
-                outcome="Opportunity alert sent",
+                subject=subject[:200],
+                outcome=f"Opportunity alert sent ({len(contracts)} opportunities)",
                 follow_up_date=datetime.utcnow().date() + timedelta(days=2)
             )
             db.add(communication)
+            db.flush()
+            follow_up_scheduler.register(db, communication)
             db.commit()
         
         return success
 
-    def send_bulk_emails(self, db: Session, officer_ids: List[int], template_type: str) -> Dict[str, int]:
-        """Send bulk emails to multiple officers"""
-        results = {"sent": 0, "failed": 0}
+    def send_saved_search_digest(self, to_email: str, user_name: str, matches: Dict) -> bool:
+        """Email a user the new contracts matching their saved searches"""
+        total = sum(len(contracts) for contracts in matches.values())
+        if total == 1:
+            subject = "1 new contract matches your saved searches"
+        else:
+            subject = f"{total} new contracts match your saved searches"
         
-        for officer_id in officer_ids:
-            try:
-                if template_type == "introduction":
-                    success = self.send_introduction_email(db, officer_id)
-                elif template_type == "follow_up":
-                    success = self.send_follow_up_email(db, officer_id)
-                else:
-                    continue
-                
-                if success:
-                    results["sent"] += 1
-                else:
-                    results["failed"] += 1
-                    
-            except Exception as e:
-                logger.error(f"Failed to send bulk email to officer {officer_id}: {str(e)}")
-                results["failed"] += 1
+        context = {
+            'user_name': user_name,
+            'searches': [
+                {
+                    'name': name,
+                    'contracts': [
+                        {
+                            'title': contract.title,
+                            'agency': contract.agency,
+                            'naics_code': contract.naics_code,
+                            'value': f"${contract.value:,.2f}" if contract.value else "TBD",
+                        }
+                        for contract in contracts
+                    ],
+                }
+                for (search_id, name), contracts in matches.items()
+            ],
+        }
         
-        return results
+        body = self._get_saved_search_digest_template()
+        return self.send_email(to_email, subject, self.render_template(body, context))
+
+    def send_bulk_emails(self, db: Session, officer_ids: List[int], template_type: str) -> Dict[str, int]:
+        """Send bulk emails to multiple officers; officers and the template are loaded once"""
+        if template_type not in ("introduction", "follow_up"):
+            return {"sent": 0, "failed": 0}
+        return self._send_templated(db, officer_ids, template_type)
 
-    def check_follow_up_reminders(self, db: Session) -> List[Dict]:
-        """Check for communications that need follow-up"""
-        today = datetime.utcnow().date()
+    def latest_follow_up_subquery(self, db: Session):
+        """Rank each officer's communications carrying a follow-up, newest first"""
+        return db.query(
+            Communication.id.label('communication_id'),
+            Communication.contact_id.label('contact_id'),
+            Communication.date.label('last_contact'),
+            Communication.follow_up_date.label('follow_up_date'),
+            func.row_number().over(
+                partition_by=Communication.contact_id,
+                order_by=(Communication.date.desc(), Communication.id.desc())
+            ).label('position')
+        ).filter(Communication.follow_up_date.isnot(None)).subquery()
+
+    def follow_up_reminder_query(self, db: Session, as_of: Optional[date] = None) -> Query:
+        """Build the query for officers whose latest follow-up is due, most overdue first"""
+        today = as_of or datetime.utcnow().date()
+        latest = self.latest_follow_up_subquery(db)
         
-        # Find communications with follow-up dates today or overdue
-        overdue_communications = db.query(Communication).filter(
-            Communication.follow_up_date <= today
-        ).all()
+        return db.query(
+            latest.c.communication_id,
+            ProcurementOfficer.id.label('officer_id'),
+            ProcurementOfficer.name.label('officer_name'),
+            ProcurementOfficer.agency,
+            ProcurementOfficer.relationship_strength,
+            latest.c.last_contact,
+            latest.c.follow_up_date
+        ).join(
+            ProcurementOfficer, ProcurementOfficer.id == latest.c.contact_id
+        ).filter(
+            latest.c.position == 1,
+            latest.c.follow_up_date <= today
+        ).order_by(
+            latest.c.follow_up_date.asc(),
+            ProcurementOfficer.relationship_strength.desc().nulls_last(),
+            ProcurementOfficer.id.asc()
+        )
+
+    def check_follow_up_reminders(self, db: Session, skip: int = 0, limit: Optional[int] = 100,
+                                  as_of: Optional[date] = None) -> List[Dict]:
+        """Return one page of follow-up reminders"""
+        today = as_of or datetime.utcnow().date()
+        query = self.follow_up_reminder_query(db, today).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
         
-        reminders = []
-        for comm in overdue_communications:
-            officer = db.query(ProcurementOfficer).filter(
-                ProcurementOfficer.id == comm.contact_id
-            ).first()
-            
-            if officer:
-                reminders.append({
-                    'communication_id': comm.id,
-                    'officer_id': officer.id,
-                    'officer_name': officer.name,
-                    'agency': officer.agency,
-                    'last_contact': comm.date,
-                    'follow_up_date': comm.follow_up_date,
-                    'days_overdue': (today - comm.follow_up_date).days
-                })
+        return [self._reminder_from_row(row, today) for row in query]
+
+    def iter_follow_up_reminders(self, db: Session, batch_size: int = 500,
+                                 as_of: Optional[date] = None) -> Iterator[Dict]:
+        """Stream every due follow-up reminder without materializing the full result"""
+        today = as_of or datetime.utcnow().date()
+        query = self.follow_up_reminder_query(db, today).execution_options(
+            stream_results=True, yield_per=batch_size
+        )
         
-        return reminders
+        for row in query:
+            yield self._reminder_from_row(row, today)
+
+    def _reminder_from_row(self, row, today: date) -> Dict:
+        return {
+            'communication_id': row.communication_id,
+            'officer_id': row.officer_id,
+            'officer_name': row.officer_name,
+            'agency': row.agency,
+            'relationship_strength': row.relationship_strength,
+            'last_contact': row.last_contact,
+            'follow_up_date': row.follow_up_date,
+            'days_overdue': (today - row.follow_up_date).days
+        }
 
     def _get_default_introduction_template(self) -> str:
         """Default introduction email template"""
@@ -377,5 +464,67 @@ class EmailService:
         </html>
         """
 
+    def _get_opportunity_digest_template(self) -> str:
+        """Opportunity alert template for a batch of contracts"""
+        return """
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <div style="background: linear-gradient(135deg, #1e3a8a 0%, #10b981 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
+                    <h2 style="margin: 0;">New Contract Opportunities</h2>
+                    <p style="margin: 5px 0 0 0;">KDP Global Enterprises</p>
+                </div>
+                
+                <p>Dear {{ officer_name }},</p>
+                
+                <p>I wanted to bring to your attention new contract opportunities that may be of interest:</p>
+                
+                {% for opportunity in opportunities %}
+                <div style="background-color: #f8fafc; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3 style="color: #1e3a8a; margin-top: 0;">{{ opportunity.title }}</h3>
+                    <p><strong>Estimated Value:</strong> {{ opportunity.value }}</p>
+                </div>
+                {% endfor %}
+                
+                <p>{{ company_name }} has identified qualified contractors in our network who would be excellent candidates for these opportunities.</p>
+                
+                <p>Please let me know if you'd like more information.</p>
+                
+                <p>Best regards,</p>
+                <p><strong>{{ sender_name }}</strong><br>
+                KDP Global Enterprises</p>
+            </div>
+        </body>
+        </html>
+        """
+
+    def _get_saved_search_digest_template(self) -> str:
+        """Saved search match digest template"""
+        return """
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <div style="background: linear-gradient(135deg, #1e3a8a 0%, #10b981 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
+                    <h2 style="margin: 0;">Saved Search Matches</h2>
+                    <p style="margin: 5px 0 0 0;">KDP Global Contract Brokerage System</p>
+                </div>
+                
+                <p>Hi {{ user_name }},</p>
+                
+                <p>New contracts were added that match your saved searches:</p>
+                
+                {% for search in searches %}
+                <h3 style="color: #1e3a8a;">{{ search.name }}</h3>
+                <ul>
+                    {% for contract in search.contracts %}
+                    <li><strong>{{ contract.title }}</strong> &mdash; {{ contract.agency }} (NAICS {{ contract.naics_code }}), {{ contract.value }}</li>
+                    {% endfor %}
+                </ul>
+                {% endfor %}
+            </div>
+        </body>
+        </html>
+        """
+
 # Initialize email service
 email_service = EmailService()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import hashlib
+from datetime import date
+from typing import Optional, Sequence
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from database.database import get_db
+from database.models import ChangeLog, User
+from auth.auth import get_current_active_user
+from services.cache_service import cache_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cache tag whose version is mixed into every ETag; bumped when the change log is rewound
+EPOCH_TAG = "etag_epoch"
+
+class ETagService:
+    """Conditional GET validators built on the change feed.
+
+    The version of an entity is the newest ``change_log`` id recorded for it,
+    and the version of a single row is the newest id recorded for that row;
+    both are one backward scan of an index. The oldest retained id is mixed in
+    as an epoch so a row whose history has been pruned never falls back to a
+    version it had before, together with the ``EPOCH_TAG`` cache tag version,
+    which ``bump_epoch`` moves on when a restore rewinds the log and ids are
+    handed out again. When the client's ``If-None-Match`` matches, the
+    request is answered with 304 before the endpoint body runs, so neither the
+    main query nor serialization happens.
+    """
+
+    def entity_etag(self, db: Session, request: Request, entities: Sequence[str], daily: bool = False) -> str:
+        versions = db.execute(select(
+            *[
+                select(func.max(ChangeLog.id)).where(ChangeLog.entity == entity).scalar_subquery()
+                for entity in entities
+            ],
+            self._epoch()
+        )).one()
+        extra = [date.today().isoformat()] if daily else []
+        return self._etag(request, [*versions, *cache_service.versions([EPOCH_TAG]), *extra])
+
+    def row_etag(self, db: Session, request: Request, entity: str, entity_id: int,
+                 related: Sequence[str] = ()) -> str:
+        """Row version, plus the entity versions of any ``related`` collections embedded with it"""
+        versions = db.execute(select(
+            select(func.max(ChangeLog.id)).where(
+                ChangeLog.entity == entity,
+                ChangeLog.entity_id == entity_id
+            ).scalar_subquery(),
+            *[
+                select(func.max(ChangeLog.id)).where(ChangeLog.entity == other).scalar_subquery()
+                for other in related
+            ],
+            self._epoch()
+        )).one()
+        return self._etag(request, [*versions, *cache_service.versions([EPOCH_TAG])])
+
+    def check(self, request: Request, response: Response, etag: str):
+        """Answer 304 if the client already holds this version, else tag the response"""
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if self._matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        # Routes that build their own Response (e.g. cached ones) copy these across
+        request.state.conditional_headers = headers
+
+    def bump_epoch(self):
+        """Retire every ETag handed out so far"""
+        cache_service.invalidate([EPOCH_TAG])
+
+    def _epoch(self):
+        return select(func.min(ChangeLog.id)).scalar_subquery()
+
+    def _etag(self, request: Request, parts: list) -> str:
+        # The URL (filters included) is part of the tag, so two listings never share one
+        key = "|".join([request.url.path, str(request.query_params), *(str(part) for part in parts)])
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+    def _matches(self, header: Optional[str], etag: str) -> bool:
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        # Weak comparison (RFC 9110 8.8.3.2): W/ prefixes are ignored
+        candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+        return etag.removeprefix("W/") in candidates
+
+# Initialize ETag service
+etag_service = ETagService()
+
+def _embedded(request: Request, related: Sequence[str]) -> list:
+    # Related entities only shape the response when include= embeds them
+    return list(related) if request.query_params.get("include") else []
+
+def conditional_get(*entities: str, daily: bool = False, related: Sequence[str] = ()):
+    """Route dependency: 304 when none of ``entities`` changed since the client's copy.
+
+    ``daily`` also varies the tag by date, for endpoints that depend on today.
+    ``related`` entities count too when the request embeds them with include=.
+    """
+    def dependency(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+    ):
+        tracked = [*entities, *_embedded(request, related)]
+        etag_service.check(request, response, etag_service.entity_etag(db, request, tracked, daily=daily))
+    return dependency
+
+def conditional_get_row(entity: str, path_param: str, related: Sequence[str] = ()):
+    """Route dependency: 304 when the row named by ``path_param`` is unchanged"""
+    def dependency(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+    ):
+        try:
+            entity_id = int(request.path_params[path_param])
+        except (KeyError, ValueError):
+            # Let the endpoint's own validation report the bad id
+            return
+        etag = etag_service.row_etag(db, request, entity, entity_id, related=_embedded(request, related))
+        etag_service.check(request, response, etag)
+    return dependency
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+import redis
+import redis.asyncio as aioredis
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from database.models import Contract, RevenueTracking
+import logging
+
+logger = logging.getLogger(__name__)
+
+EVENT_CHANNEL = "kdp:events"
+DASHBOARD_STATS_KEY = "kdp:dashboard:stats"
+DASHBOARD_PENDING_KEY = "kdp:dashboard:pending"
+
+# Fields pushed for each newly created row, matching GET /api/dashboard/recent-activity
+SUMMARY_COLUMNS = {
+    Contract: (Contract.id, Contract.title, Contract.agency, Contract.value, Contract.status,
+               Contract.opportunity_score, Contract.created_at),
+    RevenueTracking: (RevenueTracking.id, RevenueTracking.contract_id, RevenueTracking.fee_amount,
+                      RevenueTracking.placement_date, RevenueTracking.created_at),
+}
+
+EVENT_TYPES = {
+    Contract: "contract.created",
+    RevenueTracking: "revenue.created",
+}
+
+class EventBus:
+    """Push channel for the dashboard, fanned out through Redis pub/sub.
+
+    ORM writes stage events on the session as rows are flushed and publish
+    them only after the transaction commits; set-based writes call
+    ``publish_written`` once they have committed. Every uvicorn worker holds a
+    single Redis subscription and copies each message to the in-process queues
+    of its open SSE streams, so Redis load follows the change rate, not the
+    number of viewers. Dashboard aggregates are recomputed by one Celery task at most
+    once per ``dashboard_interval`` while data keeps changing, and cached in
+    Redis for streams that connect in between.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.dashboard_interval = int(os.getenv("DASHBOARD_PUSH_INTERVAL_SECONDS", "5"))
+        self.heartbeat_seconds = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+        self.queue_size = 100
+        self.max_created_events = 20
+        self._client: Optional[redis.Redis] = None
+        self._listeners: set = set()
+        self._reader: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url)
+        return self._client
+
+    def publish(self, event_type: str, data) -> bool:
+        """Publish one event; a Redis outage never fails the write that caused it"""
+        try:
+            self.client.publish(EVENT_CHANNEL, json.dumps({'type': event_type, 'data': jsonable_encoder(data)}))
+            return True
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish {event_type}: {str(e)}")
+            return False
+
+    def stage(self, session: Session, event_type: str, data: Dict):
+        """Queue an event to be published once the session commits"""
+        session.info.setdefault('pending_events', []).append((event_type, data))
+
+    def publish_written(self, db: Session, model, created_ids: List[int] = (), changed: bool = True):
+        """Push events for a committed set-based write (bulk endpoints, imports)"""
+        if model not in SUMMARY_COLUMNS:
+            return
+        if created_ids:
+            # The dashboard lists only the latest few, so a large batch is not replayed row by row
+            rows = db.execute(
+                select(*SUMMARY_COLUMNS[model]).where(
+                    model.id.in_(created_ids)
+                ).order_by(model.id.desc()).limit(self.max_created_events)
+            ).all()
+            for row in reversed(rows):
+                self.publish(EVENT_TYPES[model], dict(row._mapping))
+        if created_ids or changed:
+            self.request_dashboard_refresh()
+
+    def request_dashboard_refresh(self):
+        """Schedule one aggregate refresh per interval, however many writes land in it"""
+        try:
+            if not self.client.set(DASHBOARD_PENDING_KEY, 1, nx=True, ex=self.dashboard_interval * 4):
+                return
+        except redis.RedisError as e:
+            logger.warning(f"Could not schedule dashboard refresh: {str(e)}")
+            return
+
+        # Runs after commit: a broker error must not fail a write that already succeeded
+        try:
+            from tasks import publish_dashboard_stats_task
+            publish_dashboard_stats_task.apply_async(countdown=self.dashboard_interval, retry=False)
+        except Exception as e:
+            logger.error(f"Could not queue dashboard refresh: {str(e)}")
+            # Let the next write try again instead of waiting out the flag
+            try:
+                self.client.delete(DASHBOARD_PENDING_KEY)
+            except redis.RedisError:
+                pass
+
+    def publish_dashboard_stats(self, stats):
+        # Clear the pending flag first so writes during this refresh schedule the next one
+        try:
+            self.client.delete(DASHBOARD_PENDING_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Could not clear dashboard refresh flag: {str(e)}")
+        self.cache_dashboard_stats(stats)
+        self.publish("dashboard.stats", stats)
+
+    def cache_dashboard_stats(self, stats):
+        try:
+            self.client.set(DASHBOARD_STATS_KEY, json.dumps(jsonable_encoder(stats)))
+        except redis.RedisError as e:
+            logger.warning(f"Could not cache dashboard stats: {str(e)}")
+
+    def cached_dashboard_stats(self) -> Optional[Dict]:
+        try:
+            cached = self.client.get(DASHBOARD_STATS_KEY)
+        except redis.RedisError:
+            return None
+        return json.loads(cached) if cached else None
+
+    def sse_frame(self, type: str, data) -> str:
+        """Encode an event once per worker, not once per viewer"""
+        return f"event: {type}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        """In-process queue of SSE frames for every event published while the context is open"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._listeners.add(queue)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+        try:
+            yield queue
+        finally:
+            self._listeners.discard(queue)
+            if not self._listeners and self._reader is not None:
+                self._reader.cancel()
+                self._reader = None
+
+    async def _read(self):
+        """Single Redis subscription per worker process, copied to every open stream"""
+        while self._listeners:
+            client = aioredis.Redis.from_url(self.redis_url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(EVENT_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    try:
+                        frame = self.sse_frame(**json.loads(message['data']))
+                    except (ValueError, TypeError) as e:
+                        # One malformed message must not end every open stream
+                        logger.warning(f"Skipping malformed dashboard event: {str(e)}")
+                        continue
+                    for queue in list(self._listeners):
+                        if queue.full():
+                            # A stalled viewer loses its oldest events rather than holding up the rest
+                            queue.get_nowait()
+                        queue.put_nowait(frame)
+            except redis.RedisError as e:
+                logger.warning(f"Event subscription lost, reconnecting: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+# Initialize event bus
+event_bus = EventBus()
+
+@event.listens_for(Session, "after_flush")
+def _stage_flush(session: Session, flush_context):
+    for instance in session.new:
+        model = type(instance)
+        if model in SUMMARY_COLUMNS:
+            event_bus.stage(session, EVENT_TYPES[model], {
+                column.key: getattr(instance, column.key) for column in SUMMARY_COLUMNS[model]
+            })
+    if any(type(instance) in SUMMARY_COLUMNS for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info['dashboard_stale'] = True
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session):
+    pending = session.info.pop('pending_events', [])
+    stale = session.info.pop('dashboard_stale', False)
+    for event_type, data in pending:
+        event_bus.publish(event_type, data)
+    if stale:
+        event_bus.request_dashboard_refresh()
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session: Session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop('pending_events', None)
+        session.info.pop('dashboard_stale', None)
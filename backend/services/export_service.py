@@ -0,0 +1,98 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from typing import Iterator, List
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from sqlalchemy.orm import Query, Session
+import logging
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+class ExportService:
+    """Constant-memory table exports.
+
+    Rows are selected as plain column tuples (no ORM hydration) and pulled
+    through a server-side cursor with ``yield_per``, so at most one batch is
+    held in memory. CSV is written to the response line by line; XLSX goes
+    through an openpyxl write-only workbook spooled to a temporary file and
+    then streamed from disk.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+        self.chunk_size = 64 * 1024
+
+    def columns_for(self, model) -> List:
+        return [getattr(model, column.key) for column in model.__table__.columns]
+
+    def select_rows(self, db: Session, model) -> Query:
+        """Column-only query over a model, ready for the router's filters"""
+        return db.query(*self.columns_for(model))
+
+    def stream_rows(self, query: Query) -> Iterator[tuple]:
+        return iter(query.execution_options(stream_results=True, yield_per=self.batch_size))
+
+    def iter_csv(self, query: Query, header: List[str]) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+
+        for position, row in enumerate(self.stream_rows(query), start=1):
+            writer.writerow(row)
+            if position % self.batch_size == 0:
+                yield self._drain(buffer)
+
+        yield self._drain(buffer)
+
+    def iter_xlsx(self, query: Query, header: List[str], title: str) -> Iterator[bytes]:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=title[:31])
+        sheet.append(header)
+        for row in self.stream_rows(query):
+            sheet.append(list(row))
+
+        handle = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        try:
+            handle.close()
+            workbook.save(handle.name)
+            with open(handle.name, 'rb') as export_file:
+                while True:
+                    chunk = export_file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(handle.name)
+
+    def export_response(self, query: Query, name: str, format: str = "csv") -> StreamingResponse:
+        """Stream a filtered column query as a CSV or XLSX download"""
+        header = [column['name'] for column in query.column_descriptions]
+        filename = f"{name}_{datetime.utcnow().strftime('%Y%m%d')}.{format}"
+
+        if format == "xlsx":
+            content = self.iter_xlsx(query, header, name)
+        else:
+            content = self.iter_csv(query, header)
+
+        return StreamingResponse(
+            content,
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+
+    def _drain(self, buffer: io.StringIO) -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+# Initialize export service
+export_service = ExportService()
@@ -0,0 +1,154 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import case, literal
+from sqlalchemy.orm import Session
+from database.models import Contract
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Brokerage fee schedules. Tiers are marginal: [upper bound, rate] brackets in
+# ascending order, the last one open-ended (null bound), each rate applying to
+# the part of the contract value inside its bracket. The fee is then held
+# between ``minimum`` and ``cap`` (null for no cap).
+DEFAULT_FEE_SCHEDULES = {
+    'default': {'tiers': [[None, 0.03]], 'minimum': 0.0, 'cap': None},
+    # Schedule name per NAICS code or agency; an agency schedule beats a NAICS one
+    'naics': {},
+    'agency': {},
+    'schedules': {},
+}
+
+class FeeService:
+    """Brokerage fees under tiered, capped schedules, a portfolio at a time.
+
+    ``FEE_SCHEDULES_FILE`` replaces the default flat 3% with a JSON file of
+    the shape of ``DEFAULT_FEE_SCHEDULES``: named schedules under
+    ``schedules``, picked per contract by its agency, else its NAICS code,
+    else ``default``. The schedule is chosen in SQL; the fees of every
+    contract using it are computed with NumPy over the streamed value column.
+    """
+
+    def __init__(self):
+        self.chunk_size = int(os.getenv("FEE_CHUNK_SIZE", "50000"))
+        config = dict(DEFAULT_FEE_SCHEDULES)
+        schedules_file = os.getenv("FEE_SCHEDULES_FILE")
+        if schedules_file:
+            with open(schedules_file) as f:
+                config.update(json.load(f))
+        self.schedules = {'default': config['default'], **config['schedules']}
+        self.names = list(self.schedules)
+        self.by_agency: Dict[str, str] = config['agency']
+        self.by_naics: Dict[str, str] = config['naics']
+        for name in [*self.by_agency.values(), *self.by_naics.values()]:
+            if name not in self.schedules:
+                raise ValueError(f"Unknown fee schedule {name}")
+        self._brackets = {name: self._bracket_arrays(name, schedule) for name, schedule in self.schedules.items()}
+
+    def schedule_for(self, naics_code: Optional[str], agency: Optional[str]) -> str:
+        return self.by_agency.get(agency) or self.by_naics.get(naics_code) or 'default'
+
+    def fee(self, value: float, naics_code: Optional[str], agency: Optional[str]) -> Tuple[str, float]:
+        """Schedule name and fee for one contract value"""
+        name = self.schedule_for(naics_code, agency)
+        return name, float(self._fees(name, np.array([value], dtype=float))[0])
+
+    def portfolio(self, db: Session, query, per_contract: bool = True) -> Dict:
+        """Fees over every contract ``query`` selects, with totals per schedule.
+
+        ``query`` is a Contract query carrying the caller's filters; only the
+        columns the schedules need are read from it.
+        """
+        schedule = self._schedule_case()
+        statement = query.with_entities(Contract.id, Contract.value, schedule).order_by(None).statement
+        # Plain Core rows: these are tuples, never ORM entities, so skip the ORM result layer
+        result = db.connection().execute(statement.execution_options(yield_per=self.chunk_size))
+
+        totals = {name: {'contracts': 0, 'total_value': 0.0, 'total_fee': 0.0} for name in self.names}
+        contracts = unvalued = 0
+        results: List[Dict] = []
+        for partition in result.partitions():
+            ids, values, schedules = zip(*partition)
+            ids = np.array(ids, dtype=np.int64)
+            values = np.array(values, dtype=float)
+            schedules = np.array(schedules, dtype=np.int64)
+            fees = np.full(len(values), np.nan)
+            contracts += len(values)
+
+            valued = ~np.isnan(values)
+            unvalued += int((~valued).sum())
+            for position in np.unique(schedules[valued]):
+                name = self.names[position]
+                mask = valued & (schedules == position)
+                fees[mask] = self._fees(name, values[mask])
+                totals[name]['contracts'] += int(mask.sum())
+                totals[name]['total_value'] += float(values[mask].sum())
+                totals[name]['total_fee'] += float(fees[mask].sum())
+
+            if per_contract:
+                results.extend(self._results(ids[valued], values[valued], schedules[valued], fees[valued]))
+
+        by_schedule = {
+            name: {**total, 'total_value': round(total['total_value'], 2), 'total_fee': round(total['total_fee'], 2)}
+            for name, total in totals.items() if total['contracts']
+        }
+        total_value = sum(total['total_value'] for total in totals.values())
+        total_fee = sum(total['total_fee'] for total in totals.values())
+        return {
+            'contracts': contracts,
+            'unvalued_contracts': unvalued,
+            'total_value': round(total_value, 2),
+            'total_fee': round(total_fee, 2),
+            'effective_rate': round(total_fee / total_value, 6) if total_value else None,
+            'by_schedule': by_schedule,
+            'results': results if per_contract else None
+        }
+
+    def _fees(self, name: str, values: np.ndarray) -> np.ndarray:
+        lower, width, rates = self._brackets[name]
+        # Part of each value inside each bracket, times that bracket's rate
+        inside = np.clip(values[:, None] - lower[None, :], 0, width[None, :])
+        fees = inside @ rates
+        schedule = self.schedules[name]
+        return np.clip(fees, schedule.get('minimum') or 0.0, schedule['cap'] if schedule.get('cap') is not None else np.inf)
+
+    def _bracket_arrays(self, name: str, schedule: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        tiers = schedule.get('tiers') or []
+        if not tiers:
+            raise ValueError(f"Fee schedule {name} has no tiers")
+        if tiers[-1][0] is not None:
+            raise ValueError(f"Fee schedule {name}: the last tier must be open-ended (null bound)")
+        bounds = [np.inf if bound is None else float(bound) for bound, _ in tiers]
+        if any(lower >= upper for lower, upper in zip([0.0, *bounds[:-1]], bounds)):
+            raise ValueError(f"Fee schedule {name}: tier bounds must be positive and ascending")
+        lower = np.array([0.0, *bounds[:-1]])
+        return lower, np.array(bounds) - lower, np.array([float(rate) for _, rate in tiers])
+
+    def _schedule_case(self):
+        """Position in ``names`` of each contract's schedule, worked out by the database"""
+        whens = [
+            *[(Contract.agency == agency, self.names.index(name)) for agency, name in self.by_agency.items()],
+            *[(Contract.naics_code == naics, self.names.index(name)) for naics, name in self.by_naics.items()],
+        ]
+        return case(*whens, else_=0) if whens else literal(0)
+
+    def _results(self, ids: np.ndarray, values: np.ndarray, schedules: np.ndarray, fees: np.ndarray) -> List[Dict]:
+        rates = np.divide(fees, values, out=np.zeros_like(fees), where=values != 0)
+        return [
+            {
+                'contract_id': contract_id,
+                'contract_value': value,
+                'schedule': self.names[schedule],
+                'fee_amount': fee,
+                'fee_percentage': rate
+            }
+            for contract_id, value, schedule, fee, rate in zip(
+                ids.tolist(), values.tolist(), schedules.tolist(),
+                np.round(fees, 2).tolist(), np.round(rates * 100, 4).tolist()
+            )
+        ]
+
+# Initialize fee service
+fee_service = FeeService()
@@ -0,0 +1,203 @@
+from datetime import datetime, time
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from database.models import Communication, FollowUpSchedule, ProcurementOfficer
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class FollowUpScheduler:
+    """Due-queue for follow-ups.
+
+    Every communication carrying a ``follow_up_date`` is registered here when it
+    is written, keyed by officer so only the latest follow-up per officer is
+    pending. A short-interval poller then reads just the rows that are due
+    through the ``ix_follow_up_schedule_pending`` partial index, instead of the
+    daily scan over the whole communications table.
+    """
+
+    def __init__(self):
+        self.due_hour = int(os.getenv("FOLLOW_UP_DUE_HOUR", "0"))
+        self.poll_batch_size = int(os.getenv("FOLLOW_UP_POLL_BATCH_SIZE", "500"))
+
+    def due_at(self, follow_up_date) -> datetime:
+        """UTC moment a follow-up date becomes due"""
+        return datetime.combine(follow_up_date, time(hour=self.due_hour))
+
+    def register(self, db: Session, communication: Communication) -> Optional[FollowUpSchedule]:
+        """Queue (or re-queue) the follow-up of a communication; the caller commits"""
+        if communication.follow_up_date is None:
+            self.cancel(db, communication.id)
+            return None
+
+        return self.register_many(db, [communication])[communication.contact_id]
+
+    def register_many(self, db: Session, communications: List[Communication]) -> Dict[int, FollowUpSchedule]:
+        """Queue the follow-ups of a batch of communications with one lookup; the caller commits
+
+        Communications without a ``follow_up_date`` are skipped. Returns the
+        queued entry of each officer touched.
+        """
+        communications = [communication for communication in communications if communication.follow_up_date is not None]
+        if not communications:
+            return {}
+        if any(communication.id is None for communication in communications):
+            db.flush()
+
+        entries = {
+            entry.contact_id: entry
+            for entry in db.query(FollowUpSchedule).filter(
+                FollowUpSchedule.contact_id.in_({communication.contact_id for communication in communications})
+            )
+        }
+        for communication in communications:
+            entry = entries.get(communication.contact_id)
+
+            # An older communication being edited never displaces the officer's latest follow-up
+            if entry and entry.communication_id != communication.id and entry.communication_date > communication.date:
+                continue
+
+            if entry is None:
+                entry = FollowUpSchedule(contact_id=communication.contact_id)
+                db.add(entry)
+                entries[communication.contact_id] = entry
+
+            entry.communication_id = communication.id
+            entry.communication_date = communication.date
+            entry.due_at = self.due_at(communication.follow_up_date)
+            entry.fired_at = None
+        return entries
+
+    def cancel(self, db: Session, communication_id: int) -> int:
+        """Drop the queued follow-up of a communication, if it is the queued one.
+
+        The officer's latest other communication with a follow-up date is
+        queued in its place; the caller commits.
+        """
+        if communication_id is None:
+            return 0
+        return self.cancel_many(db, [communication_id])
+
+    def resync(self, db: Session, communication_ids: List[int]):
+        """Re-register a batch of communications after a bulk write, then commit"""
+        if not communication_ids:
+            return
+        db.query(FollowUpSchedule).filter(
+            FollowUpSchedule.communication_id.in_(communication_ids)
+        ).delete(synchronize_session=False)
+
+        communications = db.query(Communication).filter(
+            Communication.id.in_(communication_ids)
+        ).order_by(Communication.date.asc(), Communication.id.asc()).all()
+
+        # Only the newest follow-up of each officer in the batch can win
+        latest = {}
+        for communication in communications:
+            if communication.follow_up_date is not None:
+                latest[communication.contact_id] = communication
+        for communication in latest.values():
+            self.register(db, communication)
+        db.commit()
+
+    def cancel_many(self, db: Session, communication_ids: List[int]) -> int:
+        """Drop the queued follow-ups of a batch of communications and queue each
+        officer's latest remaining one instead; the caller commits"""
+        contact_ids = [
+            contact_id for contact_id, in db.query(FollowUpSchedule.contact_id).filter(
+                FollowUpSchedule.communication_id.in_(communication_ids)
+            )
+        ]
+        deleted = db.query(FollowUpSchedule).filter(
+            FollowUpSchedule.communication_id.in_(communication_ids)
+        ).delete(synchronize_session=False)
+        if not contact_ids:
+            return deleted
+
+        # Newest first per officer, the order the reminder query ranks them in
+        remaining = db.query(Communication).filter(
+            Communication.contact_id.in_(contact_ids),
+            Communication.follow_up_date.isnot(None),
+            Communication.id.notin_(communication_ids)
+        ).order_by(Communication.date.desc(), Communication.id.desc()).all()
+        requeued = set()
+        for communication in remaining:
+            if communication.contact_id not in requeued:
+                requeued.add(communication.contact_id)
+                self.register(db, communication)
+        # Visible to a register() that follows in the same transaction
+        db.flush()
+        return deleted
+
+    def poll(self, db: Session, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Fire every pending follow-up that is due and mark it as fired"""
+        now = now or datetime.utcnow()
+
+        due_entries = db.query(FollowUpSchedule, ProcurementOfficer).join(
+            ProcurementOfficer, ProcurementOfficer.id == FollowUpSchedule.contact_id
+        ).filter(
+            FollowUpSchedule.fired_at.is_(None),
+            FollowUpSchedule.due_at <= now
+        ).order_by(
+            FollowUpSchedule.due_at.asc()
+        ).limit(limit or self.poll_batch_size).with_for_update(
+            skip_locked=True, of=FollowUpSchedule
+        ).all()
+
+        reminders = []
+        for entry, officer in due_entries:
+            entry.fired_at = now
+            reminders.append({
+                'communication_id': entry.communication_id,
+                'officer_id': officer.id,
+                'officer_name': officer.name,
+                'agency': officer.agency,
+                'relationship_strength': officer.relationship_strength,
+                'due_at': entry.due_at,
+                'days_overdue': (now.date() - entry.due_at.date()).days
+            })
+
+        db.commit()
+        return reminders
+
+    def backfill(self, db: Session, batch_size: int = 1000) -> int:
+        """Rebuild the queue from the communications table (one-off, e.g. after deploy)"""
+        from services.email_service import email_service
+
+        latest = email_service.latest_follow_up_subquery(db)
+        rows = db.query(
+            latest.c.communication_id,
+            latest.c.contact_id,
+            latest.c.last_contact,
+            latest.c.follow_up_date
+        ).filter(
+            latest.c.position == 1
+        ).execution_options(stream_results=True, yield_per=batch_size)
+
+        db.query(FollowUpSchedule).delete(synchronize_session=False)
+
+        queued = 0
+        batch = []
+        for row in rows:
+            batch.append({
+                'contact_id': row.contact_id,
+                'communication_id': row.communication_id,
+                'communication_date': row.last_contact,
+                'due_at': self.due_at(row.follow_up_date),
+                'created_at': datetime.utcnow(),
+                'updated_at': datetime.utcnow()
+            })
+            if len(batch) >= batch_size:
+                db.bulk_insert_mappings(FollowUpSchedule, batch)
+                queued += len(batch)
+                batch = []
+
+        if batch:
+            db.bulk_insert_mappings(FollowUpSchedule, batch)
+            queued += len(batch)
+
+        db.commit()
+        return queued
+
+# Initialize follow-up scheduler
+follow_up_scheduler = FollowUpScheduler()
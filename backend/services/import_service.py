@@ -0,0 +1,284 @@
+import codecs
+from collections import deque
+import csv
+import io
+import os
+import time
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, get_args
+from openpyxl import load_workbook
+from pydantic import ValidationError
+from sqlalchemy import insert, tuple_, update
+from sqlalchemy.orm import Session
+from database.models import Contract, PrimeContractor, ProcurementOfficer, Subcontractor
+from schemas.schemas import ContractCreate, PrimeContractorCreate, ProcurementOfficerCreate, SubcontractorCreate
+from services.change_feed import change_feed
+from services.event_bus import event_bus
+import logging
+
+logger = logging.getLogger(__name__)
+
+# entity -> (model, row schema, natural key used to upsert)
+IMPORT_ENTITIES = {
+    'contracts': (Contract, ContractCreate, ('title', 'agency')),
+    'procurement_officers': (ProcurementOfficer, ProcurementOfficerCreate, ('name', 'agency')),
+    'prime_contractors': (PrimeContractor, PrimeContractorCreate, ('company_name',)),
+    'subcontractors': (Subcontractor, SubcontractorCreate, ('company_name',)),
+}
+
+# Spreadsheet headings commonly found in the Drive contact sheets
+HEADER_ALIASES = {
+    'full_name': 'name',
+    'contact_name': 'name',
+    'organization': 'agency',
+    'department': 'agency',
+    'email_address': 'email',
+    'phone_number': 'phone',
+    'company': 'company_name',
+    'naics': 'naics_code',
+    'contract_value': 'value',
+    'response_deadline': 'deadline',
+}
+
+MAX_REPORTED_REJECTS = 1000
+
+class ImportService:
+    """Bulk loader for CSV/XLSX contact and contract sheets.
+
+    Rows are read lazily (csv module, or openpyxl in read-only mode), validated
+    in batches against the same pydantic schemas the POST endpoints use, and
+    upserted one batch per transaction: a single keyed lookup decides which rows
+    already exist, existing rows get one executemany UPDATE, and new rows go
+    through COPY on PostgreSQL or a multi-row INSERT elsewhere.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+        self.import_directory = os.getenv("IMPORT_DIRECTORY", "imports")
+
+    def resolve_local_file(self, filename: str) -> str:
+        """Path of a file in the local import directory (stand-in for the Drive folder)"""
+        root = os.path.realpath(self.import_directory)
+        path = os.path.realpath(os.path.join(root, filename))
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+            raise FileNotFoundError(filename)
+        return path
+
+    def iter_rows(self, stream: BinaryIO, filename: str) -> Iterator[Dict]:
+        if filename.lower().endswith(('.xlsx', '.xlsm')):
+            return self._iter_xlsx_rows(stream)
+        return self._iter_csv_rows(stream)
+
+    def import_file(self, db: Session, entity: str, stream: BinaryIO, filename: str,
+                    progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Validate and upsert every row of a file, reporting rejects by row number"""
+        model, schema, key_fields = IMPORT_ENTITIES[entity]
+        started = time.monotonic()
+        result = {
+            'entity': entity,
+            'filename': filename,
+            'processed': 0,
+            'inserted': 0,
+            'updated': 0,
+            'rejected': 0,
+            'rejects': [],
+            # Newest inserted ids, pushed to the dashboard once the file is done
+            'recent_ids': deque(maxlen=event_bus.max_created_events),
+        }
+
+        batch: List[Tuple[int, Dict]] = []
+        # Row 1 is the header, so data starts on row 2
+        for row_number, row in enumerate(self.iter_rows(stream, filename), start=2):
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self._process_batch(db, model, schema, key_fields, batch, result)
+                batch = []
+                if progress:
+                    progress(self._summary(result, started))
+
+        if batch:
+            self._process_batch(db, model, schema, key_fields, batch, result)
+
+        event_bus.publish_written(
+            db, model, created_ids=list(result['recent_ids']), changed=result['updated'] > 0
+        )
+
+        summary = self._summary(result, started)
+        summary['rejects'] = result['rejects']
+        logger.info(
+            f"Imported {filename} into {entity}: {result['inserted']} inserted, "
+            f"{result['updated']} updated, {result['rejected']} rejected in {summary['duration_seconds']}s"
+        )
+        return summary
+
+    def _process_batch(self, db: Session, model, schema, key_fields, batch, result):
+        valid: Dict[tuple, Dict] = {}
+        text_fields = self._text_fields(schema)
+        for row_number, row in batch:
+            result['processed'] += 1
+            try:
+                parsed = schema(**self._coerce_text(row, text_fields))
+            except ValidationError as e:
+                result['rejected'] += 1
+                if len(result['rejects']) < MAX_REPORTED_REJECTS:
+                    result['rejects'].append({
+                        'row': row_number,
+                        'errors': [
+                            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                            for error in e.errors()
+                        ]
+                    })
+                continue
+            values = parsed.dict()
+            # A later row with the same key replaces the earlier one. Updates only
+            # write the columns the sheet has, so absent ones keep their values
+            valid[tuple(values[field] for field in key_fields)] = (values, parsed.dict(exclude_unset=True))
+
+        if not valid:
+            return
+
+        try:
+            existing = self._existing_ids(db, model, key_fields, list(valid))
+            now = datetime.utcnow()
+            inserts, updates = [], []
+            for key, (values, present) in valid.items():
+                if key in existing:
+                    present['id'] = existing[key]
+                    if hasattr(model, 'updated_at'):
+                        present['updated_at'] = now
+                    updates.append(present)
+                else:
+                    values['created_at'] = now
+                    if hasattr(model, 'updated_at'):
+                        values['updated_at'] = now
+                    inserts.append(values)
+
+            if updates:
+                # executemany needs the same columns in every row of a call
+                by_columns: Dict[tuple, List[Dict]] = {}
+                for values in updates:
+                    by_columns.setdefault(tuple(sorted(values)), []).append(values)
+                for rows in by_columns.values():
+                    db.execute(update(model), rows)
+                change_feed.record(db, model.__tablename__, [values['id'] for values in updates])
+            if inserts:
+                self._insert_rows(db, model, inserts)
+                # COPY does not return ids, so look the new rows up by their natural key
+                inserted = self._existing_ids(
+                    db, model, key_fields, [tuple(values[field] for field in key_fields) for values in inserts]
+                )
+                change_feed.record(db, model.__tablename__, inserted.values())
+                result['recent_ids'].extend(sorted(inserted.values()))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        result['inserted'] += len(inserts)
+        result['updated'] += len(updates)
+
+    def _existing_ids(self, db: Session, model, key_fields, keys: List[tuple]) -> Dict[tuple, int]:
+        columns = [getattr(model, field) for field in key_fields]
+        if len(columns) == 1:
+            condition = columns[0].in_([key[0] for key in keys])
+        else:
+            condition = tuple_(*columns).in_(keys)
+
+        return {
+            tuple(row[1:]): row[0]
+            for row in db.query(model.id, *columns).filter(condition)
+        }
+
+    def _insert_rows(self, db: Session, model, rows: List[Dict]):
+        connection = db.connection()
+        if connection.dialect.name == 'postgresql':
+            self._copy_rows(connection, model, rows)
+        else:
+            db.execute(insert(model), rows)
+
+    def _copy_rows(self, connection, model, rows: List[Dict]):
+        """COPY a batch into PostgreSQL through the session's own transaction"""
+        columns = list(rows[0].keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([r'\N' if row[column] is None else row[column] for column in columns])
+        buffer.seek(0)
+
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def _iter_csv_rows(self, stream: BinaryIO) -> Iterator[Dict]:
+        reader = csv.reader(codecs.iterdecode(stream, 'utf-8-sig'))
+        header = None
+        for values in reader:
+            if header is None:
+                header = [self._normalize_header(name) for name in values]
+                continue
+            if any(value.strip() for value in values):
+                yield self._row_dict(header, values)
+
+    def _iter_xlsx_rows(self, stream: BinaryIO) -> Iterator[Dict]:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            header = None
+            for values in workbook.active.iter_rows(values_only=True):
+                if header is None:
+                    header = [self._normalize_header(name) for name in values]
+                    continue
+                if any(value not in (None, '') for value in values):
+                    yield self._row_dict(header, values)
+        finally:
+            workbook.close()
+
+    def _text_fields(self, schema) -> set:
+        return {
+            name for name, field in schema.model_fields.items()
+            if field.annotation is str or str in get_args(field.annotation)
+        }
+
+    def _coerce_text(self, row: Dict, text_fields: set) -> Dict:
+        """Spreadsheet cells holding NAICS codes or phone numbers arrive as numbers"""
+        for name in text_fields & row.keys():
+            value = row[name]
+            if isinstance(value, float) and value.is_integer():
+                row[name] = str(int(value))
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                row[name] = str(value)
+        return row
+
+    def _normalize_header(self, name) -> str:
+        key = str(name or '').strip().lower().replace(' ', '_').replace('-', '_')
+        return HEADER_ALIASES.get(key, key)
+
+    def _row_dict(self, header: List[str], values) -> Dict:
+        row = {}
+        for name, value in zip(header, values):
+            if not name:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            row[name] = None if value == '' else value
+        return row
+
+    def _summary(self, result: Dict, started: float) -> Dict:
+        duration = time.monotonic() - started
+        return {
+            'entity': result['entity'],
+            'filename': result['filename'],
+            'processed': result['processed'],
+            'inserted': result['inserted'],
+            'updated': result['updated'],
+            'rejected': result['rejected'],
+            'duration_seconds': round(duration, 3),
+            'rows_per_second': round(result['processed'] / duration, 1) if duration else None,
+        }
+
+# Initialize import service
+import_service = ImportService()
@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+import redis
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "kdp:metrics"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name: (help, buckets, RequestMetrics attribute observed)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("Wall time per request", SECONDS_BUCKETS, 'duration'),
+    'http_request_db_seconds': ("Time spent executing database statements per request", SECONDS_BUCKETS, 'db_seconds'),
+    'http_request_db_statements': ("Database statements executed per request", (1, 2, 5, 10, 20, 50, 100, 200, 500), 'statements'),
+    'http_request_db_rows': ("Rows fetched from the database per request", (1, 10, 100, 1000, 10000, 100000), 'rows'),
+    'http_request_serialize_seconds': ("Time spent encoding the response body per request", SECONDS_BUCKETS, 'serialize_seconds'),
+}
+
+class RequestMetrics:
+    """Costs accumulated by one request, shared with the threads serving it"""
+
+    def __init__(self):
+        self.duration = 0.0
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.serializing = False
+        self.status = 500
+
+    def server_timing(self, duration: float) -> str:
+        return ", ".join([
+            f"app;dur={duration * 1000:.1f}",
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} statements, {self.rows} rows"',
+            f"serialize;dur={self.serialize_seconds * 1000:.1f}",
+        ])
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+class _CountingCursor:
+    """DB-API cursor proxy adding a request's fetches to its rows and DB time"""
+
+    def __init__(self, cursor, metrics: RequestMetrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._metrics.db_seconds += time.perf_counter() - started
+        if row is not None:
+            self._metrics.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetched(self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._fetched(self._cursor.fetchall)
+
+    def _fetched(self, fetch, *args, **kwargs):
+        started = time.perf_counter()
+        rows = fetch(*args, **kwargs)
+        self._metrics.db_seconds += time.perf_counter() - started
+        self._metrics.rows += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class MetricsService:
+    """Per-route request histograms in the Prometheus text format.
+
+    ``InstrumentationMiddleware`` opens a ``RequestMetrics`` for every HTTP
+    request; engine hooks add each statement's time and fetched rows to it,
+    and response encoders add their time through ``serializing``. Sync routes
+    run in worker threads with a copy of the request's context, so they update
+    the same object. Each worker buckets its observations locally and folds
+    them into one Redis hash every few seconds, so ``/metrics`` reports every
+    worker whichever one the scrape lands on. Requests only hand the flush to
+    a background thread; the event loop never waits on Redis.
+
+    FastAPI's own response-model validation is not counted as serialization;
+    list routes skip it through the serialization fast path.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+        self.flush_seconds = int(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+        self.redis_timeout = float(os.getenv("METRICS_REDIS_TIMEOUT_SECONDS", "1"))
+        self._client: Optional[redis.Redis] = None
+        self._flusher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metrics-flush")
+        self._flushing = False
+        self._pending: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        self._route_paths: Dict = {}
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                self.redis_url, socket_connect_timeout=self.redis_timeout, socket_timeout=self.redis_timeout
+            )
+        return self._client
+
+    def current(self) -> Optional[RequestMetrics]:
+        return _current.get()
+
+    @contextmanager
+    def serializing(self):
+        """Count the enclosed time as response serialization (nested uses count once)"""
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            yield
+            return
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.serialize_seconds += time.perf_counter() - started
+            metrics.serializing = False
+
+    def observe(self, scope, metrics: RequestMetrics):
+        labels = (scope["method"], self._route(scope), str(metrics.status))
+        with self._lock:
+            for name, (_, buckets, attribute) in HISTOGRAMS.items():
+                value = getattr(metrics, attribute)
+                for bucket in buckets:
+                    if value <= bucket:
+                        self._pending[self._field(name, labels, str(bucket))] += 1
+                self._pending[self._field(name, labels, "+Inf")] += 1
+                self._pending[self._field(name, labels, "sum")] += value
+            # Called from the middleware on the event loop, so Redis is left to the flusher thread
+            due = not self._flushing and time.monotonic() - self._flushed_at >= self.flush_seconds
+            if due:
+                self._flushing = True
+        if due:
+            self._flusher.submit(self._flush_later)
+
+    def render(self) -> str:
+        """Every worker's histograms in the Prometheus text exposition format"""
+        self._flush(force=True)
+        try:
+            totals = {field.decode(): float(value) for field, value in self.client.hgetall(METRICS_KEY).items()}
+        except redis.RedisError as e:
+            logger.warning(f"Could not read request metrics, reporting this worker only: {str(e)}")
+            with self._lock:
+                totals = dict(self._pending)
+
+        series: Dict[str, Dict[Tuple, Dict[str, float]]] = defaultdict(lambda: defaultdict(dict))
+        for field, value in totals.items():
+            name, method, route, status, bucket = field.split("\t")
+            series[name][(method, route, status)][bucket] = value
+
+        lines = []
+        for name, (help_text, buckets, _) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route, status), values in sorted(series[name].items()):
+                labels = f'method="{method}",route="{route}",status="{status}"'
+                for bucket in [*(str(bucket) for bucket in buckets), "+Inf"]:
+                    lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {int(values.get(bucket, 0))}')
+                lines.append(f"{name}_sum{{{labels}}} {values.get('sum', 0.0)}")
+                lines.append(f"{name}_count{{{labels}}} {int(values.get('+Inf', 0))}")
+        return "\n".join(lines) + "\n"
+
+    def _field(self, name: str, labels: Tuple[str, str, str], bucket: str) -> str:
+        return "\t".join((name, *labels, bucket))
+
+    def _route(self, scope) -> str:
+        """Path template of the matched route, so ids never become label values"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._route_paths:
+            for route in scope["app"].routes:
+                self._route_paths.setdefault(getattr(route, "endpoint", None), getattr(route, "path", "unmatched"))
+            self._route_paths.setdefault(endpoint, "unmatched")
+        return self._route_paths.get(endpoint, "unmatched")
+
+    def _flush(self, force: bool = False):
+        """Fold this worker's buckets into Redis every few seconds"""
+        with self._lock:
+            if not self._pending or (not force and time.monotonic() - self._flushed_at < self.flush_seconds):
+                return
+            pending, self._pending = self._pending, defaultdict(float)
+            self._flushed_at = time.monotonic()
+        try:
+            pipe = self.client.pipeline()
+            for field, value in pending.items():
+                pipe.hincrbyfloat(METRICS_KEY, field, value)
+            pipe.execute()
+        except redis.RedisError:
+            # Keep the observations for the next flush
+            with self._lock:
+                for field, value in pending.items():
+                    self._pending[field] += value
+
+    def _flush_later(self):
+        try:
+            self._flush()
+        finally:
+            self._flushing = False
+
+# Initialize metrics service
+metrics_service = MetricsService()
+
+class InstrumentationMiddleware:
+    """ASGI middleware timing each HTTP request and adding a Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics_service.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                metrics.status = message["status"]
+                # Streamed bodies are still running here; the header covers time to first byte
+                MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.duration = time.perf_counter() - started
+            _current.reset(token)
+            metrics_service.observe(scope, metrics)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    if metrics is None or not conn.info.get("statement_started"):
+        return
+    metrics.db_seconds += time.perf_counter() - conn.info["statement_started"].pop()
+    metrics.statements += 1
+    if context is not None and cursor.description is not None:
+        # The result is built from context.cursor after this hook, so its fetches are counted
+        context.cursor = _CountingCursor(cursor, metrics)
+
+@event.listens_for(Engine, "handle_error")
+def _drop_failed_statement(context):
+    # A failed statement never reaches after_cursor_execute; its start time would outlive it on the pooled connection
+    if context.connection is not None:
+        context.connection.info.pop("statement_started", None)
@@ -0,0 +1,258 @@
+import asyncio
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from auth.auth import authenticate_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_FLAG = "_profile"
+
+_active_profile: ContextVar[Optional["Profile"]] = ContextVar("active_profile", default=None)
+
+def _worker_context(frame) -> Optional[Context]:
+    return frame.f_locals.get('context')
+
+def _handle_context(frame) -> Optional[Context]:
+    return getattr(frame.f_locals.get('self'), '_context', None)
+
+# Frames that run code inside a request's context: the event loop running a
+# task step, and the AnyIO worker threads that run sync routes and dependencies.
+# Both are private internals; ProfilerService.check_hooks says when they move.
+_CONTEXT_RUNNERS = {asyncio.events.Handle._run.__code__: _handle_context}
+try:
+    from anyio._backends._asyncio import WorkerThread
+    _CONTEXT_RUNNERS[WorkerThread.run.__code__] = _worker_context
+except (ImportError, AttributeError):
+    WorkerThread = None
+
+# An idle worker thread still holds the context of the last call it ran
+_IDLE_CODES = {queue.Queue.get.__code__}
+
+class Profile:
+    """Wall-clock stack samples of one request"""
+
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stacks: Counter = Counter()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def folded(self) -> str:
+        """Collapsed stacks, one ``frame;frame;frame count`` line each (flamegraph.pl, speedscope)"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def top(self, limit: int = 20) -> List[Dict]:
+        """Functions by samples spent in them (self) and under them (total)"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+        return [
+            {'function': frame, 'self': own[frame], 'total': count}
+            for frame, count in total.most_common(limit)
+        ]
+
+    def summary(self) -> Dict:
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'route': self.route,
+            'trigger': self.trigger,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'samples': self.samples
+        }
+
+class ProfilerService:
+    """Sampling profiler for individual requests.
+
+    An admin profiles a request by sending ``X-Profile: 1`` (or ``?_profile=1``);
+    ``sample_rate`` also profiles that fraction of all requests. While any
+    profiled request is in flight, one sampler thread reads every thread's
+    stack each ``interval`` seconds and keeps the stacks that run in a
+    profiled request's context, found through the context held by the event
+    loop handle or AnyIO worker thread at the base of the stack. Nothing is
+    traced, so unprofiled requests pay nothing and profiled ones little.
+
+    Only the standard asyncio event loop is supported (``uvicorn --loop
+    asyncio``). uvloop, which uvicorn picks by default when it is installed,
+    runs callbacks without ``Handle._run``, so async code would go unseen;
+    ``check_hooks`` warns at startup when either hook cannot be found.
+
+    Finished profiles are kept in a bounded store in the worker that served
+    the request; the response carries the id in ``X-Profile-Id``.
+    """
+
+    def __init__(self):
+        self.interval = float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000
+        self.sample_rate = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+        self.max_profiles = int(os.getenv("PROFILER_MAX_PROFILES", "100"))
+        self._profiles: OrderedDict = OrderedDict()
+        self._active: set = set()
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile):
+        with self._lock:
+            self._active.add(profile)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._sampler.start()
+
+    def finish(self, profile: Profile):
+        with self._lock:
+            self._active.discard(profile)
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def profiles(self, route: Optional[str] = None) -> List[Profile]:
+        """Stored profiles, newest first"""
+        profiles = reversed(list(self._profiles.values()))
+        return [profile for profile in profiles if route is None or profile.route == route]
+
+    def check_hooks(self) -> List[str]:
+        """Warn about each context hook missing under the running loop and AnyIO"""
+        problems = []
+        loop = asyncio.get_running_loop()
+        if not isinstance(loop, asyncio.BaseEventLoop):
+            problems.append(
+                f"event loop {type(loop).__module__}.{type(loop).__name__} does not run callbacks "
+                "through asyncio Handle._run; async code will not be profiled (run uvicorn with --loop asyncio)"
+            )
+        elif '_context' not in getattr(asyncio.events.Handle, '__slots__', ()):
+            problems.append("asyncio Handle keeps no _context; async code will not be profiled")
+        if WorkerThread is None or 'context' not in WorkerThread.run.__code__.co_varnames:
+            problems.append("AnyIO worker threads not recognised; sync routes will not be profiled")
+        for problem in problems:
+            logger.warning(f"Request profiler: {problem}")
+        return problems
+
+    def _sample(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != me:
+                    self._attribute(frame)
+            time.sleep(self.interval)
+
+    def _attribute(self, frame):
+        """Add the thread's stack to the profile whose context it is running in, if any"""
+        stack = []
+        child = None
+        while frame is not None:
+            context_of = _CONTEXT_RUNNERS.get(frame.f_code)
+            if context_of is not None:
+                if child is None or child.f_code in _IDLE_CODES:
+                    return
+                context = context_of(frame)
+                profile = context.get(_active_profile) if isinstance(context, Context) else None
+                if profile is not None and profile in self._active:
+                    profile.stacks[tuple(reversed(stack))] += 1
+                return
+            stack.append(self._label(frame.f_code))
+            child = frame
+            frame = frame.f_back
+
+    def _label(self, code) -> str:
+        path = os.path.relpath(code.co_filename, BACKEND_ROOT)
+        if path.startswith(".."):
+            path = os.path.basename(code.co_filename)
+        return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+# Initialize profiler service
+profiler_service = ProfilerService()
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling requests flagged by an admin, or sampled"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            if scope["type"] == "lifespan":
+                # Startup, on the loop that will serve requests
+                profiler_service.check_hooks()
+            await self.app(scope, receive, send)
+            return
+
+        trigger = await self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], trigger)
+        token = _active_profile.set(profile)
+        profiler_service.start(profile)
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active_profile.reset(token)
+            profile.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            endpoint = scope.get("endpoint")
+            profile.route = next(
+                (route.path for route in scope["app"].routes if getattr(route, "endpoint", None) is endpoint),
+                None
+            ) if endpoint is not None else None
+            profiler_service.finish(profile)
+
+    async def _trigger(self, scope) -> Optional[str]:
+        headers = Headers(scope=scope)
+        requested = headers.get(PROFILE_HEADER) == "1" or QueryParams(scope.get("query_string", b"")).get(PROFILE_QUERY_FLAG) == "1"
+        if requested:
+            # Only admins may profile on demand; anyone else gets an ordinary request
+            scheme, _, token = headers.get("authorization", "").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    user = await authenticate_token(token)
+                except HTTPException:
+                    user = None
+                if user is not None and user.is_admin:
+                    return "requested"
+        if profiler_service.sample_rate and random.random() < profiler_service.sample_rate:
+            return "sampled"
+        return None
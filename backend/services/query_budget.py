@@ -0,0 +1,130 @@
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from services.slow_query_log import slow_query_log
+import logging
+
+logger = logging.getLogger(__name__)
+
+_open_budgets: ContextVar[Tuple["QueryBudget", ...]] = ContextVar("open_query_budgets", default=())
+
+class QueryBudgetExceeded(AssertionError):
+    """A block ran more statements, or repeated one statement more often, than its budget allows"""
+
+class QueryBudget:
+    """Statements run inside one ``query_budget`` block.
+
+    Statements are grouped by the slow query log's fingerprint (literals and
+    placeholders collapsed), so the same query issued once per row of a loop,
+    or a lazy load such as ``Contract.revenue_tracking`` touched per contract,
+    shows up as one fingerprint with a high count: the N+1 pattern.
+    """
+
+    def __init__(self, label: str, max_statements: Optional[int] = None, max_repeats: Optional[int] = None):
+        self.label = label
+        self.max_statements = max_statements
+        self.max_repeats = max_repeats
+        self.statements = 0
+        self.fingerprints: Counter = Counter()
+        self.call_sites: Dict[str, str] = {}
+
+    def add(self, statement: str):
+        fingerprint = slow_query_log.fingerprint(statement)
+        self.statements += 1
+        self.fingerprints[fingerprint] += 1
+        if fingerprint not in self.call_sites:
+            self.call_sites[fingerprint] = slow_query_log.call_site(skip=("services/query_budget.py",))
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Fingerprints run more often than ``max_repeats``, most repeated first"""
+        if self.max_repeats is None:
+            return []
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > self.max_repeats]
+
+    def violations(self) -> List[str]:
+        problems = []
+        if self.max_statements is not None and self.statements > self.max_statements:
+            problems.append(f"{self.statements} statements, budget is {self.max_statements}")
+        for sql, count in self.repeated():
+            site = self.call_sites[sql]
+            problems.append(f"{count}x (budget {self.max_repeats}){f' at {site}' if site else ''}: {sql[:300]}")
+        return problems
+
+    def report(self) -> str:
+        return f"Query budget exceeded in {self.label}:\n  " + "\n  ".join(self.violations())
+
+@contextmanager
+def query_budget(max_statements: Optional[int] = None, max_repeats: Optional[int] = None,
+                 label: str = "block", warn_only: bool = False) -> Iterator[QueryBudget]:
+    """Count the statements run inside the block.
+
+    Counted are statements run in this context and in threads that copy it,
+    such as FastAPI's threadpool for sync routes. Plain ``ThreadPoolExecutor``
+    workers (cache refreshes, slow query EXPLAINs) do not inherit the context
+    and go uncounted.
+
+    Raises QueryBudgetExceeded on exit when a limit is broken, or only logs a
+    warning with ``warn_only``. Budgets nest; each counts everything inside it.
+    """
+    budget = QueryBudget(label, max_statements=max_statements, max_repeats=max_repeats)
+    token = _open_budgets.set(_open_budgets.get() + (budget,))
+    try:
+        yield budget
+    finally:
+        _open_budgets.reset(token)
+    if budget.violations():
+        if warn_only:
+            logger.warning(budget.report())
+        else:
+            raise QueryBudgetExceeded(budget.report())
+
+class QueryBudgetService:
+    """Development-mode N+1 warnings for every request and Celery task.
+
+    Enabled by ``QUERY_BUDGET_WARN`` (defaults to ``DEBUG``). Limits are
+    deliberately loose; the aim is to log the loops, not to fail requests.
+    """
+
+    def __init__(self):
+        self.warn = os.getenv("QUERY_BUDGET_WARN", os.getenv("DEBUG", "false")).lower() == "true"
+        self.max_statements = int(os.getenv("QUERY_BUDGET_MAX_STATEMENTS", "50"))
+        self.max_repeats = int(os.getenv("QUERY_BUDGET_MAX_REPEATS", "10"))
+        self._task_budgets: Dict = {}
+
+    def budget(self, label: str):
+        return query_budget(self.max_statements, self.max_repeats, label=label, warn_only=True)
+
+    def start_task(self, task_id: str, name: str):
+        budget = self.budget(f"task {name}")
+        budget.__enter__()
+        self._task_budgets[task_id] = budget
+
+    def finish_task(self, task_id: str):
+        budget = self._task_budgets.pop(task_id, None)
+        if budget is not None:
+            budget.__exit__(None, None, None)
+
+# Initialize query budget service
+query_budget_service = QueryBudgetService()
+
+class QueryBudgetMiddleware:
+    """ASGI middleware logging requests that break the development query budget"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not query_budget_service.warn:
+            await self.app(scope, receive, send)
+            return
+        with query_budget_service.budget(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for budget in _open_budgets.get():
+        budget.add(statement)
@@ -0,0 +1,194 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from jinja2 import Template
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database.models import Contract, RevenueTracking
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Breakdown name -> Contract column it groups by
+BREAKDOWNS = {
+    'agency': Contract.agency,
+    'naics': Contract.naics_code,
+}
+
+BREAKDOWN_COLUMNS = ['key', 'new_contracts', 'contract_value', 'placements', 'revenue']
+
+class ReportingService:
+    """Period performance metrics computed entirely with SQL aggregates.
+
+    Nothing here loads individual rows: totals come from one aggregate query per
+    table and breakdowns from one GROUP BY per table, so memory is bounded by
+    the number of groups, not by the number of contracts or placements. The
+    same report feeds the weekly email and GET /api/reports/performance.
+    """
+
+    def default_period(self, days: int = 7) -> Tuple[datetime, datetime]:
+        end = datetime.utcnow()
+        return end - timedelta(days=days), end
+
+    def period_metrics(self, db: Session, start: datetime, end: datetime) -> Dict:
+        """Headline metrics for contracts and placements recorded in [start, end)"""
+        new_contracts, contract_value = db.query(
+            func.count(Contract.id),
+            func.coalesce(func.sum(Contract.value), 0.0)
+        ).filter(
+            Contract.created_at >= start,
+            Contract.created_at < end
+        ).one()
+
+        placements, revenue, avg_success_rate = db.query(
+            func.count(RevenueTracking.id),
+            func.coalesce(func.sum(RevenueTracking.fee_amount), 0.0),
+            func.avg(RevenueTracking.success_rate)
+        ).filter(
+            RevenueTracking.created_at >= start,
+            RevenueTracking.created_at < end
+        ).one()
+
+        return {
+            'start': start,
+            'end': end,
+            'new_contracts': new_contracts,
+            'contract_value': float(contract_value),
+            'placements': placements,
+            'revenue': float(revenue),
+            'avg_success_rate': float(avg_success_rate) if avg_success_rate is not None else None
+        }
+
+    def breakdown(self, db: Session, start: datetime, end: datetime, dimension: str) -> List[Dict]:
+        """Metrics per agency or NAICS code, largest revenue first"""
+        column = BREAKDOWNS[dimension]
+
+        contract_rows = db.query(
+            column,
+            func.count(Contract.id),
+            func.coalesce(func.sum(Contract.value), 0.0)
+        ).filter(
+            Contract.created_at >= start,
+            Contract.created_at < end
+        ).group_by(column)
+
+        revenue_rows = db.query(
+            column,
+            func.count(RevenueTracking.id),
+            func.coalesce(func.sum(RevenueTracking.fee_amount), 0.0)
+        ).join(
+            Contract, Contract.id == RevenueTracking.contract_id
+        ).filter(
+            RevenueTracking.created_at >= start,
+            RevenueTracking.created_at < end
+        ).group_by(column)
+
+        groups: Dict[str, Dict] = {}
+        for key, count, value in contract_rows:
+            groups[key] = {'key': key, 'new_contracts': count, 'contract_value': float(value),
+                           'placements': 0, 'revenue': 0.0}
+        for key, count, revenue in revenue_rows:
+            group = groups.setdefault(key, {'key': key, 'new_contracts': 0, 'contract_value': 0.0,
+                                            'placements': 0, 'revenue': 0.0})
+            group['placements'] = count
+            group['revenue'] = float(revenue)
+
+        return sorted(groups.values(), key=lambda group: (-group['revenue'], -group['new_contracts']))
+
+    def build_report(self, db: Session, start: datetime, end: datetime,
+                     breakdowns: Optional[List[str]] = None) -> Dict:
+        report = self.period_metrics(db, start, end)
+        report['breakdowns'] = {
+            dimension: self.breakdown(db, start, end, dimension)
+            for dimension in (breakdowns if breakdowns is not None else list(BREAKDOWNS))
+        }
+        return report
+
+    def iter_csv(self, rows: List[Dict]) -> Iterator[str]:
+        """Stream breakdown rows as CSV, one line at a time"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=BREAKDOWN_COLUMNS, extrasaction='ignore')
+
+        writer.writeheader()
+        for row in rows:
+            yield self._drain(buffer)
+            writer.writerow(row)
+        yield self._drain(buffer)
+
+    def iter_html(self, report: Dict, footer: Optional[str] = None) -> Iterator[str]:
+        """Stream the report as HTML"""
+        return Template(self._get_report_template()).generate(report=report, footer=footer)
+
+    def write_csv_attachments(self, report: Dict) -> List[str]:
+        """Write each breakdown to a temporary CSV file; the caller removes them"""
+        paths = []
+        stamp = report['end'].strftime('%Y%m%d')
+        directory = tempfile.mkdtemp(prefix="kdp-report-")
+        for dimension, rows in report['breakdowns'].items():
+            path = os.path.join(directory, f"performance_by_{dimension}_{stamp}.csv")
+            with open(path, 'w', newline='') as handle:
+                for chunk in self.iter_csv(rows):
+                    handle.write(chunk)
+            paths.append(path)
+        return paths
+
+    def remove_attachments(self, paths: List[str]):
+        if paths:
+            shutil.rmtree(os.path.dirname(paths[0]), ignore_errors=True)
+
+    def _drain(self, buffer: io.StringIO) -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    def _get_report_template(self) -> str:
+        """Performance report template"""
+        return """
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 700px; margin: 0 auto; padding: 20px;">
+                <div style="background: linear-gradient(135deg, #1e3a8a 0%, #10b981 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
+                    <h2 style="margin: 0;">KDP Global Performance Report</h2>
+                    <p style="margin: 5px 0 0 0;">{{ report.start.strftime('%Y-%m-%d') }} to {{ report.end.strftime('%Y-%m-%d') }}</p>
+                </div>
+
+                <h3 style="color: #1e3a8a;">Key Metrics</h3>
+                <ul>
+                    <li>New Contracts: {{ report.new_contracts }}</li>
+                    <li>New Pipeline Value: ${{ '{:,.2f}'.format(report.contract_value) }}</li>
+                    <li>Revenue Generated: ${{ '{:,.2f}'.format(report.revenue) }}</li>
+                    <li>Placements: {{ report.placements }}</li>
+                </ul>
+
+                {% for dimension, rows in report.breakdowns.items() %}
+                <h3 style="color: #1e3a8a;">By {{ 'NAICS Code' if dimension == 'naics' else dimension|title }}</h3>
+                <table style="width: 100%; border-collapse: collapse; font-size: 13px;">
+                    <tr style="background-color: #f8fafc; text-align: left;">
+                        <th>{{ 'NAICS' if dimension == 'naics' else dimension|title }}</th><th>New Contracts</th><th>Pipeline Value</th><th>Placements</th><th>Revenue</th>
+                    </tr>
+                    {% for row in rows[:20] %}
+                    <tr>
+                        <td>{{ row.key }}</td><td>{{ row.new_contracts }}</td><td>${{ '{:,.2f}'.format(row.contract_value) }}</td><td>{{ row.placements }}</td><td>${{ '{:,.2f}'.format(row.revenue) }}</td>
+                    </tr>
+                    {% endfor %}
+                </table>
+                {% if rows|length > 20 %}<p style="font-size: 12px; color: #64748b;">Full breakdown attached as CSV.</p>{% endif %}
+                {% endfor %}
+
+                {% if footer %}
+                <div style="margin-top: 30px; padding: 15px; background-color: #f8fafc; border-radius: 5px; font-size: 12px; color: #64748b;">
+                    <p>{{ footer }}</p>
+                </div>
+                {% endif %}
+            </div>
+        </body>
+        </html>
+        """
+
+# Initialize reporting service
+reporting_service = ReportingService()
@@ -0,0 +1,141 @@
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session
+from database.models import Contract, SavedSearch, User
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Flattened saved search kept in the index; text filters are pre-lowered
+Subscription = namedtuple(
+    "Subscription",
+    ["id", "user_id", "name", "min_value", "max_value", "agency", "search"]
+)
+
+class SubscriptionIndex:
+    """Percolator-style index of saved searches.
+
+    Subscriptions are bucketed by (naics_code, status), with ``None`` as the
+    wildcard bucket, and each bucket is sorted by ``min_value``. Matching a new
+    contract only visits the four buckets it can fall in and bisects past every
+    subscription whose minimum value is above the contract's value; only the
+    survivors get the substring checks.
+    """
+
+    def __init__(self, subscriptions: Iterable[SavedSearch]):
+        buckets: Dict[tuple, List[Subscription]] = {}
+        for saved_search in subscriptions:
+            key = (saved_search.naics_code or None, saved_search.status or None)
+            buckets.setdefault(key, []).append(Subscription(
+                id=saved_search.id,
+                user_id=saved_search.user_id,
+                name=saved_search.name,
+                # Falsy bounds are ignored, exactly like read_contracts does
+                min_value=saved_search.min_value or None,
+                max_value=saved_search.max_value or None,
+                agency=saved_search.agency.lower() if saved_search.agency else None,
+                search=saved_search.search.lower() if saved_search.search else None
+            ))
+
+        self.buckets = {}
+        for key, bucket in buckets.items():
+            bucket.sort(key=self._lower_bound)
+            self.buckets[key] = (bucket, [self._lower_bound(sub) for sub in bucket])
+
+    def __len__(self):
+        return sum(len(bucket) for bucket, _ in self.buckets.values())
+
+    @staticmethod
+    def _lower_bound(subscription: Subscription) -> float:
+        return subscription.min_value if subscription.min_value is not None else float('-inf')
+
+    def match(self, contract: Contract) -> List[Subscription]:
+        """Subscriptions whose filters select the contract"""
+        matches = []
+        for naics_code in {contract.naics_code, None}:
+            for status in {contract.status, None}:
+                entry = self.buckets.get((naics_code, status))
+                if entry is None:
+                    continue
+
+                bucket, lower_bounds = entry
+                if contract.value is None:
+                    # NULL values never satisfy a value bound in SQL either
+                    candidates = bucket[:bisect_right(lower_bounds, float('-inf'))]
+                else:
+                    candidates = bucket[:bisect_right(lower_bounds, contract.value)]
+
+                for subscription in candidates:
+                    if self._matches_rest(subscription, contract):
+                        matches.append(subscription)
+
+        return matches
+
+    def _matches_rest(self, subscription: Subscription, contract: Contract) -> bool:
+        if subscription.max_value is not None and (contract.value is None or contract.value > subscription.max_value):
+            return False
+        if subscription.agency and subscription.agency not in (contract.agency or '').lower():
+            return False
+        if subscription.search:
+            title = (contract.title or '').lower()
+            notes = (contract.notes or '').lower()
+            if subscription.search not in title and subscription.search not in notes:
+                return False
+        return True
+
+class SavedSearchService:
+    def build_index(self, db: Session) -> SubscriptionIndex:
+        """Load every active saved search into a fresh index with one query"""
+        subscriptions = db.query(SavedSearch).filter(SavedSearch.is_active == True).all()
+        return SubscriptionIndex(subscriptions)
+
+    def match_contracts(self, db: Session, contracts: Iterable[Contract],
+                        index: Optional[SubscriptionIndex] = None) -> Dict[int, Dict]:
+        """Match new contracts against saved searches: user_id -> {search name -> [contract, ...]}"""
+        index = index or self.build_index(db)
+
+        matches: Dict[int, Dict] = {}
+        for contract in contracts:
+            for subscription in index.match(contract):
+                by_search = matches.setdefault(subscription.user_id, {})
+                by_search.setdefault((subscription.id, subscription.name), []).append(contract)
+
+        return matches
+
+    def notify(self, db: Session, contract_ids: List[int]) -> Dict[str, int]:
+        """Match newly ingested contracts and email each subscriber one digest"""
+        from services.email_service import email_service
+
+        contracts = db.query(Contract).filter(Contract.id.in_(contract_ids)).all()
+        if not contracts:
+            return {'matched_users': 0, 'sent': 0}
+
+        index = self.build_index(db)
+        if not len(index):
+            return {'matched_users': 0, 'sent': 0}
+
+        matches = self.match_contracts(db, contracts, index)
+        users = db.query(User).filter(
+            User.id.in_(list(matches)), User.is_active == True
+        ).all() if matches else []
+
+        sent = 0
+        notified_search_ids = []
+        for user in users:
+            if email_service.send_saved_search_digest(user.email, user.full_name, matches[user.id]):
+                sent += 1
+                notified_search_ids.extend(search_id for search_id, _ in matches[user.id])
+
+        if notified_search_ids:
+            db.query(SavedSearch).filter(SavedSearch.id.in_(notified_search_ids)).update(
+                {SavedSearch.last_notified_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+
+        logger.info(f"Saved searches matched {len(contracts)} new contracts for {len(matches)} users")
+        return {'matched_users': len(matches), 'sent': sent}
+
+# Initialize saved search service
+saved_search_service = SavedSearchService()
@@ -0,0 +1,157 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+import numpy as np
+from sqlalchemy import case, literal, update
+from sqlalchemy.orm import Session
+from database.models import Contract
+from services.change_feed import change_feed
+from services.event_bus import event_bus
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Scoring rule sets by version. Bins are upper bounds: a value above bins[i-1]
+# and at most bins[i] earns points[i], so points has one entry more than bins.
+SCORING_RULES = {
+    1: {
+        'base': 5,
+        # Award ceiling; unknown values earn nothing
+        'value_bins': [100000, 500000, 1000000],
+        'value_points': [0, 1, 2, 3],
+        # Whole days until the deadline; no deadline earns nothing
+        'deadline_bins': [6, 30],
+        'deadline_points': [-1, 0, 1],
+        # Per-agency adjustments, e.g. for sources without an award ceiling
+        'agency_points': {'Miami-Dade County': 1},
+        'min': 1,
+        'max': 10,
+    },
+}
+
+class ScoringService:
+    """Opportunity scores for contracts, computed a table at a time.
+
+    Scores depend on the days left until the deadline, so they go stale
+    daily. ``rescore`` walks the active contracts in primary-key chunks,
+    reads only the columns the rules use into NumPy arrays, scores a whole
+    chunk with array operations and writes back just the rows whose score
+    changed, with one UPDATE per distinct score per chunk (scores take at
+    most ten values). ``score`` runs the same rules for contracts being
+    ingested, so new and re-scored contracts agree.
+
+    Rule sets are versioned in ``SCORING_RULES``; ``OPPORTUNITY_SCORING_VERSION``
+    picks one and ``OPPORTUNITY_SCORING_RULES_FILE`` may add versions from a
+    JSON file of the same shape.
+    """
+
+    def __init__(self):
+        self.chunk_size = int(os.getenv("OPPORTUNITY_SCORING_CHUNK_SIZE", "50000"))
+        self.rule_sets = dict(SCORING_RULES)
+        rules_file = os.getenv("OPPORTUNITY_SCORING_RULES_FILE")
+        if rules_file:
+            with open(rules_file) as f:
+                self.rule_sets.update({int(version): rules for version, rules in json.load(f).items()})
+        self.version = int(os.getenv("OPPORTUNITY_SCORING_VERSION", str(max(self.rule_sets))))
+        if self.version not in self.rule_sets:
+            raise ValueError(f"Unknown opportunity scoring version {self.version}")
+
+    @property
+    def rules(self) -> Dict:
+        return self.rule_sets[self.version]
+
+    def score(self, value: Optional[float], deadline: Optional[datetime], agency: Optional[str]) -> int:
+        """Score of one contract, as ``rescore`` would compute it"""
+        agency_points = self.rules['agency_points'].get(agency, 0)
+        scores = self._scores(
+            np.array([value], dtype=float),
+            np.array([self._naive(deadline)], dtype='datetime64[s]'),
+            np.array([agency_points]),
+            np.datetime64(datetime.utcnow(), 's')
+        )
+        return int(scores[0])
+
+    def rescore(self, db: Session) -> Dict:
+        """Re-score every active contract, writing back only the scores that changed"""
+        started = time.perf_counter()
+        now = np.datetime64(datetime.utcnow(), 's')
+        agency_points = case(
+            *[(Contract.agency == agency, points) for agency, points in self.rules['agency_points'].items()],
+            else_=0
+        ) if self.rules['agency_points'] else literal(0)
+
+        scanned = changed = 0
+        last_id = 0
+        while True:
+            rows = db.query(
+                Contract.id, Contract.value, Contract.deadline, agency_points, Contract.opportunity_score
+            ).filter(
+                Contract.status == "active", Contract.id > last_id
+            ).order_by(Contract.id).limit(self.chunk_size).all()
+            if not rows:
+                break
+
+            ids, values, deadlines, points, current = zip(*rows)
+            ids = np.array(ids, dtype=np.int64)
+            scores = self._scores(
+                np.array(values, dtype=float),
+                np.array([self._naive(deadline) for deadline in deadlines], dtype='datetime64[s]'),
+                np.array(points),
+                now
+            )
+            # NaN (no score yet) never equals a score, so unscored rows are written too
+            stale = np.array(current, dtype=float) != scores
+            changed += self._write(db, ids[stale], scores[stale])
+
+            scanned += len(rows)
+            last_id = int(ids[-1])
+
+        event_bus.publish_written(db, Contract, changed=changed > 0)
+        result = {
+            'version': self.version,
+            'scanned': scanned,
+            'changed': changed,
+            'seconds': round(time.perf_counter() - started, 2)
+        }
+        logger.info(f"Re-scored contracts: {result}")
+        return result
+
+    def _scores(self, values: np.ndarray, deadlines: np.ndarray, agency_points: np.ndarray,
+                now: np.datetime64) -> np.ndarray:
+        rules = self.rules
+        scores = np.full(len(values), rules['base'], dtype=np.int64) + agency_points.astype(np.int64)
+
+        value_points = np.asarray(rules['value_points'])[np.digitize(np.nan_to_num(values, nan=0.0), rules['value_bins'], right=True)]
+        scores += np.where(np.isnan(values), 0, value_points)
+
+        has_deadline = ~np.isnat(deadlines)
+        # Whole days, floored like timedelta.days
+        days = np.where(has_deadline, deadlines - now, np.timedelta64(0, 's')) // np.timedelta64(1, 'D')
+        deadline_points = np.asarray(rules['deadline_points'])[np.digitize(days, rules['deadline_bins'], right=True)]
+        scores += np.where(has_deadline, deadline_points, 0)
+
+        return np.clip(scores, rules['min'], rules['max'])
+
+    def _write(self, db: Session, ids: np.ndarray, scores: np.ndarray) -> int:
+        """One UPDATE ... WHERE id IN (...) per distinct new score in the chunk"""
+        if not len(ids):
+            return 0
+        for score in np.unique(scores):
+            db.execute(
+                update(Contract).where(Contract.id.in_(ids[scores == score].tolist())).values(opportunity_score=int(score)),
+                execution_options={'synchronize_session': False}
+            )
+        change_feed.record(db, Contract.__tablename__, ids.tolist())
+        db.commit()
+        return len(ids)
+
+    def _naive(self, moment: Optional[datetime]) -> Optional[datetime]:
+        # Ingested deadlines may carry a UTC offset; stored ones are naive UTC
+        if moment is not None and moment.tzinfo is not None:
+            return (moment - moment.utcoffset()).replace(tzinfo=None)
+        return moment
+
+# Initialize scoring service
+scoring_service = ScoringService()
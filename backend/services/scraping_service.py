@@ -8,8 +8,10 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 from database.models import Contract, ScrapingLog
+from services.scoring_service import scoring_service
 import logging
 import os
 
@@ -74,6 +76,7 @@ class ContractScraper:
         """Scrape contracts from SAM.gov"""
         contracts_found = 0
         contracts_added = 0
+        new_contracts = []
         
         base_url = "https://sam.gov/api/prod/sgs/v1/search/"
         
@@ -111,9 +114,9 @@ class ContractScraper:
                             'value': self._parse_value(opp.get('awardCeiling')),
                             'deadline': self._parse_date(opp.get('responseDeadLine')),
                             'status': 'active',
-                            'opportunity_score': self._calculate_opportunity_score(opp),
                             'notes': f"Source: SAM.gov | ID: {opp.get('noticeId', '')}"
                         }
+                        contract_data['opportunity_score'] = self._score(contract_data)
                         
                         # Check if contract already exists
                         existing = self.db.query(Contract).filter(
@@ -124,6 +127,7 @@ class ContractScraper:
                         if not existing:
                             new_contract = Contract(**contract_data)
                             self.db.add(new_contract)
+                            new_contracts.append(new_contract)
                             contracts_added += 1
                 
                 await asyncio.sleep(1)  # Rate limiting
@@ -133,12 +137,13 @@ class ContractScraper:
                 continue
         
         self.db.commit()
-        return {'contracts_found': contracts_found, 'contracts_added': contracts_added}
+        return self._source_result(contracts_found, contracts_added, new_contracts)
 
     async def scrape_miami_dade(self) -> Dict[str, int]:
         """Scrape contracts from Miami-Dade County portal"""
         contracts_found = 0
         contracts_added = 0
+        new_contracts = []
         
         try:
             url = "https://www.miamidade.gov/procurement/solicitations.asp"
@@ -168,9 +173,9 @@ class ContractScraper:
                         'value': None,
                         'deadline': deadline,
                         'status': 'active',
-                        'opportunity_score': 6,  # Default score for Miami-Dade
                         'notes': f"Source: Miami-Dade County Portal"
                     }
+                    contract_data['opportunity_score'] = self._score(contract_data)
                     
                     # Check if contract already exists
                     existing = self.db.query(Contract).filter(
@@ -181,6 +186,7 @@ class ContractScraper:
                     if not existing and title and len(title) > 10:
                         new_contract = Contract(**contract_data)
                         self.db.add(new_contract)
+                        new_contracts.append(new_contract)
                         contracts_added += 1
                         
                 except Exception as e:
@@ -191,12 +197,13 @@ class ContractScraper:
         except Exception as e:
             logger.error(f"Error scraping Miami-Dade: {str(e)}")
         
-        return {'contracts_found': contracts_found, 'contracts_added': contracts_added}
+        return self._source_result(contracts_found, contracts_added, new_contracts)
 
     async def scrape_unison_marketplace(self) -> Dict[str, int]:
         """Scrape contracts from Unison Marketplace"""
         contracts_found = 0
         contracts_added = 0
+        new_contracts = []
         
         try:
             # Unison Marketplace URL (this would need to be the actual URL)
@@ -227,9 +234,9 @@ class ContractScraper:
                             'value': None,
                             'deadline': None,
                             'status': 'active',
-                            'opportunity_score': 5,  # Default score for Unison
                             'notes': f"Source: Unison Marketplace"
                         }
+                        contract_data['opportunity_score'] = self._score(contract_data)
                         
                         # Check if contract already exists
                         existing = self.db.query(Contract).filter(
@@ -240,6 +247,7 @@ class ContractScraper:
                         if not existing and title and len(title) > 10:
                             new_contract = Contract(**contract_data)
                             self.db.add(new_contract)
+                            new_contracts.append(new_contract)
                             contracts_added += 1
                             
                     except Exception as e:
@@ -250,44 +258,19 @@ class ContractScraper:
         except Exception as e:
             logger.error(f"Error scraping Unison Marketplace: {str(e)}")
         
-        return {'contracts_found': contracts_found, 'contracts_added': contracts_added}
+        return self._source_result(contracts_found, contracts_added, new_contracts)
 
-    def _calculate_opportunity_score(self, opportunity: Dict) -> int:
-        """Calculate opportunity score based on various factors"""
-        score = 5  # Base score
-        
-        # Increase score based on award ceiling
-        ceiling = opportunity.get('awardCeiling')
-        if ceiling:
-            try:
-                value = float(ceiling)
-                if value > 1000000:
-                    score += 3
-                elif value > 500000:
-                    score += 2
-                elif value > 100000:
-                    score += 1
-            except:
-                pass
-        
-        # Increase score for competitive opportunities
-        if opportunity.get('competitionType') == 'Full and Open Competition':
-            score += 1
-        
-        # Increase score based on response time
-        deadline = opportunity.get('responseDeadLine')
-        if deadline:
-            try:
-                deadline_date = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
-                days_until_deadline = (deadline_date - datetime.now()).days
-                if days_until_deadline > 30:
-                    score += 1
-                elif days_until_deadline < 7:
-                    score -= 1
-            except:
-                pass
-        
-        return min(max(score, 1), 10)  # Keep score between 1-10
+    def _source_result(self, contracts_found: int, contracts_added: int, new_contracts: List[Contract]) -> Dict:
+        """Per-source summary, including the IDs of committed new contracts for alert fan-out"""
+        return {
+            'contracts_found': contracts_found,
+            'contracts_added': contracts_added,
+            'contract_ids': [inspect(contract).identity[0] for contract in new_contracts if inspect(contract).has_identity]
+        }
+
+    def _score(self, contract_data: Dict) -> int:
+        """Opportunity score under the current rules, which the nightly re-score keeps up to date"""
+        return scoring_service.score(contract_data['value'], contract_data['deadline'], contract_data['agency'])
 
     def _parse_value(self, value_str: Optional[str]) -> Optional[float]:
         """Parse contract value from string"""
@@ -0,0 +1,179 @@
+from typing import Dict, List, Optional, Tuple, Type
+import orjson
+from fastapi import HTTPException, Query as QueryParam, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+from services.metrics_service import metrics_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INCLUDE_LIMIT = 20
+MAX_INCLUDE_LIMIT = 200
+
+class SerializationService:
+    """Fast path from database rows to JSON for list endpoints.
+
+    Returning ORM objects from a route costs three passes per row: loading
+    the mapped instance, validating it into the response model and running
+    the result through ``jsonable_encoder``. Rows of a response schema's own
+    columns are already the values the schema would produce (the columns are
+    typed the same way and writes are validated on the way in), so they are
+    zipped straight into dicts and encoded once by orjson. The route keeps its
+    ``response_model`` for the OpenAPI docs.
+
+    ``fields`` narrows a schema to a sparse fieldset (see ``sparse_fields``).
+    Only those columns are selected, so wide text columns a list view does not
+    show are never read, sent over the wire or encoded.
+    """
+
+    def __init__(self):
+        self._columns: Dict[Tuple[type, Tuple[str, ...]], tuple] = {}
+
+    def field_names(self, schema: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None) -> Tuple[str, ...]:
+        return fields or tuple(schema.model_fields)
+
+    def columns(self, model, schema: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None) -> tuple:
+        """Model columns backing each selected field of ``schema``, in field order"""
+        key = (model, self.field_names(schema, fields))
+        if key not in self._columns:
+            self._columns[key] = tuple(getattr(model, field) for field in key[1])
+        return self._columns[key]
+
+    def select(self, db: Session, model, schema: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None) -> Query:
+        """Column-only query shaped like ``schema``, ready for the router's filters"""
+        return db.query(*self.columns(model, schema, fields))
+
+    def rows(self, query: Query, schema: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+        names = self.field_names(schema, fields)
+        rows = query.all()
+        with metrics_service.serializing():
+            return [dict(zip(names, row)) for row in rows]
+
+    def include_related(self, db: Session, model, rows: List[Dict], include: Optional[Dict[str, int]],
+                        relations: Dict[str, Tuple[Type[BaseModel], object]]) -> List[Dict]:
+        """Nest each ``include``d relationship's rows under its parent rows, in place.
+
+        One statement per relation whatever the number of parents: the children
+        of every parent are read with the parent ids in one IN list, numbered
+        per parent in ``relations``' order and cut at the requested limit in
+        the database, as ``selectinload`` would load them but with the limit.
+        """
+        if not include:
+            return rows
+        ids = [row['id'] for row in rows]
+        for name, limit in include.items():
+            schema, order_by = relations[name]
+            relationship = getattr(model, name).property
+            parent = next(iter(relationship.remote_side))
+            names = self.field_names(schema)
+            nested: Dict[int, List[Dict]] = {parent_id: [] for parent_id in ids}
+            if ids:
+                position = func.row_number().over(partition_by=parent, order_by=order_by).label('_position')
+                ranked = db.query(
+                    *self.columns(relationship.mapper.class_, schema), parent.label('_parent'), position
+                ).filter(parent.in_(ids)).subquery()
+                query = db.query(*[ranked.c[field] for field in names], ranked.c['_parent']).filter(
+                    ranked.c['_position'] <= limit
+                ).order_by(ranked.c['_parent'], ranked.c['_position'])
+                children = query.all()
+                with metrics_service.serializing():
+                    for *values, parent_id in children:
+                        nested[parent_id].append(dict(zip(names, values)))
+            for row in rows:
+                row[name] = nested[row['id']]
+        return rows
+
+    def batch_get(self, db: Session, model, schema: Type[BaseModel], ids: List[int],
+                  fields: Optional[Tuple[str, ...]] = None) -> Dict:
+        """Rows for ``ids`` from one IN query, in request order, plus the ids that do not exist"""
+        requested = list(dict.fromkeys(ids))
+        found = {}
+        if requested:
+            query = self.select(db, model, schema, fields).filter(model.id.in_(requested))
+            found = {row['id']: row for row in self.rows(query, schema, fields)}
+        return {
+            'items': [found[row_id] for row_id in requested if row_id in found],
+            'missing': [row_id for row_id in requested if row_id not in found]
+        }
+
+    def dumps(self, content) -> bytes:
+        with metrics_service.serializing():
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+    def response(self, request: Request, content=None, body: bytes = None,
+                 headers: Optional[Dict[str, str]] = None) -> Response:
+        """JSON response that keeps the validators set by a conditional-GET dependency"""
+        response = Response(content=body if body is not None else self.dumps(content), media_type="application/json")
+        # Returning a Response skips the headers dependencies set on the injected one
+        response.headers.update(getattr(request.state, 'conditional_headers', {}))
+        response.headers.update(headers or {})
+        return response
+
+    def rows_response(self, request: Request, query: Query, schema: Type[BaseModel],
+                      fields: Optional[Tuple[str, ...]] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+        return self.response(request, self.rows(query, schema, fields), headers=headers)
+
+# Initialize serialization service
+serialization_service = SerializationService()
+
+class InstrumentedORJSONResponse(ORJSONResponse):
+    """Default response class; its encoding time shows up as serialization in request metrics"""
+
+    def render(self, content) -> bytes:
+        with metrics_service.serializing():
+            return super().render(content)
+
+def sparse_fields(schema: Type[BaseModel]):
+    """Route dependency: the ``fields=`` subset of ``schema`` to return, or None for all.
+
+    ``id`` is always included. Fields come back in schema order, so every
+    spelling of the same subset shares one column list and cache entry.
+    """
+    available = tuple(schema.model_fields)
+
+    def dependency(
+        fields: Optional[str] = QueryParam(None, description=f"Comma-separated subset of: {', '.join(available)}")
+    ) -> Optional[Tuple[str, ...]]:
+        if not fields:
+            return None
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = sorted(requested - set(available))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return tuple(field for field in available if field in requested or field == 'id')
+    return dependency
+
+def includes(relations: Dict[str, Tuple[Type[BaseModel], object]]):
+    """Route dependency: ``include=`` relations to nest, each with its row limit.
+
+    ``include=communications:50,other`` nests up to 50 communications and
+    ``DEFAULT_INCLUDE_LIMIT`` of the other relation per parent row.
+    """
+    available = tuple(relations)
+
+    def dependency(
+        include: Optional[str] = QueryParam(
+            None, description=f"Comma-separated relations to nest, each optionally name:limit, of: {', '.join(available)}"
+        )
+    ) -> Optional[Dict[str, int]]:
+        if not include:
+            return None
+        requested: Dict[str, int] = {}
+        for item in include.split(","):
+            name, _, limit = item.strip().partition(":")
+            if not name:
+                continue
+            if name not in relations:
+                raise HTTPException(status_code=400, detail=f"Unknown relation: {name}")
+            try:
+                requested[name] = int(limit) if limit else DEFAULT_INCLUDE_LIMIT
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid limit for {name}: {limit}")
+            if not 1 <= requested[name] <= MAX_INCLUDE_LIMIT:
+                raise HTTPException(status_code=400, detail=f"Limit for {name} must be between 1 and {MAX_INCLUDE_LIMIT}")
+        # Relation order, so every spelling of the same request shares a cache entry
+        return {name: requested[name] for name in available if name in requested} or None
+    return dependency
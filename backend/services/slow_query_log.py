@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import redis
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES_KEY = "kdp:slow_queries"
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Literal values and placeholders, so one query shape gets one fingerprint
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|:\w+|\$\d+")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+# SELECTs that lock, write or have side effects, so replaying them is not harmless
+_NOT_PLAIN_READ = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b|\bINTO\b|;\s*\S"
+    r"|\b(?:nextval|setval|pg_advisory\w*|pg_notify|pg_cancel_backend|pg_terminate_backend|lo_\w+)\s*\(",
+    re.IGNORECASE
+)
+
+class SlowQueryLog:
+    """Ring buffer of statements slower than ``threshold_ms``.
+
+    Every engine's statements are timed from cursor execute hooks, in web
+    workers and Celery workers alike. Slow ones are stored with a fingerprint
+    of their normalized SQL (literals and IN lists collapsed), the application
+    frame that issued them, and their duration, in a Redis list trimmed to
+    ``buffer_size`` entries; a local buffer stands in while Redis is down.
+
+    An ``explain_sample_rate`` fraction of slow SELECTs is re-run under
+    ``EXPLAIN (ANALYZE, BUFFERS)`` (``EXPLAIN QUERY PLAN`` on SQLite) on a
+    separate connection in a background thread, so the request that hit the
+    slow query does not pay for it twice.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.threshold_ms = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+        self.buffer_size = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "500"))
+        self.explain_sample_rate = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+        self.max_pending_explains = 10
+        self._client: Optional[redis.Redis] = None
+        self._local: deque = deque(maxlen=self.buffer_size)
+        self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        self._pending_explains = 0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url)
+        return self._client
+
+    def fingerprint(self, statement: str) -> str:
+        sql = _STRING.sub("?", statement)
+        sql = _PLACEHOLDER.sub("?", sql)
+        sql = _NUMBER.sub("?", sql)
+        sql = _IN_LIST.sub("IN (...)", sql)
+        return _WHITESPACE.sub(" ", sql).strip()
+
+    def call_site(self, skip: Tuple[str, ...] = ()) -> Optional[str]:
+        """Innermost router frame issuing the statement, else the innermost service or task frame"""
+        skip = ("services/slow_query_log.py", *skip)
+        fallback = None
+        frame = sys._getframe(1)
+        while frame is not None:
+            path = os.path.relpath(frame.f_code.co_filename, BACKEND_ROOT)
+            if not path.startswith("..") and path not in skip:
+                site = f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+                if path.startswith("routers"):
+                    return site
+                if fallback is None and (path.startswith("services") or path == "tasks.py"):
+                    fallback = site
+            frame = frame.f_back
+        return fallback
+
+    def record(self, engine: Engine, statement: str, parameters, duration_ms: float, executemany: bool):
+        sql = self.fingerprint(statement)
+        entry = {
+            'fingerprint': hashlib.sha1(sql.encode()).hexdigest()[:12],
+            'sql': sql,
+            'statement': statement[:2000],
+            'duration_ms': round(duration_ms, 2),
+            'call_site': self.call_site(),
+            'recorded_at': datetime.utcnow().isoformat(),
+            'explain': None
+        }
+        if not executemany and self._should_explain(engine, statement):
+            self._explainer.submit(self._explain_and_store, engine, statement, parameters, entry)
+        else:
+            self._store(entry)
+
+    def entries(self, limit: Optional[int] = None, fingerprint: Optional[str] = None) -> List[Dict]:
+        """Recorded statements, newest first"""
+        try:
+            entries = [json.loads(entry) for entry in self.client.lrange(SLOW_QUERIES_KEY, 0, -1)]
+        except redis.RedisError as e:
+            logger.warning(f"Could not read slow query log, reporting this worker only: {str(e)}")
+            entries = []
+        entries.extend(reversed(self._local))
+        entries.sort(key=lambda entry: entry['recorded_at'], reverse=True)
+        if fingerprint:
+            entries = [entry for entry in entries if entry['fingerprint'] == fingerprint]
+        return entries[:limit] if limit else entries
+
+    def summary(self, entries: List[Dict]) -> List[Dict]:
+        """One row per fingerprint, worst total time first"""
+        groups: Dict[str, Dict] = {}
+        for entry in entries:
+            group = groups.setdefault(entry['fingerprint'], {
+                'fingerprint': entry['fingerprint'], 'sql': entry['sql'], 'count': 0,
+                'total_ms': 0.0, 'max_ms': 0.0, 'call_sites': set()
+            })
+            group['count'] += 1
+            group['total_ms'] += entry['duration_ms']
+            group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+            if entry['call_site']:
+                group['call_sites'].add(entry['call_site'])
+        for group in groups.values():
+            group['total_ms'] = round(group['total_ms'], 2)
+            group['avg_ms'] = round(group['total_ms'] / group['count'], 2)
+            group['call_sites'] = sorted(group['call_sites'])
+        return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+
+    def clear(self):
+        self._local.clear()
+        try:
+            self.client.delete(SLOW_QUERIES_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Could not clear slow query log: {str(e)}")
+
+    def _should_explain(self, engine: Engine, statement: str) -> bool:
+        # EXPLAIN ANALYZE runs the statement, so only plain reads are ever replayed: a
+        # replayed FOR UPDATE SKIP LOCKED would hide due rows from concurrent pollers
+        if engine.dialect.name not in ('postgresql', 'sqlite') or not statement.lstrip().upper().startswith("SELECT"):
+            return False
+        if _NOT_PLAIN_READ.search(_STRING.sub("''", statement)):
+            return False
+        if random.random() >= self.explain_sample_rate:
+            return False
+        with self._lock:
+            if self._pending_explains >= self.max_pending_explains:
+                return False
+            self._pending_explains += 1
+        return True
+
+    def _explain_and_store(self, engine: Engine, statement: str, parameters, entry: Dict):
+        prefix = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " if engine.dialect.name == 'postgresql' else "EXPLAIN QUERY PLAN "
+        try:
+            with engine.connect() as connection:
+                connection = connection.execution_options(slow_query_log=False)
+                rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+                connection.rollback()
+            entry['explain'] = rows[0][0] if engine.dialect.name == 'postgresql' else [list(row) for row in rows]
+        except Exception as e:
+            entry['explain'] = f"EXPLAIN failed: {str(e)}"
+        finally:
+            with self._lock:
+                self._pending_explains -= 1
+        self._store(entry)
+
+    def _store(self, entry: Dict):
+        try:
+            pipe = self.client.pipeline()
+            pipe.lpush(SLOW_QUERIES_KEY, json.dumps(entry, default=str))
+            pipe.ltrim(SLOW_QUERIES_KEY, 0, self.buffer_size - 1)
+            pipe.execute()
+        except redis.RedisError:
+            self._local.append(entry)
+
+# Initialize slow query log
+slow_query_log = SlowQueryLog()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _check_duration(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("slow_query_started")
+    if not started:
+        return
+    duration_ms = (time.perf_counter() - started.pop()) * 1000
+    if duration_ms >= slow_query_log.threshold_ms and conn.get_execution_options().get("slow_query_log", True):
+        slow_query_log.record(conn.engine, statement, parameters, duration_ms, executemany)
+
+@event.listens_for(Engine, "handle_error")
+def _drop_failed_timer(context):
+    # A failed statement never reaches after_cursor_execute; drop its timer from the pooled connection
+    if context.connection is not None:
+        context.connection.info.pop("slow_query_started", None)
@@ -0,0 +1,312 @@
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Set
+import numpy as np
+from sqlalchemy.orm import Session
+from database.models import ChangeLog, Contract, Subcontractor
+from services.change_feed import change_feed
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Certifications and set-aside programs under their usual spellings, as "cert:" terms.
+# Narrower programs come before the broader ones whose wording they contain, and their
+# matched text is removed, so "service-disabled veteran-owned" is not also read as VOSB
+CERTIFICATIONS = [
+    (re.compile(r'\b8\s*\(\s*a\s*\)|\b8a\b'), '8a'),
+    (re.compile(r'\bhub\s*zone\b'), 'hubzone'),
+    (re.compile(r'\bsdvosb\b|\bservice[\s-]*disabled[\s-]*veteran[\s-]*owned\b'), 'sdvosb'),
+    (re.compile(r'\bvosb\b|\bveteran[\s-]*owned\b'), 'vosb'),
+    (re.compile(r'\bedwosb\b|\beconomically[\s-]*disadvantaged[\s-]*wom[ae]n[\s-]*owned\b'), 'edwosb'),
+    (re.compile(r'\bwosb\b|\bwom[ae]n[\s-]*owned\b'), 'wosb'),
+    (re.compile(r'\bsdb\b|\bsmall[\s-]*disadvantaged[\s-]*business\b'), 'sdb'),
+    (re.compile(r'\bdbe\b|\bdisadvantaged[\s-]*business[\s-]*enterprise\b'), 'dbe'),
+    (re.compile(r'\bmbe\b|\bminority[\s-]*owned\b'), 'mbe'),
+]
+# Broader programs a certification also qualifies for: an SDVOSB is a VOSB, an EDWOSB a WOSB
+CERTIFICATION_IMPLIES = {'sdvosb': ('vosb',), 'edwosb': ('wosb',)}
+ISO_STANDARD = re.compile(r'\biso[\s-]*(\d{4,5})\b')
+NAICS_CODE = re.compile(r'\b(\d{6})\b')
+WORD = re.compile(r'[a-z][a-z0-9]+')
+
+# Words that say nothing about what a company does or a contract needs
+STOPWORDS = {
+    'and', 'the', 'for', 'with', 'from', 'into', 'other', 'all', 'any', 'our', 'are', 'including',
+    'inc', 'llc', 'corp', 'company', 'services', 'service', 'support', 'source', 'gov', 'sam', 'notice',
+    'contract', 'contracts', 'provide', 'provides', 'various', 'general', 'related', 'naics',
+    'certified', 'certification', 'certifications',
+}
+
+STATES = {
+    'alabama': 'al', 'alaska': 'ak', 'arizona': 'az', 'arkansas': 'ar', 'california': 'ca',
+    'colorado': 'co', 'connecticut': 'ct', 'delaware': 'de', 'florida': 'fl', 'georgia': 'ga',
+    'hawaii': 'hi', 'idaho': 'id', 'illinois': 'il', 'indiana': 'in', 'iowa': 'ia', 'kansas': 'ks',
+    'kentucky': 'ky', 'louisiana': 'la', 'maine': 'me', 'maryland': 'md', 'massachusetts': 'ma',
+    'michigan': 'mi', 'minnesota': 'mn', 'mississippi': 'ms', 'missouri': 'mo', 'montana': 'mt',
+    'nebraska': 'ne', 'nevada': 'nv', 'new hampshire': 'nh', 'new jersey': 'nj', 'new mexico': 'nm',
+    'new york': 'ny', 'north carolina': 'nc', 'north dakota': 'nd', 'ohio': 'oh', 'oklahoma': 'ok',
+    'oregon': 'or', 'pennsylvania': 'pa', 'rhode island': 'ri', 'south carolina': 'sc',
+    'south dakota': 'sd', 'tennessee': 'tn', 'texas': 'tx', 'utah': 'ut', 'vermont': 'vt',
+    'virginia': 'va', 'washington': 'wa', 'west virginia': 'wv', 'wisconsin': 'wi', 'wyoming': 'wy',
+    'district of columbia': 'dc', 'puerto rico': 'pr',
+}
+STATE_NAME = re.compile(r'\b(' + '|'.join(sorted(STATES, key=len, reverse=True)) + r')\b')
+# Two-letter codes are only trusted in the coverage field, where "IN" means Indiana
+STATE_CODE = re.compile(r'\b(' + '|'.join(code.upper() for code in STATES.values()) + r')\b')
+NATIONWIDE = re.compile(r'\b(nationwide|national|all states|conus|united states|usa)\b')
+NATIONWIDE_TERM = 'geo:national'
+
+# How much a shared term counts, by kind, before its rarity (idf) is applied
+TERM_WEIGHTS = {'word': 1.0, 'cert': 2.0, 'naics': 3.0, 'naics4': 1.0}
+
+# Share of the final score from capability overlap, performance rating and geography
+MATCH_WEIGHTS = {'overlap': 0.6, 'rating': 0.25, 'geography': 0.15}
+
+# Rating assumed for subcontractors that have none, on the 1-10 scale
+NEUTRAL_RATING = 5.0
+
+def _stem(word: str) -> str:
+    # Just enough to make "logistics" meet "logistic" and "trucks" meet "truck"
+    if len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+def capability_terms(*texts: Optional[str]) -> Set[str]:
+    """Normalized terms of free-text capabilities, certifications or a contract description"""
+    terms = set()
+    for text in texts:
+        if not text:
+            continue
+        text = text.lower()
+        for pattern, certification in CERTIFICATIONS:
+            if pattern.search(text):
+                terms.update(f"cert:{name}" for name in (certification, *CERTIFICATION_IMPLIES.get(certification, ())))
+                text = pattern.sub(' ', text)
+        for standard in ISO_STANDARD.findall(text):
+            terms.add(f"cert:iso{standard}")
+        text = ISO_STANDARD.sub(' ', text)
+        for code in NAICS_CODE.findall(text):
+            terms.update((f"naics:{code}", f"naics4:{code[:4]}"))
+        text = NAICS_CODE.sub(' ', text)
+        terms.update(_stem(word) for word in WORD.findall(text) if word not in STOPWORDS)
+    return terms
+
+def geography_terms(text: Optional[str], codes: bool = False) -> Set[str]:
+    """States named in ``text`` as "geo:" terms, plus geo:national for nationwide coverage"""
+    if not text:
+        return set()
+    lowered = text.lower()
+    terms = {f"geo:{STATES[name]}" for name in STATE_NAME.findall(lowered)}
+    if codes:
+        terms.update(f"geo:{code.lower()}" for code in STATE_CODE.findall(text))
+    if NATIONWIDE.search(lowered):
+        terms.add(NATIONWIDE_TERM)
+    return terms
+
+def _kind(term: str) -> str:
+    return term.split(':', 1)[0] if ':' in term else 'word'
+
+class CapabilityIndex:
+    """Inverted index from capability, certification, NAICS and geography terms to subcontractors.
+
+    Each subcontractor holds a slot in parallel NumPy arrays (id, rating,
+    live flag); posting lists map a term to slots. Matching a contract adds
+    each shared term's weight to the slots in its posting array, so the cost
+    follows the number of postings touched, not the number of subcontractors.
+    """
+
+    def __init__(self):
+        self.slots: Dict[int, int] = {}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.ratings = np.zeros(0, dtype=float)
+        self.live = np.zeros(0, dtype=bool)
+        self.terms: List[FrozenSet[str]] = []
+        self.postings: Dict[str, Set[int]] = {}
+        self._posting_arrays: Dict[str, np.ndarray] = {}
+        self._free: List[int] = []
+
+    def __len__(self):
+        return len(self.slots)
+
+    def add(self, subcontractor_id: int, capabilities: Optional[str], certifications: Optional[str],
+            geographic_coverage: Optional[str], performance_rating: Optional[float]):
+        """Index a subcontractor, replacing what was indexed for it before"""
+        self.remove(subcontractor_id)
+        slot = self._free.pop() if self._free else self._grow()
+        terms = frozenset(
+            capability_terms(capabilities, certifications) | geography_terms(geographic_coverage, codes=True)
+        )
+        self.slots[subcontractor_id] = slot
+        self.ids[slot] = subcontractor_id
+        self.ratings[slot] = performance_rating if performance_rating is not None else NEUTRAL_RATING
+        self.live[slot] = True
+        self.terms[slot] = terms
+        for term in terms:
+            self.postings.setdefault(term, set()).add(slot)
+            self._posting_arrays.pop(term, None)
+
+    def remove(self, subcontractor_id: int):
+        slot = self.slots.pop(subcontractor_id, None)
+        if slot is None:
+            return
+        for term in self.terms[slot]:
+            postings = self.postings[term]
+            postings.discard(slot)
+            if not postings:
+                del self.postings[term]
+            self._posting_arrays.pop(term, None)
+        self.live[slot] = False
+        self.terms[slot] = frozenset()
+        self._free.append(slot)
+
+    def match(self, terms: Set[str], geography: Set[str], limit: int,
+              min_rating: Optional[float] = None) -> List[Dict]:
+        """Best ``limit`` subcontractors sharing at least one term, best first"""
+        overlap = np.zeros(len(self.ids), dtype=float)
+        possible = 0.0
+        for term in terms:
+            weight = TERM_WEIGHTS[_kind(term)] * self._idf(term)
+            possible += weight
+            slots = self._posting_array(term)
+            if len(slots):
+                overlap[slots] += weight
+        if not possible:
+            return []
+        overlap /= possible
+
+        candidates = self.live & (overlap > 0)
+        if min_rating is not None:
+            candidates &= self.ratings >= min_rating
+        if not candidates.any():
+            return []
+
+        covered = np.zeros(len(self.ids), dtype=bool)
+        if geography:
+            for term in geography | {NATIONWIDE_TERM}:
+                covered[self._posting_array(term)] = True
+
+        scores = (
+            MATCH_WEIGHTS['overlap'] * overlap
+            + MATCH_WEIGHTS['rating'] * self.ratings / 10
+            + MATCH_WEIGHTS['geography'] * covered
+        )
+        scores[~candidates] = -np.inf
+
+        count = min(limit, int(candidates.sum()))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [
+            {
+                'subcontractor_id': int(self.ids[slot]),
+                'score': round(float(scores[slot]), 4),
+                'overlap': round(float(overlap[slot]), 4),
+                'matched_terms': sorted(self.terms[slot] & terms),
+                'geographic_match': bool(covered[slot]) if geography else None
+            }
+            for slot in top
+        ]
+
+    def _idf(self, term: str) -> float:
+        return math.log(1 + len(self.slots) / (1 + len(self.postings.get(term, ()))))
+
+    def _posting_array(self, term: str) -> np.ndarray:
+        array = self._posting_arrays.get(term)
+        if array is None:
+            array = np.fromiter(self.postings.get(term, ()), dtype=np.int64)
+            self._posting_arrays[term] = array
+        return array
+
+    def _grow(self) -> int:
+        slot = len(self.terms)
+        if slot == len(self.ids):
+            capacity = max(1024, 2 * len(self.ids))
+            self.ids = np.resize(self.ids, capacity)
+            self.ratings = np.resize(self.ratings, capacity)
+            self.live = np.concatenate([self.live, np.zeros(capacity - len(self.live), dtype=bool)])
+        self.terms.append(frozenset())
+        return slot
+
+class SubcontractorMatchingService:
+    """Ranks subcontractors for a contract from a per-worker capability index.
+
+    The index is built from every subcontractor on first use, then kept
+    current from the change log: at most every ``sync_seconds`` the
+    subcontractor entries of the last ``change_feed.gap_timeout`` (plus
+    anything newer than the previous sync) are applied again, reloading
+    written rows and dropping deleted ones. Re-applying an entry is harmless,
+    and the overlap covers writes whose transactions committed late.
+    """
+
+    def __init__(self):
+        self.sync_seconds = float(os.getenv("MATCHING_SYNC_SECONDS", "1"))
+        self.default_limit = 20
+        self._index: Optional[CapabilityIndex] = None
+        self._synced_at: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._applied: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+
+    def build_index(self, db: Session) -> CapabilityIndex:
+        """Index every subcontractor with one streamed query"""
+        index = CapabilityIndex()
+        rows = db.query(
+            Subcontractor.id, Subcontractor.capabilities, Subcontractor.certifications,
+            Subcontractor.geographic_coverage, Subcontractor.performance_rating
+        ).execution_options(yield_per=1000)
+        for row in rows:
+            index.add(*row)
+        logger.info(f"Subcontractor capability index built with {len(index)} subcontractors, {len(index.postings)} terms")
+        return index
+
+    def get_index(self, db: Session) -> CapabilityIndex:
+        with self._lock:
+            now = datetime.utcnow()
+            if self._index is None or now - self._synced_at > change_feed.retention:
+                self._index = self.build_index(db)
+                self._synced_at = now
+                self._applied = {}
+            elif time.monotonic() - self._checked_at >= self.sync_seconds:
+                self._sync(db, now)
+            self._checked_at = time.monotonic()
+            return self._index
+
+    def matches(self, db: Session, contract: Contract, limit: Optional[int] = None,
+                min_rating: Optional[float] = None) -> List[Dict]:
+        """Subcontractors ranked for ``contract`` by shared terms, performance rating and coverage"""
+        terms = capability_terms(contract.title, contract.notes, contract.naics_code)
+        geography = geography_terms(' '.join(filter(None, (contract.title, contract.agency, contract.notes))))
+        index = self.get_index(db)
+        with self._lock:
+            return index.match(terms, geography, limit or self.default_limit, min_rating)
+
+    def _sync(self, db: Session, now: datetime):
+        since = self._synced_at - change_feed.gap_timeout
+        entries = db.query(ChangeLog.id, ChangeLog.entity_id, ChangeLog.changed_at).filter(
+            ChangeLog.entity == Subcontractor.__tablename__,
+            ChangeLog.changed_at >= since
+        ).order_by(ChangeLog.id).all()
+        changed = {entity_id for log_id, entity_id, _ in entries if log_id not in self._applied}
+
+        if changed:
+            rows = {
+                row[0]: row for row in db.query(
+                    Subcontractor.id, Subcontractor.capabilities, Subcontractor.certifications,
+                    Subcontractor.geographic_coverage, Subcontractor.performance_rating
+                ).filter(Subcontractor.id.in_(changed))
+            }
+            for subcontractor_id in changed:
+                if subcontractor_id in rows:
+                    self._index.add(*rows[subcontractor_id])
+                else:
+                    self._index.remove(subcontractor_id)
+
+        self._applied = {log_id: changed_at for log_id, changed_at in self._applied.items() if changed_at >= since}
+        self._applied.update({log_id: changed_at for log_id, _, changed_at in entries})
+        self._synced_at = now
+
+# Initialize subcontractor matching
+subcontractor_matching = SubcontractorMatchingService()
@@ -1,10 +1,27 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_prerun, task_postrun
+import asyncio
 import os
 from sqlalchemy.orm import Session
 from database.database import SessionLocal
 from services.scraping_service import run_daily_scraping
 from services.email_service import email_service
+from services.follow_up_scheduler import follow_up_scheduler
+from services.agency_routing import agency_routing
+from services.saved_search_service import saved_search_service
+from services.reporting_service import reporting_service
+from services.import_service import import_service
+from services.backup_service import backup_service
+from services.change_feed import change_feed
+from services.dashboard_service import dashboard_service
+from services.event_bus import event_bus
+from services.scoring_service import scoring_service
+# Imported for their listeners: writes made by tasks invalidate cached responses,
+# and slow statements issued by tasks reach the slow query log
+from services.cache_service import cache_service
+from services.slow_query_log import slow_query_log
+from services.query_budget import query_budget_service
 import logging
 
 # Configure logging
@@ -27,30 +44,61 @@ celery_app.conf.update(
             'task': 'tasks.scrape_contracts_task',
             'schedule': crontab(hour=6, minute=0),  # Run daily at 6 AM UTC
         },
-        'check-follow-up-reminders': {
-            'task': 'tasks.check_follow_ups_task',
-            'schedule': crontab(hour=9, minute=0),  # Run daily at 9 AM UTC
+        'poll-follow-up-queue': {
+            'task': 'tasks.poll_follow_up_queue_task',
+            'schedule': 60.0,  # Every minute, only touches follow-ups that are due
         },
         'weekly-performance-report': {
             'task': 'tasks.send_weekly_report_task',
             'schedule': crontab(hour=10, minute=0, day_of_week=1),  # Monday at 10 AM UTC
         },
+        'daily-database-backup': {
+            'task': 'tasks.backup_to_google_drive_task',
+            'schedule': crontab(hour=3, minute=0),  # Daily at 3 AM UTC, full every BACKUP_FULL_INTERVAL_DAYS
+        },
+        'prune-change-log': {
+            'task': 'tasks.prune_change_log_task',
+            'schedule': crontab(hour=4, minute=0),  # Daily at 4 AM UTC
+        },
+        'rescore-opportunities': {
+            'task': 'tasks.rescore_opportunities_task',
+            'schedule': crontab(hour=0, minute=15),  # Daily just after midnight UTC, when days-to-deadline tick over
+        },
     },
 )
 
+@task_prerun.connect
+def _open_query_budget(task_id=None, task=None, **kwargs):
+    """Development mode: warn about tasks that loop over queries"""
+    if query_budget_service.warn:
+        query_budget_service.start_task(task_id, task.name)
+
+@task_postrun.connect
+def _close_query_budget(task_id=None, **kwargs):
+    query_budget_service.finish_task(task_id)
+
 @celery_app.task(bind=True)
 def scrape_contracts_task(self):
     """Daily contract scraping task"""
     db = SessionLocal()
     try:
         logger.info("Starting daily contract scraping...")
-        results = run_daily_scraping(db)
+        results = asyncio.run(run_daily_scraping(db))
+        new_contract_ids = [
+            contract_id
+            for source in results.values()
+            for contract_id in source.pop('contract_ids', [])
+        ]
         
         total_found = sum(source['contracts_found'] for source in results.values() if 'contracts_found' in source)
         total_added = sum(source['contracts_added'] for source in results.values() if 'contracts_added' in source)
         
         logger.info(f"Scraping completed: {total_found} contracts found, {total_added} new contracts added")
         
+        if new_contract_ids:
+            send_opportunity_alerts_task.delay(new_contract_ids)
+            match_saved_searches_task.delay(new_contract_ids)
+        
         return {
             'status': 'success',
             'total_found': total_found,
@@ -74,20 +122,67 @@ def check_follow_ups_task(self):
     try:
         logger.info("Checking for follow-up reminders...")
         
-        reminders = email_service.check_follow_up_reminders(db)
+        reminders_found = 0
+        for reminder in email_service.iter_follow_up_reminders(db):
+            # Send reminder notifications (could be email, Slack, etc.)
+            logger.info(f"Follow-up reminder: {reminder['officer_name']} - {reminder['days_overdue']} days overdue")
+            reminders_found += 1
+        
+        # Reminders themselves are served by GET /api/communications/follow-ups,
+        # so only the count goes to the result backend
+        return {
+            'status': 'success',
+            'reminders_found': reminders_found
+        }
+        
+    except Exception as e:
+        logger.error(f"Follow-up check failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def poll_follow_up_queue_task(self):
+    """Fire follow-up reminders that became due since the last tick"""
+    db = SessionLocal()
+    try:
+        reminders = follow_up_scheduler.poll(db)
         
-        # Send reminder notifications (could be email, Slack, etc.)
         for reminder in reminders:
             logger.info(f"Follow-up reminder: {reminder['officer_name']} - {reminder['days_overdue']} days overdue")
         
         return {
             'status': 'success',
-            'reminders_found': len(reminders),
-            'reminders': reminders
+            'reminders_fired': len(reminders)
         }
         
     except Exception as e:
-        logger.error(f"Follow-up check failed: {str(e)}")
+        logger.error(f"Follow-up queue poll failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def backfill_follow_up_queue_task(self):
+    """Rebuild the follow-up queue from existing communications"""
+    db = SessionLocal()
+    try:
+        queued = follow_up_scheduler.backfill(db)
+        logger.info(f"Follow-up queue backfilled with {queued} entries")
+        
+        return {
+            'status': 'success',
+            'queued': queued
+        }
+        
+    except Exception as e:
+        logger.error(f"Follow-up queue backfill failed: {str(e)}")
         return {
             'status': 'error',
             'error': str(e)
@@ -122,37 +217,36 @@ def send_bulk_emails_task(self, officer_ids, template_type):
         db.close()
 
 @celery_app.task(bind=True)
-def send_opportunity_alerts_task(self, contract_id):
-    """Send opportunity alerts for new high-value contracts"""
+def send_opportunity_alerts_task(self, contract_ids):
+    """Send opportunity alerts for a batch of new contracts, one email per officer"""
     db = SessionLocal()
     try:
         from database.models import Contract, ProcurementOfficer
         
-        # Get contract details
-        contract = db.query(Contract).filter(Contract.id == contract_id).first()
-        if not contract:
+        if isinstance(contract_ids, int):
+            contract_ids = [contract_ids]
+        
+        contracts = db.query(Contract).filter(Contract.id.in_(contract_ids)).all()
+        if not contracts:
             return {'status': 'error', 'error': 'Contract not found'}
         
-        # Find relevant procurement officers (same agency or high relationship strength)
+        # Route the whole batch through the agency index in one pass
+        recipients = agency_routing.route(db, contracts)
         officers = db.query(ProcurementOfficer).filter(
-            ProcurementOfficer.agency.ilike(f"%{contract.agency}%")
-        ).all()
+            ProcurementOfficer.id.in_(list(recipients))
+        ).all() if recipients else []
         
         sent_count = 0
         for officer in officers:
-            if officer.email:
-                success = email_service.send_opportunity_alert(
-                    db, officer.id, contract.title, contract.value
-                )
-                if success:
-                    sent_count += 1
+            if email_service.send_opportunity_digest(db, officer, recipients[officer.id]):
+                sent_count += 1
         
-        logger.info(f"Opportunity alerts sent to {sent_count} officers for contract: {contract.title}")
+        logger.info(f"Opportunity alerts for {len(contracts)} contracts sent to {sent_count} officers")
         
         return {
             'status': 'success',
             'alerts_sent': sent_count,
-            'contract_title': contract.title
+            'contracts': len(contracts)
         }
         
     except Exception as e:
@@ -164,52 +258,55 @@ def send_opportunity_alerts_task(self, contract_id):
     finally:
         db.close()
 
+@celery_app.task(bind=True, ignore_result=True)
+def match_saved_searches_task(self, contract_ids):
+    """Match newly added contracts against users' saved searches"""
+    db = SessionLocal()
+    try:
+        results = saved_search_service.notify(db, contract_ids)
+        
+        return {
+            'status': 'success',
+            'matched_users': results['matched_users'],
+            'sent': results['sent']
+        }
+        
+    except Exception as e:
+        logger.error(f"Saved search matching failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        db.close()
+
 @celery_app.task(bind=True)
 def send_weekly_report_task(self):
     """Send weekly performance report"""
     db = SessionLocal()
+    attachments = []
     try:
-        from database.models import Contract, RevenueTracking
-        from datetime import datetime, timedelta
-        
-        # Calculate weekly stats
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        new_contracts = db.query(Contract).filter(Contract.created_at >= week_ago).count()
-        weekly_revenue = db.query(RevenueTracking).filter(
-            RevenueTracking.created_at >= week_ago
-        ).all()
-        
-        total_revenue = sum(r.fee_amount for r in weekly_revenue)
-        
-        # Create report content
-        report = f"""
-        KDP Global Weekly Performance Report
+        start, end = reporting_service.default_period(days=7)
+        report = reporting_service.build_report(db, start, end)
+        attachments = reporting_service.write_csv_attachments(report)
         
-        Week of {week_ago.strftime('%Y-%m-%d')} to {datetime.utcnow().strftime('%Y-%m-%d')}
-        
-        📊 Key Metrics:
-        - New Contracts: {new_contracts}
-        - Revenue Generated: ${total_revenue:,.2f}
-        - Active Placements: {len(weekly_revenue)}
-        
-        This automated report is generated every Monday.
-        """
+        body = ''.join(reporting_service.iter_html(report, footer="This automated report is generated every Monday."))
         
         # Send report email (to admin/management)
         admin_email = os.getenv("ADMIN_EMAIL", "kendrick@kdp-global.com")
         email_service.send_email(
             admin_email,
             "KDP Global Weekly Performance Report",
-            report.replace('\n', '<br>')
+            body,
+            attachments
         )
         
         logger.info("Weekly report sent successfully")
         
         return {
             'status': 'success',
-            'new_contracts': new_contracts,
-            'weekly_revenue': total_revenue
+            'new_contracts': report['new_contracts'],
+            'weekly_revenue': report['revenue']
         }
         
     except Exception as e:
@@ -218,31 +315,117 @@ def send_weekly_report_task(self):
             'status': 'error',
             'error': str(e)
         }
+    finally:
+        reporting_service.remove_attachments(attachments)
+        db.close()
+
+@celery_app.task(bind=True)
+def backup_to_google_drive_task(self, full=None):
+    """Back up the database to the configured target (Google Drive in production)"""
+    db = SessionLocal()
+    try:
+        logger.info("Starting database backup...")
+        
+        result = backup_service.run(db, backup_service.get_target(), full=full)
+        
+        logger.info(f"Database backup {result['backup_id']} completed")
+        
+        result['status'] = 'success'
+        return result
+        
+    except Exception as e:
+        logger.error(f"Database backup failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
     finally:
         db.close()
 
 @celery_app.task(bind=True)
-def backup_to_google_drive_task(self):
-    """Backup database to Google Drive"""
+def import_file_task(self, entity, filename):
+    """Bulk import a CSV/XLSX file from the import folder, reporting progress"""
+    db = SessionLocal()
     try:
-        logger.info("Starting Google Drive backup...")
+        path = import_service.resolve_local_file(filename)
+        
+        def report_progress(summary):
+            self.update_state(state='PROGRESS', meta=summary)
         
-        # This would implement the actual backup logic
-        # For now, return success
+        with open(path, 'rb') as stream:
+            result = import_service.import_file(db, entity, stream, filename, progress=report_progress)
+        
+        result['status'] = 'success'
+        return result
+        
+    except Exception as e:
+        logger.error(f"Import of {filename} failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def prune_change_log_task(self):
+    """Drop change feed entries past SYNC_RETENTION_DAYS"""
+    db = SessionLocal()
+    try:
+        deleted = change_feed.prune(db)
+        logger.info(f"Pruned {deleted} change log entries")
+        return {
+            'status': 'success',
+            'deleted': deleted
+        }
         
-        logger.info("Google Drive backup completed")
+    except Exception as e:
+        logger.error(f"Change log pruning failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        db.close()
+
+@celery_app.task(bind=True, ignore_result=True)
+def publish_dashboard_stats_task(self):
+    """Recompute the dashboard aggregates once and push them to every open dashboard"""
+    db = SessionLocal()
+    try:
+        event_bus.publish_dashboard_stats(dashboard_service.stats(db))
+        return {
+            'status': 'success'
+        }
         
+    except Exception as e:
+        logger.error(f"Dashboard stats refresh failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def rescore_opportunities_task(self):
+    """Re-score active contracts so deadline-dependent scores stay current"""
+    db = SessionLocal()
+    try:
+        result = scoring_service.rescore(db)
         return {
             'status': 'success',
-            'backup_time': datetime.utcnow().isoformat()
+            **result
         }
         
     except Exception as e:
-        logger.error(f"Google Drive backup failed: {str(e)}")
+        logger.error(f"Opportunity re-scoring failed: {str(e)}")
         return {
             'status': 'error',
             'error': str(e)
         }
+    finally:
+        db.close()
 
 # Manual task triggers (can be called from API endpoints)
 @celery_app.task(bind=True)
@@ -254,4 +437,4 @@ def manual_scraping_task(self, sources=None):
     return scrape_contracts_task.delay()
 
 if __name__ == '__main__':
-    celery_app.start()
\ No newline at end of file
+    celery_app.start()
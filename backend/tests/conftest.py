@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Tests run against a throwaway SQLite file unless DATABASE_URL points elsewhere
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+pytest_plugins = ["pytest_query_budget"]
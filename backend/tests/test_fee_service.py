@@ -0,0 +1,80 @@
+import json
+import pytest
+from database.database import SessionLocal, engine
+from database.models import Base, Contract
+from services.fee_service import FeeService
+
+SCHEDULES = {
+    'default': {'tiers': [[None, 0.03]], 'minimum': 0.0, 'cap': None},
+    'schedules': {
+        'tiered': {'tiers': [[1000, 0.05], [5000, 0.02], [None, 0.01]], 'minimum': 0.0, 'cap': None},
+        'floored': {'tiers': [[None, 0.01]], 'minimum': 25.0, 'cap': 100.0},
+    },
+    'agency': {'Navy': 'floored'},
+    'naics': {'488510': 'tiered'},
+}
+
+def _service(tmp_path, monkeypatch, config=SCHEDULES) -> FeeService:
+    path = tmp_path / "fees.json"
+    path.write_text(json.dumps(config))
+    monkeypatch.setenv("FEE_SCHEDULES_FILE", str(path))
+    return FeeService()
+
+def _with_tiers(tiers):
+    return {**SCHEDULES, 'schedules': {**SCHEDULES['schedules'], 'tiered': {'tiers': tiers, 'cap': None}}}
+
+def test_fee_charges_each_bracket_its_own_rate(tmp_path, monkeypatch):
+    fees = _service(tmp_path, monkeypatch)
+    assert fees.fee(500, '488510', 'Army') == ('tiered', 25.0)
+    assert fees.fee(1000, '488510', 'Army') == ('tiered', 50.0)
+    # 1000 at 5%, 4000 at 2%, 5000 at 1%
+    assert fees.fee(10000, '488510', 'Army') == ('tiered', pytest.approx(180.0))
+
+def test_fee_is_held_between_minimum_and_cap(tmp_path, monkeypatch):
+    fees = _service(tmp_path, monkeypatch)
+    assert fees.fee(1000, None, 'Navy') == ('floored', 25.0)
+    assert fees.fee(5000, None, 'Navy') == ('floored', 50.0)
+    assert fees.fee(50000, None, 'Navy') == ('floored', 100.0)
+    assert fees.fee(1000, None, None) == ('default', 30.0)
+
+@pytest.mark.parametrize("tiers, message", [
+    ([], "no tiers"),
+    ([[1000, 0.05]], "open-ended"),
+    ([[5000, 0.02], [1000, 0.05], [None, 0.01]], "ascending"),
+    ([[1000, 0.05], [1000, 0.02], [None, 0.01]], "ascending"),
+    ([[0, 0.05], [None, 0.01]], "ascending"),
+    ([[None, 0.05], [None, 0.01]], "ascending"),
+])
+def test_invalid_tiers_are_rejected(tmp_path, monkeypatch, tiers, message):
+    with pytest.raises(ValueError, match=message):
+        _service(tmp_path, monkeypatch, _with_tiers(tiers))
+
+def test_unknown_schedule_is_rejected(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match="Unknown fee schedule"):
+        _service(tmp_path, monkeypatch, {**SCHEDULES, 'agency': {'Navy': 'missing'}})
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+def test_portfolio_picks_the_same_schedule_as_schedule_for(tmp_path, monkeypatch, db):
+    fees = _service(tmp_path, monkeypatch)
+    cases = [('Navy', '488510'), ('Navy', '541611'), ('Army', '488510'), ('Army', '541611')]
+    db.add_all(Contract(title=f"{agency} {naics}", agency=agency, naics_code=naics, value=10000.0) for agency, naics in cases)
+    db.commit()
+
+    portfolio = fees.portfolio(db, db.query(Contract))
+    by_contract = {result['contract_id']: result for result in portfolio['results']}
+    for contract in db.query(Contract):
+        name, fee = fees.fee(contract.value, contract.naics_code, contract.agency)
+        assert by_contract[contract.id]['schedule'] == name == fees.schedule_for(contract.naics_code, contract.agency)
+        assert by_contract[contract.id]['fee_amount'] == pytest.approx(fee)
+    # An agency schedule beats a NAICS one
+    assert fees.schedule_for('488510', 'Navy') == 'floored'
+    assert portfolio['by_schedule']['floored']['contracts'] == 2
+    assert portfolio['by_schedule']['tiered']['contracts'] == 1
+    assert portfolio['by_schedule']['default']['contracts'] == 1
@@ -0,0 +1,33 @@
+import io
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Contract
+from services.event_bus import event_bus
+from services.import_service import import_service
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(event_bus, 'publish_written', lambda *args, **kwargs: None)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def test_reimport_leaves_columns_absent_from_the_sheet_unchanged(db):
+    db.add(Contract(
+        title="Port dredging", agency="Navy", naics_code="488510", value=100000.0,
+        status="awarded", notes="Won in March"
+    ))
+    db.commit()
+
+    sheet = b"title,agency,naics_code,value\nPort dredging,Navy,488510,250000\n"
+    summary = import_service.import_file(db, 'contracts', io.BytesIO(sheet), 'contracts.csv')
+
+    assert summary['updated'] == 1
+    contract = db.query(Contract).one()
+    db.refresh(contract)
+    assert contract.value == 250000.0
+    assert contract.status == "awarded"
+    assert contract.notes == "Won in March"
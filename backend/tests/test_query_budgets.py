@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from auth.auth import get_current_active_user
+from database.database import SessionLocal, engine
+from database.models import Base, Communication, Contract, EmailTemplate, ProcurementOfficer, RevenueTracking, User
+from services.cache_service import cache_service
+from services.email_service import email_service
+
+OFFICERS = 10
+
+@pytest.fixture
+def db(monkeypatch):
+    Base.metadata.create_all(engine)
+    # Budgets are about the database, so every request reaches it
+    monkeypatch.setattr(cache_service, 'enabled', False)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def officers(db):
+    officers = [
+        ProcurementOfficer(name=f"Officer {i}", agency="Navy", email=f"officer{i}@navy.mil", relationship_strength=i % 5)
+        for i in range(OFFICERS)
+    ]
+    db.add_all(officers)
+    db.flush()
+    for officer in officers:
+        for days in (30, 20, 10):
+            db.add(Communication(
+                contact_id=officer.id, date=datetime.utcnow() - timedelta(days=days), type="email",
+                follow_up_date=date.today() - timedelta(days=days - 5)
+            ))
+    db.commit()
+    return [officer.id for officer in officers]
+
+@pytest.fixture
+def contracts(db):
+    contracts = [Contract(title=f"Contract {i}", agency="Navy", naics_code="488510", status="active") for i in range(OFFICERS)]
+    db.add_all(contracts)
+    db.flush()
+    for contract in contracts:
+        for month in (1, 2, 3):
+            db.add(RevenueTracking(contract_id=contract.id, placement_date=date(2025, month, 1), fee_amount=100.0))
+    db.commit()
+
+@pytest.fixture
+def client():
+    from main import app
+    app.dependency_overrides[get_current_active_user] = lambda: User(id=1, email="admin@example.com", is_active=True)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def _repeated_reads(budget):
+    return [(sql, count) for sql, count in budget.fingerprints.items() if count > 1 and sql.startswith("SELECT")]
+
+@pytest.mark.query_budget(max_statements=1)
+def test_check_follow_up_reminders_is_one_query(db, officers):
+    reminders = email_service.check_follow_up_reminders(db, limit=None)
+    assert len(reminders) == OFFICERS
+
+def test_send_bulk_emails_loads_officers_and_template_once(db, officers, monkeypatch, query_budget):
+    monkeypatch.setattr(email_service, 'send_email', lambda *args, **kwargs: True)
+    db.add(EmailTemplate(name="Intro", subject="Hello {{ officer_name }}", body="Hi", template_type="introduction"))
+    db.commit()
+    # SQLite inserts ORM rows one at a time to return their ids; PostgreSQL batches them
+    with query_budget(max_statements=2 * OFFICERS + 6) as budget:
+        results = email_service.send_bulk_emails(db, officers, "introduction")
+    assert results == {"sent": OFFICERS, "failed": 0}
+    assert _repeated_reads(budget) == []
+
+@pytest.mark.query_budget(max_repeats=1)
+def test_officer_list_with_communications(client, officers):
+    response = client.get("/api/procurement-officers/?include=communications")
+    assert response.status_code == 200
+    assert all(len(officer['communications']) == 3 for officer in response.json())
+
+@pytest.mark.query_budget(max_repeats=1)
+def test_officer_detail_with_communications(client, officers):
+    response = client.get(f"/api/procurement-officers/{officers[0]}?include=communications")
+    assert response.status_code == 200
+    assert len(response.json()['communications']) == 3
+
+@pytest.mark.query_budget(max_repeats=1)
+def test_contract_list_with_revenue_tracking(client, contracts):
+    response = client.get("/api/contracts/?include=revenue_tracking")
+    assert response.status_code == 200
+    assert all(len(contract['revenue_tracking']) == 3 for contract in response.json())
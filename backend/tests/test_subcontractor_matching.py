@@ -0,0 +1,55 @@
+from services.subcontractor_matching import CapabilityIndex, capability_terms, geography_terms
+
+def test_capability_terms_normalizes_certifications_standards_and_naics():
+    terms = capability_terms("Freight trucking, ISO 9001 certified", "8(a), HUBZone; NAICS 488510")
+    assert {'cert:8a', 'cert:hubzone', 'cert:iso9001', 'naics:488510', 'naics4:4885', 'freight', 'trucking'} <= terms
+    assert 'certified' not in terms
+
+def test_capability_terms_adds_broader_programs():
+    assert capability_terms("SDVOSB") == {'cert:sdvosb', 'cert:vosb'}
+    assert capability_terms("EDWOSB") == {'cert:edwosb', 'cert:wosb'}
+    assert capability_terms("Service-disabled veteran-owned") == {'cert:sdvosb', 'cert:vosb'}
+
+def test_capability_terms_does_not_imply_narrower_programs():
+    assert capability_terms("VOSB") == {'cert:vosb'}
+    assert capability_terms("Women-owned") == {'cert:wosb'}
+
+def test_geography_terms_reads_codes_only_when_asked():
+    assert geography_terms("Florida and GA") == {'geo:fl'}
+    assert geography_terms("Florida and GA", codes=True) == {'geo:fl', 'geo:ga'}
+    assert geography_terms("Nationwide") == {'geo:national'}
+
+def _index():
+    index = CapabilityIndex()
+    index.add(1, "Freight trucking and warehousing", "SDVOSB", "Florida", 9.0)
+    index.add(2, "Freight trucking", None, "Texas", 4.0)
+    index.add(3, "Janitorial cleaning", "VOSB", "Nationwide", 10.0)
+    return index
+
+def test_match_ranks_by_overlap_rating_and_geography():
+    index = _index()
+    results = index.match(capability_terms("Freight trucking, VOSB set-aside"), {'geo:fl'}, limit=10)
+    by_id = {result['subcontractor_id']: result for result in results}
+    assert results[0]['subcontractor_id'] == 1 and set(by_id) == {1, 2, 3}
+    assert results == sorted(results, key=lambda result: -result['score'])
+    # The SDVOSB firm qualifies for the VOSB set-aside
+    assert by_id[1]['matched_terms'] == ['cert:vosb', 'freight', 'trucking']
+    assert by_id[1]['geographic_match'] is True
+    assert by_id[2]['geographic_match'] is False
+    # Nationwide coverage counts as covering every state
+    assert by_id[3]['geographic_match'] is True
+
+def test_match_skips_subcontractors_without_shared_terms_and_below_min_rating():
+    index = _index()
+    assert index.match(capability_terms("Software development"), set(), limit=10) == []
+    results = index.match(capability_terms("Freight trucking"), set(), limit=10, min_rating=5)
+    assert [result['subcontractor_id'] for result in results] == [1]
+    assert results[0]['geographic_match'] is None
+
+def test_match_respects_limit_and_removed_subcontractors():
+    index = _index()
+    assert len(index.match(capability_terms("Freight trucking"), set(), limit=1)) == 1
+    index.remove(1)
+    index.add(2, "Janitorial cleaning", None, None, None)
+    assert index.match(capability_terms("Freight trucking"), set(), limit=10) == []
+    assert len(index) == 2
@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect } from 'react';
 import {
   Box,
   Grid,
@@ -35,7 +35,7 @@ import {
   Pie,
   Cell,
 } from 'recharts';
-import { useQuery } from 'react-query';
+import { useQuery, useQueryClient } from 'react-query';
 import axios from 'axios';
 
 // Mock data for demonstration
@@ -117,8 +117,37 @@ const StatCard: React.FC<{ title: string; value: string | number; icon: React.Re
 
 const Dashboard: React.FC = () => {
   // In a real app, these would be actual API calls
-  const { data: stats } = useQuery('dashboard-stats', () => Promise.resolve(mockStats));
-  const { data: recentActivity } = useQuery('recent-activity', () => Promise.resolve(mockRecentActivity));
+  // The stream below keeps both queries current, so they are never refetched on a timer or focus
+  const { data: stats } = useQuery('dashboard-stats', () => Promise.resolve(mockStats), { staleTime: Infinity });
+  const { data: recentActivity } = useQuery('recent-activity', () => Promise.resolve(mockRecentActivity), {
+    staleTime: Infinity,
+  });
+  const queryClient = useQueryClient();
+
+  // Server-sent events from /api/dashboard/stream (EventSource cannot send headers, hence ?token=)
+  useEffect(() => {
+    const token = localStorage.getItem('access_token');
+    if (!token) {
+      return undefined;
+    }
+
+    const source = new EventSource(`/api/dashboard/stream?token=${encodeURIComponent(token)}`);
+    const prepend = (key: 'recent_contracts' | 'recent_revenue') => (event: Event) => {
+      const item = JSON.parse((event as MessageEvent).data);
+      queryClient.setQueryData('recent-activity', (current: any) => ({
+        ...current,
+        [key]: [item, ...(current?.[key] ?? [])].slice(0, 10),
+      }));
+    };
+
+    source.addEventListener('dashboard.stats', (event) => {
+      queryClient.setQueryData('dashboard-stats', JSON.parse((event as MessageEvent).data));
+    });
+    source.addEventListener('contract.created', prepend('recent_contracts'));
+    source.addEventListener('revenue.created', prepend('recent_revenue'));
+
+    return () => source.close();
+  }, [queryClient]);
 
   const formatCurrency = (amount: number) => {
     return new Intl.NumberFormat('en-US', {